@@ -8,8 +8,11 @@ http_response_app = get_asgi_application()
 
 # Import wsPattern lazily to ensure Django's app registry is ready
 def get_websocket_application():
+    from channels.auth import AuthMiddlewareStack
     from chat.routing import wsPattern
-    return URLRouter(wsPattern)
+    from notification.routing import websocket_urlpatterns as notification_patterns
+    # The session user is needed to pick a socket's notification group
+    return AuthMiddlewareStack(URLRouter(wsPattern + notification_patterns))
 
 application = ProtocolTypeRouter(
     {"http": http_response_app, "websocket": get_websocket_application()}
@@ -0,0 +1,102 @@
+"""
+Per-process write-behind buffers.
+
+Like counts, poll votes and search index updates are collected in memory
+and written together instead of one statement per change. A
+``WriteBehindBuffer`` holds the pending changes of one kind and writes
+them when the oldest has waited ``seconds_setting`` seconds (on a timer
+thread), when ``size_setting`` are pending (as a background task, see
+backend/tasks.py) and when the process exits. Changes still pending when
+a process is killed are lost, so every buffer writes something that can
+be repaired or recomputed from its source rows.
+
+Subclasses say how a change is merged into the pending batch
+(``merge``) and how a batch is written (``write``).
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, Value, When
+
+from .tasks import run_task
+
+logger = logging.getLogger(__name__)
+
+
+def delta_case(deltas):
+    """
+    A ``CASE`` giving each pk of ``{pk: delta}`` its delta and every other
+    row 0, for adding many deltas in one UPDATE.
+    """
+    return Case(
+        *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+        default=Value(0),
+    )
+
+
+class WriteBehindBuffer:
+    # Names of the settings holding the longest wait in seconds and the
+    # number of pending entries that triggers a write
+    seconds_setting = None
+    size_setting = None
+    # What the buffer holds, for the log when a write fails
+    description = 'buffered changes'
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Serialises writes so this process's batches can't race each other
+        self.flush_lock = threading.Lock()
+        self.pending = self.empty()
+        self.timer = None
+        atexit.register(self.flush)
+
+    def empty(self):
+        return {}
+
+    def merge(self, pending, *change):
+        raise NotImplementedError
+
+    def write(self, pending):
+        raise NotImplementedError
+
+    def add(self, *change):
+        with self.lock:
+            self.merge(self.pending, *change)
+            full = len(self.pending) >= getattr(settings, self.size_setting)
+            if not full and self.timer is None:
+                self.timer = threading.Timer(
+                    getattr(settings, self.seconds_setting), self._flush_in_background
+                    )
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            run_task(self.flush)
+
+    def add_on_commit(self, *change):
+        """Add ``change`` once the current transaction commits, if it does."""
+        transaction.on_commit(lambda: self.add(*change))
+
+    def flush(self):
+        """Write everything pending now. Returns what ``write`` returned."""
+        with self.flush_lock:
+            with self.lock:
+                pending, self.pending = self.pending, self.empty()
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+            if pending:
+                return self.write(pending)
+        return None
+
+    def _flush_in_background(self):
+        # The timer thread has its own DB connection
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Writing %s failed", self.description)
+        finally:
+            close_old_connections()
@@ -0,0 +1,239 @@
+"""
+Off-request image processing.
+
+Uploaded images are never decoded in the request. Saving a model whose
+image field points at a new file schedules ``process_image`` on the
+background worker pool once the transaction commits. The worker:
+
+* hashes the file in chunks, unless the upload handler already did while
+  streaming it (backend/uploads.py), and stops there if the content is
+  the one already processed, so re-saving a model or re-uploading the
+  same file costs nothing;
+* decodes it once, at reduced size where the format allows, and writes a
+  ``thumb``, ``card`` and ``full`` rendition in IMAGE_RENDITION_FORMAT at
+  IMAGE_RENDITION_QUALITY;
+* records the hash in ``<field>_hash`` and the storage paths in
+  ``<field>_renditions`` (``{'source': ..., 'thumb': ..., ...}``).
+
+Pages ask for fixed-width derivatives (RESPONSIVE_WIDTHS) through the
+``srcset`` template tag. Widths already made are linked directly and
+recorded as ``w<width>`` in ``<field>_renditions``; the others point at
+the ``image_rendition`` view, which makes the derivative on first request
+and redirects to it.
+
+Rendition files are named after the content hash, so identical uploads
+share them and a path never changes meaning once written. nginx serves
+them with immutable caching. Originals are left untouched.
+"""
+import hashlib
+import logging
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .tasks import enqueue_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each rendition
+RENDITIONS = (
+    ('thumb', 150),
+    ('card', 600),
+    ('full', 1600),
+)
+
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Widths offered in srcset, made on first request
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# Image fields that get renditions, as (model label, field name)
+IMAGE_FIELDS = (
+    ('blog.Post', 'picture'),
+    ('blog.Profile', 'image'),
+    ('marketplace.Item', 'image'),
+)
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def hash_file(field_file):
+    """Return the SHA-256 hex digest of a stored file, read in chunks."""
+    digest = hashlib.sha256()
+    with field_file.open('rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def rendition_name(digest, name):
+    extension = EXTENSIONS[settings.IMAGE_RENDITION_FORMAT]
+    return f'renditions/{digest[:2]}/{digest}-{name}.{extension}'
+
+
+def width_name(digest, width):
+    return rendition_name(digest, f'w{width}')
+
+
+# EXIF orientations that turn the image on its side
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def _open(field_file, draft_size):
+    """
+    Decode a stored image, upright, at reduced scale where the format
+    allows but no smaller than ``draft_size`` once upright. Returns the
+    image and the upright size of the original.
+    """
+    with field_file.open('rb') as f:
+        image = Image.open(f)
+        width, height = image.size
+        if image.getexif().get(0x0112) in ROTATED_ORIENTATIONS:
+            width, height = height, width
+            # The draft is decoded before it's turned upright
+            draft_size = draft_size[::-1]
+        # Lets JPEG decode straight to a smaller scale
+        image.draft('RGB', draft_size)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image, (width, height)
+
+
+def _encode(image, size):
+    rendition = image.copy()
+    rendition.thumbnail(size, Image.LANCZOS)
+    image_format = settings.IMAGE_RENDITION_FORMAT
+    if image_format == 'JPEG' or not rendition.has_transparency_data:
+        rendition = rendition.convert('RGB')
+    elif rendition.mode != 'RGBA':
+        rendition = rendition.convert('RGBA')
+    buffer = BytesIO()
+    rendition.save(
+        buffer, image_format,
+        quality=settings.IMAGE_RENDITION_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def _store(path, image, size):
+    if not default_storage.exists(path):
+        saved = default_storage.save(path, ContentFile(_encode(image, size)))
+        if saved != path:
+            # Another worker wrote the same content first
+            default_storage.delete(saved)
+    return path
+
+
+def render_renditions(field_file, digest):
+    """
+    Decode ``field_file`` once and write every rendition that isn't
+    stored yet. Returns ``{rendition: path}`` plus the original's
+    ``size``.
+    """
+    largest = max(size for _, size in RENDITIONS)
+    image, original_size = _open(field_file, (largest, largest))
+    paths = {'size': list(original_size)}
+    for name, size in RENDITIONS:
+        paths[name] = _store(rendition_name(digest, name), image, (size, size))
+    return paths
+
+
+def render_width(field_file, digest, width):
+    """Write the ``width`` pixel wide derivative if needed; return its path."""
+    path = width_name(digest, width)
+    if default_storage.exists(path):
+        return path
+    image, _ = _open(field_file, (width, 1))
+    # Only the width is bounded; thumbnail() keeps the aspect ratio
+    return _store(path, image, (width, image.height))
+
+
+def process_image(model_label, pk, field_name, digest=None):
+    """
+    Hash the file in ``field_name`` of the given object and, if its
+    content changed, generate and record its renditions. ``digest`` is
+    the file's hash if it's already known.
+    """
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return
+    hash_field = f'{field_name}_hash'
+    renditions_field = f'{field_name}_renditions'
+    source = field_file.name
+
+    digest = digest or hash_file(field_file)
+    renditions = dict(getattr(instance, renditions_field) or {})
+    renditions.pop('source', None)
+    if digest != getattr(instance, hash_field) or not renditions:
+        try:
+            renditions = render_renditions(field_file, digest)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            # SVGs and damaged uploads are served as they are
+            logger.warning("No renditions for %s %s %s", model_label, pk, source)
+            renditions = {}
+
+    # A newer upload may have replaced the file meanwhile; its own task
+    # records that one
+    model.objects.filter(pk=pk, **{field_name: source}).update(**{
+        hash_field: digest,
+        renditions_field: {'source': source, **renditions},
+    })
+
+
+def srcset_widths(renditions):
+    """Widths to offer for an image, never wider than the original."""
+    size = renditions.get('size')
+    if not size:
+        return ()
+    widths = [width for width in RESPONSIVE_WIDTHS if width <= size[0]]
+    return widths or [RESPONSIVE_WIDTHS[0]]
+
+
+def record_width(instance, field_name, width, path):
+    """Remember a derivative so pages link to it directly from now on."""
+    renditions_field = f'{field_name}_renditions'
+    renditions = getattr(instance, renditions_field)
+    renditions[f'w{width}'] = path
+    type(instance).objects.filter(
+        pk=instance.pk, **{f'{field_name}_hash': getattr(instance, f'{field_name}_hash')}
+        ).update(**{renditions_field: renditions})
+
+
+def schedule_image_processing(instance, field_name):
+    """
+    Queue ``process_image`` for after commit if ``field_name`` holds a
+    file that hasn't been processed yet.
+    """
+    field_file = getattr(instance, field_name)
+    renditions = getattr(instance, f'{field_name}_renditions') or {}
+    if field_file and renditions.get('source') != field_file.name:
+        digest = getattr(instance, '_upload_hashes', {}).pop(field_name, None)
+        enqueue_on_commit(
+            process_image, instance._meta.label, instance.pk, field_name, digest
+            )
+
+
+def remember_upload_hashes(sender, instance, **kwargs):
+    """
+    pre_save handler keeping the hash SniffingUploadHandler took of a
+    file uploaded in this request. Saving replaces the upload on the
+    instance with its stored name, so it has to be read before then.
+    """
+    for label, field_name in IMAGE_FIELDS:
+        if label != sender._meta.label:
+            continue
+        field_file = getattr(instance, field_name)
+        if not field_file or field_file._committed:
+            continue
+        digest = getattr(field_file.file, 'content_hash', None)
+        if digest:
+            instance.__dict__.setdefault('_upload_hashes', {})[field_name] = digest
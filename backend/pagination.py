@@ -0,0 +1,136 @@
+"""
+Keyset (cursor) pagination shared by the list views.
+
+``Paginator`` runs a ``COUNT(*)`` and then skips ``OFFSET`` rows to reach a
+page, so deep pages get slower the further in they are. A cursor page
+instead remembers the sort key of the last row it showed and asks for the
+rows strictly after it: one index range scan of ``per_page + 1`` rows, the
+same cost on page 500 as on page 1. Each paginated ordering is backed by a
+matching composite index.
+
+Cursors are opaque, URL-safe tokens. A malformed or tampered cursor is
+ignored and the listing restarts from the first page. Ordering fields may
+be annotations (e.g. a search rank) as well as model fields.
+"""
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def _json_default(value):
+    # isoformat keeps full microsecond precision, which the keyset
+    # comparison relies on; DjangoJSONEncoder would truncate it.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(*values):
+    """Encode a position in an ordering as an opaque token."""
+    raw = json.dumps(values, default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _cursor_field(model, name, annotations=None):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return annotations[name].output_field
+
+
+def decode_cursor(model, fields, token, annotations=None):
+    """
+    Decode a token from encode_cursor into values for ``fields`` of
+    ``model``, converted with each field's ``to_python``. Fields that are
+    annotations are looked up in ``annotations``. Returns None if the
+    token is missing or invalid.
+    """
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [
+            _cursor_field(model, name, annotations).to_python(value)
+            for name, value in zip(fields, values)
+        ]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def keyset_filter(fields, values, descending=True):
+    """
+    Build the Q object selecting rows that sort strictly after ``values``,
+    e.g. ``(a < x) OR (a = x AND b < y)`` for a descending two-field key.
+    """
+    op = 'lt' if descending else 'gt'
+    clauses = []
+    for i, name in enumerate(fields):
+        clause = {prior: values[j] for j, prior in enumerate(fields[:i])}
+        clause[f'{name}__{op}'] = values[i]
+        clauses.append(Q(**clause))
+    return reduce(or_, clauses)
+
+
+class CursorPage:
+    """
+    One page of results. Iterates like a list; ``next_cursor`` is the
+    token for the following page, or None on the last page.
+    """
+
+    def __init__(self, object_list, next_cursor, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return bool(self.cursor)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} items>'
+
+
+def paginate(queryset, cursor=None, ordering=('-id',), per_page=10):
+    """
+    Return a CursorPage of ``queryset`` sorted by ``ordering``, starting
+    after ``cursor``. All ordering fields must sort in the same direction
+    and the last one must be unique (normally ``id``) so the key is total.
+    """
+    descending = ordering[0].startswith('-')
+    fields = [name.lstrip('-') for name in ordering]
+    if any(name.startswith('-') != descending for name in ordering):
+        raise ValueError('All keyset ordering fields must share a direction.')
+
+    annotations = queryset.query.annotations
+    position = decode_cursor(queryset.model, fields, cursor, annotations)
+    if position is not None:
+        queryset = queryset.filter(keyset_filter(fields, position, descending))
+
+    rows = list(queryset.order_by(*ordering)[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(*(
+            getattr(last, name if name in annotations else
+                    queryset.model._meta.get_field(name).attname)
+            for name in fields
+        ))
+    return CursorPage(rows, next_cursor, cursor if position else None)
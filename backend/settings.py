@@ -88,6 +88,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'notification.middleware.NotificationBufferMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -193,6 +194,115 @@ PAYMENT_WALLET_PRIVATE_KEY = os.environ.get('PAYMENT_WALLET_PRIVATE_KEY', '')
 if BLOCKCHAIN_ENABLED and not PAYMENT_WALLET_PRIVATE_KEY:
     raise ValueError("Blockchain payments require PAYMENT_WALLET_PRIVATE_KEY when enabled")
 
+# Background tasks (see backend/tasks.py)
+BACKGROUND_TASK_WORKERS = int(os.environ.get("BACKGROUND_TASK_WORKERS", 4))
+BACKGROUND_TASKS_EAGER = bool(os.environ.get("BACKGROUND_TASKS_EAGER", default=0))
+
+# Blog feed fan-out (see blog/feed.py)
+FEED_FANOUT_BATCH_SIZE = int(os.environ.get("FEED_FANOUT_BATCH_SIZE", 1000))
+FEED_BACKFILL_LIMIT = int(os.environ.get("FEED_BACKFILL_LIMIT", 20))
+FEED_PAGE_SIZE = 10
+# Authors with more followers than this are pulled into timelines at read
+# time instead of being fanned out. Set to 0 to always fan out.
+FEED_CELEBRITY_THRESHOLD = int(os.environ.get("FEED_CELEBRITY_THRESHOLD", 10000))
+FEED_CELEBRITY_CACHE_SECONDS = 300
+
+# Unread notification badge (see notification.models.NotificationCounter)
+NOTIFICATION_COUNT_CACHE_SECONDS = int(os.environ.get("NOTIFICATION_COUNT_CACHE_SECONDS", 300))
+# Roll likes, dislikes and comments on a post into one notification group
+# per window of this many seconds. Set to 0 to keep one row per event.
+NOTIFICATION_ROLLUP_WINDOW = int(os.environ.get("NOTIFICATION_ROLLUP_WINDOW", 0))
+NOTIFICATION_GROUP_SENDERS = 3
+
+# Like counters (see blog/likes.py)
+# Spread each post's like count over this many counter rows so a viral
+# post's likes don't all queue on one row lock. Set to 0 to update
+# Post.likes_count directly.
+LIKE_COUNTER_SHARDS = int(os.environ.get("LIKE_COUNTER_SHARDS", 0))
+# Buffer like count changes in memory and write them in batches at most
+# this many seconds apart. Set to 0 to write every change immediately.
+LIKE_WRITE_BEHIND_SECONDS = float(os.environ.get("LIKE_WRITE_BEHIND_SECONDS", 0))
+LIKE_WRITE_BEHIND_MAX_POSTS = 500
+
+# Queue poll votes in memory and record them in batches at most this many
+# seconds apart (see polls/ingest.py). Set to 0 to record every vote in its
+# own request.
+POLL_VOTE_BATCH_SECONDS = float(os.environ.get("POLL_VOTE_BATCH_SECONDS", 0))
+POLL_VOTE_BATCH_MAX = 1000
+
+# Renditions of uploaded images, made in the background (see
+# backend/images.py). Format is WEBP or JPEG.
+IMAGE_RENDITION_FORMAT = os.environ.get("IMAGE_RENDITION_FORMAT", "WEBP").upper()
+IMAGE_RENDITION_QUALITY = int(os.environ.get("IMAGE_RENDITION_QUALITY", 80))
+
+# Uploads are streamed to temporary files and their headers checked before
+# anything decodes them (see backend/uploads.py). Larger images are refused.
+FILE_UPLOAD_HANDLERS = ['backend.uploads.SniffingUploadHandler']
+UPLOAD_SNIFF_BYTES = 64 * 1024
+IMAGE_MAX_PIXELS = int(os.environ.get("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_MAX_DIMENSION = int(os.environ.get("IMAGE_MAX_DIMENSION", 12_000))
+
+# Text search configuration used to build and query
+# SearchIndex.search_vector on PostgreSQL (see search/services.py)
+SEARCH_CONFIG = os.environ.get("SEARCH_CONFIG", "english")
+# Backend matching search terms (see search/backends.py). Use
+# search.backends.InvertedIndexBackend for ranked search on databases
+# without full-text search; its index is saved to SEARCH_INDEX_PATH every
+# SEARCH_INDEX_SAVE_EVERY changes and on exit.
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "search.backends.DatabaseBackend")
+SEARCH_INDEX_PATH = os.environ.get(
+    "SEARCH_INDEX_PATH", os.path.join(BASE_DIR, 'search_index', 'index.bin')
+)
+SEARCH_INDEX_SAVE_EVERY = 500
+SEARCH_INDEX_MAX_RESULTS = 500
+# Full reindexes (see search/reindex.py) upsert this many rows at a time,
+# and spread corpora of more than SEARCH_REINDEX_PARALLEL_THRESHOLD rows
+# over SEARCH_REINDEX_WORKERS processes.
+SEARCH_REINDEX_CHUNK_SIZE = 2000
+SEARCH_REINDEX_WORKERS = int(os.environ.get("SEARCH_REINDEX_WORKERS", 4))
+SEARCH_REINDEX_PARALLEL_THRESHOLD = 50_000
+# Queue post and item changes and index them in batches at most this many
+# seconds apart, off the request (see search/indexing.py). Set
+# SEARCH_INDEX_SYNC to index every change in the transaction that made it
+# instead, as tests do.
+SEARCH_INDEX_DEBOUNCE_SECONDS = float(os.environ.get("SEARCH_INDEX_DEBOUNCE_SECONDS", 2))
+SEARCH_INDEX_BATCH_SIZE = 500
+SEARCH_INDEX_SYNC = bool(os.environ.get("SEARCH_INDEX_SYNC", default=0))
+# Cache result pages of identical searches for this many seconds, until
+# the index next changes (see search/cache.py). Set to 0 to search afresh
+# every time. In a local-memory cache at most SEARCH_CACHE_MAX_ENTRIES
+# pages are kept, the least recently used going first; Redis evicts by
+# its own maxmemory-policy.
+SEARCH_CACHE_SECONDS = int(os.environ.get("SEARCH_CACHE_SECONDS", 300))
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 10000))
+
+# Cached values are invalidated by deleting or bumping their keys, which
+# only reaches other processes if they share the cache. Set CACHE_REDIS_URL
+# (the Docker image points it at the "redis" service) whenever more than
+# one worker serves requests; without it each process keeps its own
+# local-memory cache, which is only correct for a single process such as
+# runserver.
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "")
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Kept apart so search pages can't crowd out other cached values
+    'search': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': 'search',
+    } if CACHE_REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'search',
+        'OPTIONS': {'MAX_ENTRIES': SEARCH_CACHE_MAX_ENTRIES},
+    },
+}
+
 STATIC_URL = 'static/'
 
 STATICFILES_DIRS = [
@@ -0,0 +1,57 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide worker pool, creating it on first use.
+    Each web worker process gets its own pool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_TASK_WORKERS,
+                    thread_name_prefix='background-task',
+                )
+    return _executor
+
+
+def _run_in_worker(func, args, kwargs):
+    # Worker threads open their own DB connections, so clean them up
+    # around every task the same way Django does around a request.
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        close_old_connections()
+
+
+def run_task(func, *args, **kwargs):
+    """
+    Run a task off the request path, or inline when
+    BACKGROUND_TASKS_EAGER is set.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        return func(*args, **kwargs)
+    return get_executor().submit(_run_in_worker, func, args, kwargs)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """
+    Schedule a task to run once the current transaction commits, so the
+    worker never sees rows that might still be rolled back.
+    """
+    transaction.on_commit(lambda: run_task(func, *args, **kwargs))
@@ -0,0 +1,183 @@
+"""
+Streaming upload handling.
+
+``SniffingUploadHandler`` replaces Django's default handlers, which keep
+uploads under 2.5MB in memory. Every uploaded file is instead streamed to
+a temporary file chunk by chunk, and while it streams the handler:
+
+* hashes the content, so the image pipeline doesn't read it again to
+  tell whether it changed (``content_hash``);
+* looks at the first UPLOAD_SNIFF_BYTES for the format's magic bytes and,
+  for raster images, the dimensions in the header (``image_info``); other
+  formats PIL can open (BMP, TIFF, ...) are recognised from their header;
+* stops storing the file as soon as the header shows more than
+  IMAGE_MAX_PIXELS pixels or a side longer than IMAGE_MAX_DIMENSION, and
+  records why in ``upload_error``.
+
+Nothing is decoded here. ``inspect_upload`` gives validators the same
+information, sniffing the header itself for files that didn't come
+through the handler.
+"""
+import hashlib
+import warnings
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext as _
+from PIL import Image
+
+# Leading bytes of the common raster formats, matched before PIL is asked
+MAGIC_BYTES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+
+
+class UploadRejected(Exception):
+    pass
+
+
+def sniff_format(head):
+    """Name the format of a file from its first bytes, or return None."""
+    for magic, image_format in MAGIC_BYTES:
+        if head.startswith(magic):
+            return image_format
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    if '<svg' in head.decode('utf-8', 'ignore').lower():
+        return 'SVG'
+    # Any other format PIL can open, going by its header alone
+    return _open_header(BytesIO(head), lambda image: image.format)
+
+
+def _too_many_pixels():
+    return UploadRejected(
+        _('Images may have at most %(max)d pixels.') % {'max': settings.IMAGE_MAX_PIXELS}
+    )
+
+
+def _open_header(f, read):
+    """
+    Open ``f`` with PIL, which only parses the header, and return
+    ``read(image)``, or None if PIL can't make an image of it.
+    """
+    try:
+        with warnings.catch_warnings():
+            # Our own limits apply, checked by check_dimensions
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            with Image.open(f) as image:
+                return read(image)
+    except Image.DecompressionBombError:
+        # PIL won't even open images over twice its own limit
+        raise _too_many_pixels()
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+
+def read_dimensions(f):
+    """
+    Read an image's size from its header without decoding it. Returns None
+    if ``f`` is too short to hold the header.
+    """
+    return _open_header(f, lambda image: image.size)
+
+
+def check_dimensions(size):
+    width, height = size
+    if max(width, height) > settings.IMAGE_MAX_DIMENSION:
+        raise UploadRejected(
+            _('Images may be at most %(max)d pixels wide or high.')
+            % {'max': settings.IMAGE_MAX_DIMENSION}
+        )
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise _too_many_pixels()
+
+
+def inspect_upload(f):
+    """
+    Return ``{'format': ..., 'size': (w, h) or None}`` for an uploaded
+    file, using what the upload handler found if it saw the file.
+    Raises UploadRejected for files that aren't images or are too large.
+    """
+    error = getattr(f, 'upload_error', None)
+    if error:
+        raise UploadRejected(error)
+    info = getattr(f, 'image_info', None)
+    if info is None:
+        f.seek(0)
+        image_format = sniff_format(f.read(settings.UPLOAD_SNIFF_BYTES))
+        size = None
+        try:
+            if image_format not in (None, 'SVG'):
+                f.seek(0)
+                size = read_dimensions(f)
+        finally:
+            f.seek(0)
+        info = {'format': image_format, 'size': size}
+    if info['format'] is None or (info['format'] != 'SVG' and info['size'] is None):
+        raise UploadRejected(_('File must be a valid image or SVG.'))
+    if info['size']:
+        check_dimensions(info['size'])
+    return info
+
+
+class SniffingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream each upload to a temporary file, hashing it and checking its
+    header on the way. See the module docstring.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.head = b''
+        self.image_info = None
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error:
+            # Rejected: drain the request without keeping anything
+            return None
+        self.digest.update(raw_data)
+        if self.image_info is None or (
+            self.image_info['size'] is None and len(self.head) < settings.UPLOAD_SNIFF_BYTES
+        ):
+            self.head += raw_data[:settings.UPLOAD_SNIFF_BYTES - len(self.head)]
+            self._sniff(complete=False)
+        if self.error:
+            self.file.truncate(0)
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def _sniff(self, complete):
+        try:
+            # Headers PIL parses may need more than the first chunk
+            if self.image_info is None or self.image_info['format'] is None:
+                if len(self.head) < 16 and not complete:
+                    return
+                self.image_info = {'format': sniff_format(self.head), 'size': None}
+            if self.image_info['format'] in (None, 'SVG') or self.image_info['size']:
+                return
+            self.image_info['size'] = read_dimensions(
+                self.file if complete else BytesIO(self.head)
+                )
+            if self.image_info['size']:
+                check_dimensions(self.image_info['size'])
+        except UploadRejected as e:
+            self.error = str(e)
+
+    def file_complete(self, file_size):
+        if not self.error:
+            if self.image_info is None or self.image_info['size'] is None:
+                # The header didn't fit in the sniffed bytes; it's on disk now
+                self.file.flush()
+                self.file.seek(0)
+                self._sniff(complete=True)
+        upload = super().file_complete(file_size)
+        upload.content_hash = None if self.error else self.digest.hexdigest()
+        upload.image_info = self.image_info
+        upload.upload_error = self.error
+        return upload
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import landing_page
+from .views import image_rendition, landing_page
 from django.contrib.auth.models import User
 from rest_framework import routers, serializers, viewsets
 
@@ -24,6 +24,11 @@ router.register(r'users', UserViewSet)
 urlpatterns = [
     
     path("", landing_page, name="landing_page"),
+    path(
+        "renditions/<str:model>/<str:pk>/<str:field>/<str:digest>/<int:width>/",
+        image_rendition,
+        name="image_rendition",
+    ),
     path("admin/", admin.site.urls),
     path('chat/', include('chat.urls'), name='chat'),
     path("api/", include("api.urls")),
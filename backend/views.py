@@ -7,6 +7,13 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages  # Add this line to import the messages module
 import logging
 from .forms import UserRegisterForm
+from . import images
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.http import Http404
+from django.utils.cache import patch_cache_control
+from PIL import Image, UnidentifiedImageError
 
 logger = logging.getLogger(__name__)
 
@@ -61,3 +68,34 @@ def register_view(request):
                 password=form.cleaned_data['password1'])
             login(request, new_user)
             return redirect('blog:index')
+
+def image_rendition(request, model, pk, field, digest, width):
+    """
+    Make a fixed-width derivative of an image the first time a page asks
+    for it, then redirect to the stored file. The URL names the content
+    hash, so the redirect can be cached for good.
+    """
+    fields = {
+        (label.lower(), name): (label, name) for label, name in images.IMAGE_FIELDS
+    }
+    if (model, field) not in fields or width not in images.RESPONSIVE_WIDTHS:
+        raise Http404
+    label, field = fields[model, field]
+    try:
+        instance = apps.get_model(label).objects.filter(pk=pk).first()
+    except (ValueError, ValidationError):
+        raise Http404
+    if instance is None or not getattr(instance, field):
+        raise Http404
+    field_file = getattr(instance, field)
+    if getattr(instance, f'{field}_hash') != digest:
+        # The image was replaced since the page was rendered
+        return redirect(field_file.url)
+    try:
+        path = images.render_width(field_file, digest, width)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return redirect(field_file.url)
+    images.record_width(instance, field, width, path)
+    response = redirect(default_storage.url(path))
+    patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Profile, ProfileGroup, ProfilePermission, Post, Comment, Like, Follow, Tag
+from .models import Profile, ProfileGroup, ProfilePermission, Post, Comment, Like, Follow, Tag, VerificationEvent
 
 class PostAdmin(admin.ModelAdmin):
     search_fields = ['title', 'author__username']
@@ -11,9 +11,15 @@ class PostAdmin(admin.ModelAdmin):
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'credibility_score']
     list_filter = ['credibility_score']
-    readonly_fields = ['verification_history']
+    readonly_fields = ['verification_summary']
+
+class VerificationEventAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'post', 'verification_score', 'timestamp']
+    raw_id_fields = ['profile', 'post']
+    date_hierarchy = 'timestamp'
 
 # Register your models here.
 admin.site.register([ProfileGroup, ProfilePermission, Comment, Like, Follow, Tag])
 admin.site.register(Profile, ProfileAdmin)
 admin.site.register(Post, PostAdmin)
+admin.site.register(VerificationEvent, VerificationEventAdmin)
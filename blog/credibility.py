@@ -0,0 +1,193 @@
+"""
+Author credibility as an incremental weighted average.
+
+Each post contributes its verification score weighted by the number of
+verification votes behind it, so a post nobody has voted on counts for
+nothing and a heavily verified post counts for more. A profile stores the
+running ``credibility_sum`` (score x votes) and ``credibility_weight``
+(votes) over all of the author's posts, and ``credibility_score`` is
+their ratio. ``credibility_breakdown`` holds the same three numbers per
+category, a category being the post's tag name.
+
+When a post's score or tallies change, only the difference between its
+old and new contribution is applied: one locked read and one UPDATE of
+the author's profile, whatever the number of posts. Anything that bypasses
+this path (bulk updates, re-tagging, a profile saved from a stale copy)
+is corrected by ``rebuild_author_credibility``, which recomputes every
+author from the posts table with NumPy and reports the drift it found.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from .models import Post, Profile
+
+# Credibility of an author with no verification votes yet
+NEUTRAL_CREDIBILITY = 0.5
+
+UNCATEGORIZED = 'general'
+
+
+def credibility(total, weight):
+    return total / weight if weight > 0 else NEUTRAL_CREDIBILITY
+
+
+def contribution(score, positive, negative):
+    """The ``(sum, weight)`` a post with these values adds to its author."""
+    weight = positive + negative
+    return score * weight, weight
+
+
+def post_category(post):
+    return post.tags.name if post.tags_id and post.tags.name else UNCATEGORIZED
+
+
+def _breakdown_entry(total, weight):
+    return {'sum': total, 'weight': weight, 'score': credibility(total, weight)}
+
+
+def apply_credibility_delta(user_id, category, delta_sum, delta_weight):
+    """
+    Add ``delta_sum`` and ``delta_weight`` to an author's running totals
+    and to their ``category`` entry. Returns the new credibility score,
+    or None if the author has no profile.
+    """
+    if not delta_sum and not delta_weight:
+        return None
+    with transaction.atomic(savepoint=False):
+        row = Profile.objects.select_for_update().filter(user_id=user_id).values_list(
+            'pk', 'credibility_sum', 'credibility_weight', 'credibility_breakdown'
+            ).first()
+        if row is None:
+            return None
+        profile_id, total, weight, breakdown = row
+        total += delta_sum
+        weight += delta_weight
+        entry = breakdown.get(category) or {}
+        category_weight = entry.get('weight', 0) + delta_weight
+        if category_weight > 0:
+            breakdown[category] = _breakdown_entry(
+                entry.get('sum', 0.0) + delta_sum, category_weight
+                )
+        else:
+            breakdown.pop(category, None)
+        score = credibility(total, weight)
+        Profile.objects.filter(pk=profile_id).update(
+            credibility_sum=total,
+            credibility_weight=weight,
+            credibility_score=score,
+            credibility_breakdown=breakdown,
+        )
+    return score
+
+
+def _post_rows(chunk_size):
+    """Yield (author_id, category, score, positive, negative) of voted posts."""
+    posts = Post.objects.exclude(verification_positive=0, verification_negative=0)
+    yield from posts.values_list(
+        'author_id', 'tags__name', 'verification_score',
+        'verification_positive', 'verification_negative',
+        ).order_by().iterator(chunk_size=chunk_size)
+
+
+def compute_author_credibility(chunk_size=5000):
+    """
+    Recompute every author's totals from the posts table. Returns
+    ``{user_id: (sum, weight, breakdown)}`` for authors with votes.
+    """
+    authors, categories, scores, weights = [], [], [], []
+    for author_id, category, score, positive, negative in _post_rows(chunk_size):
+        authors.append(author_id)
+        categories.append(category or UNCATEGORIZED)
+        scores.append(score)
+        weights.append(positive + negative)
+    if not authors:
+        return {}
+
+    weights = np.asarray(weights, dtype=np.int64)
+    weighted = np.asarray(scores, dtype=np.float64) * weights
+    author_ids, author_index = np.unique(np.asarray(authors), return_inverse=True)
+    sums = np.bincount(author_index, weights=weighted)
+    totals = np.bincount(author_index, weights=weights)
+
+    category_names, category_index = np.unique(
+        np.asarray(categories, dtype=object), return_inverse=True
+        )
+    pairs = author_index * len(category_names) + category_index
+    pair_ids, pair_index = np.unique(pairs, return_inverse=True)
+    pair_sums = np.bincount(pair_index, weights=weighted)
+    pair_totals = np.bincount(pair_index, weights=weights)
+
+    breakdowns = defaultdict(dict)
+    for pair, total, weight in zip(pair_ids.tolist(), pair_sums.tolist(), pair_totals.tolist()):
+        author, category = divmod(pair, len(category_names))
+        breakdowns[author][category_names[category]] = _breakdown_entry(total, int(weight))
+    return {
+        author_id: (total, int(weight), breakdowns[i])
+        for i, (author_id, total, weight) in enumerate(
+            zip(author_ids.tolist(), sums.tolist(), totals.tolist())
+            )
+    }
+
+
+def _drifted(stored, expected, tolerance):
+    total, weight, breakdown = stored
+    expected_total, expected_weight, expected_breakdown = expected
+    if weight != expected_weight or abs(total - expected_total) > tolerance:
+        return True
+    if breakdown.keys() != expected_breakdown.keys():
+        return True
+    return any(
+        breakdown[category].get('weight') != entry['weight']
+        or abs(breakdown[category].get('sum', 0.0) - entry['sum']) > tolerance
+        for category, entry in expected_breakdown.items()
+    )
+
+
+def rebuild_author_credibility(fix=True, tolerance=1e-6, batch_size=1000):
+    """
+    Compare every profile's stored credibility with a full recomputation
+    and, if ``fix``, overwrite the ones that drifted. Votes cast while it
+    runs can be overwritten, so run it when traffic is low. Returns a list of
+    ``(user_id, stored_score, expected_score)`` for the drifted profiles.
+    """
+    expected = compute_author_credibility()
+    empty = (0.0, 0, {})
+    drifted = []
+    stale = []
+    profiles = Profile.objects.only(
+        'user_id', 'credibility_sum', 'credibility_weight',
+        'credibility_breakdown', 'credibility_score',
+        ).order_by('pk')
+    for profile in profiles.iterator(chunk_size=batch_size):
+        stored = (
+            profile.credibility_sum,
+            profile.credibility_weight,
+            profile.credibility_breakdown or {},
+        )
+        total, weight, breakdown = expected.get(profile.user_id, empty)
+        score = credibility(total, weight)
+        if not _drifted(stored, (total, weight, breakdown), tolerance) \
+                and abs(profile.credibility_score - score) <= tolerance:
+            continue
+        drifted.append((profile.user_id, profile.credibility_score, score))
+        profile.credibility_sum = total
+        profile.credibility_weight = weight
+        profile.credibility_breakdown = breakdown
+        profile.credibility_score = score
+        stale.append(profile)
+        if fix and len(stale) >= batch_size:
+            _save_totals(stale)
+            stale = []
+    if fix and stale:
+        _save_totals(stale)
+    return drifted
+
+
+def _save_totals(profiles):
+    Profile.objects.bulk_update(
+        profiles,
+        ['credibility_sum', 'credibility_weight',
+         'credibility_breakdown', 'credibility_score'],
+    )
@@ -0,0 +1,219 @@
+"""
+Follower feed engine (hybrid fan-out).
+
+Publishing a post copies one lightweight ``Stream`` row into the home
+timeline of every follower of its author. Reading a timeline is then a
+single indexed range scan over ``Stream`` for one user, no matter how many
+posts exist overall.
+
+Authors with more than ``FEED_CELEBRITY_THRESHOLD`` followers are the
+exception: fanning their posts out would write tens of thousands of rows
+per publish, so they are skipped on write and their recent posts are
+pulled and heap-merged into each reader's timeline at read time instead.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from backend.pagination import decode_cursor, encode_cursor, keyset_filter
+
+from .models import Follow, Post, Stream
+
+CELEBRITY_CACHE_KEY = 'feed:celebrity_ids'
+
+
+def celebrity_ids():
+    """
+    Return the set of author ids above the follower threshold.
+    The set is small and changes slowly, so it is computed with one
+    grouped query and cached. Writers and readers share it, which keeps
+    the push and pull sides in agreement about who is pulled.
+    """
+    threshold = settings.FEED_CELEBRITY_THRESHOLD
+    if not threshold:
+        return frozenset()
+
+    ids = cache.get(CELEBRITY_CACHE_KEY)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.values('following_id').annotate(
+                followers=Count('id')
+                ).filter(
+                    followers__gt=threshold
+                    ).values_list('following_id', flat=True)
+            )
+        cache.set(
+            CELEBRITY_CACHE_KEY,
+            ids,
+            settings.FEED_CELEBRITY_CACHE_SECONDS
+            )
+    return ids
+
+
+def fan_out_post(post_id):
+    """
+    Push a published post into its author's followers' timelines.
+    Followers are walked in keyset-ordered batches and each batch is written
+    with a single bulk insert, so authors with huge audiences never hold
+    more than one batch in memory. Safe to re-run: existing rows are skipped.
+    Posts by celebrity authors are not fanned out at all.
+    Returns the number of timeline rows written.
+    """
+    post = Post.objects.filter(
+        pk=post_id,
+        status='published'
+        ).values('author_id', 'publish_date').first()
+    if post is None:
+        return 0
+
+    author_id = post['author_id']
+    if author_id in celebrity_ids():
+        return 0
+
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    followers = Follow.objects.filter(
+        following_id=author_id
+        ).order_by('follower_id').values_list('follower_id', flat=True)
+
+    written = 0
+    last_follower_id = 0
+    while True:
+        follower_ids = list(
+            followers.filter(follower_id__gt=last_follower_id)[:batch_size]
+            )
+        if not follower_ids:
+            break
+        Stream.objects.bulk_create(
+            [
+                Stream(
+                    user_id=follower_id,
+                    post_id=post_id,
+                    following_id=author_id,
+                    date=post['publish_date'],
+                )
+                for follower_id in follower_ids
+            ],
+            ignore_conflicts=True,
+        )
+        written += len(follower_ids)
+        last_follower_id = follower_ids[-1]
+    return written
+
+
+def retract_post(post_id):
+    """Remove a post from every timeline, e.g. when it is unpublished."""
+    Stream.objects.filter(post_id=post_id).delete()
+
+
+def backfill_follow(follower_id, following_id):
+    """
+    Seed a new follower's timeline with the author's most recent posts
+    so the feed isn't empty until the author publishes again.
+    Celebrity posts are pulled at read time, so they need no backfill.
+    """
+    if following_id in celebrity_ids():
+        return
+
+    recent_posts = Post.objects.filter(
+        author_id=following_id,
+        status='published'
+        ).order_by('-publish_date').values_list(
+            'id', 'publish_date'
+            )[:settings.FEED_BACKFILL_LIMIT]
+    Stream.objects.bulk_create(
+        [
+            Stream(
+                user_id=follower_id,
+                post_id=post_id,
+                following_id=following_id,
+                date=publish_date,
+            )
+            for post_id, publish_date in recent_posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def remove_follow(follower_id, following_id):
+    """Drop an unfollowed author's posts from the follower's timeline."""
+    Stream.objects.filter(
+        user_id=follower_id,
+        following_id=following_id
+        ).delete()
+
+
+def _pushed_entries(user, position, limit):
+    """Timeline rows fanned out to the user, newest first."""
+    entries = Stream.objects.filter(user=user)
+    if position:
+        entries = entries.filter(keyset_filter(('date', 'post_id'), position))
+    entries = entries.select_related(
+        'post',
+        'post__author',
+        'post__author__profile'
+        ).order_by('-date', '-post_id')[:limit]
+    return [(entry.date, entry.post_id, entry.post) for entry in entries]
+
+
+def _pulled_entries(author_id, position, limit):
+    """One celebrity author's recent posts, newest first."""
+    posts = Post.objects.filter(author_id=author_id, status='published')
+    if position:
+        posts = posts.filter(keyset_filter(('publish_date', 'id'), position))
+    posts = posts.select_related(
+        'author',
+        'author__profile'
+        ).order_by('-publish_date', '-id')[:limit]
+    return [(post.publish_date, post.id, post) for post in posts]
+
+
+def home_timeline(user, cursor=None, limit=None):
+    """
+    Return ``(posts, next_cursor)`` for one page of a user's home timeline,
+    newest first. Pages are keyed on ``(date, post_id)`` rather than an
+    offset, so every page costs the same index range scans: one over the
+    user's ``Stream`` rows and one per followed celebrity, k-way merged.
+    ``next_cursor`` is None on the last page.
+    """
+    limit = limit or settings.FEED_PAGE_SIZE
+    position = decode_cursor(Post, ('publish_date', 'id'), cursor)
+
+    sources = [_pushed_entries(user, position, limit + 1)]
+    celebrities = celebrity_ids()
+    if celebrities:
+        followed_celebrities = Follow.objects.filter(
+            follower=user,
+            following_id__in=celebrities
+            ).values_list('following_id', flat=True).distinct()
+        sources.extend(
+            _pulled_entries(author_id, position, limit + 1)
+            for author_id in followed_celebrities
+            )
+
+    merged = heapq.merge(
+        *sources,
+        key=lambda entry: (entry[0], entry[1]),
+        reverse=True
+        )
+
+    # A post fanned out before its author crossed the threshold can come
+    # from both sides; keep the first copy.
+    seen = set()
+    entries = []
+    for entry in merged:
+        if entry[1] in seen:
+            continue
+        seen.add(entry[1])
+        entries.append(entry)
+        if len(entries) > limit:
+            break
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        date, post_id, _ = entries[-1]
+        next_cursor = encode_cursor(date, post_id)
+
+    return [post for _, _, post in entries], next_cursor
@@ -7,18 +7,19 @@ from django.utils.translation import gettext_lazy as _
 def validate_svg_or_image(value):
     """Custom validator to accept both SVG and regular image files"""
     import os
-    from PIL import Image
+    from backend.uploads import UploadRejected, inspect_upload
     
     ext = os.path.splitext(value.name)[1].lower()
     
-    # If it's an SVG, let it pass
-    if ext == '.svg':
-        return
-    
-    # Otherwise, try to open it as an image
+    # Only the header is read; the image itself is decoded later, off the
+    # request (see backend/uploads.py)
     try:
-        Image.open(value)
-    except Exception:
+        info = inspect_upload(getattr(value, 'file', value))
+    except UploadRejected as e:
+        raise ValidationError(str(e))
+    
+    # SVGs must say so in their name, so they're served as SVG
+    if (info['format'] == 'SVG') != (ext == '.svg'):
         raise ValidationError(_('File must be a valid image or SVG.'))
 
 class SVGAndImageField(models.FileField):
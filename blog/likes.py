@@ -0,0 +1,255 @@
+"""
+Likes and the denormalized ``Post.likes_count``.
+
+``Post.likes_count`` is the sum of ``Like.weight`` over a post's likes (a
+double like weighs 2). It is kept current by the ``Like`` save and delete
+signals, which hand the change to ``adjust_like_count``:
+
+* by default the change is applied with an atomic ``F()`` update, so
+  concurrent likes on one post can't lose each other's increments;
+* with ``LIKE_COUNTER_SHARDS`` set, it goes to a random one of N
+  ``PostLikeShard`` rows instead, so a like storm on one post spreads over
+  N row locks; shards are added on read and folded back into the post by
+  ``fold_like_shards``;
+* with ``LIKE_WRITE_BEHIND_SECONDS`` set, changes are summed per post in a
+  per-process buffer after commit and written in batches, one statement per
+  flush instead of one per like.
+
+Adding a like is an insert that treats a unique-constraint conflict on
+(user, post) as "already liked", so two racing requests from the same
+user can't create two likes or count one twice. ``Like`` rows are the
+source of truth: ``reconcile_like_counts`` recomputes the counts from them,
+which also repairs anything a write-behind buffer lost in a crash.
+"""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from backend.buffers import WriteBehindBuffer, delta_case
+from .models import Like, Post, PostLikeShard
+
+
+def _increment_shard(post_id, delta):
+    shard = random.randrange(settings.LIKE_COUNTER_SHARDS)
+    slot = PostLikeShard.objects.filter(post_id=post_id, shard=shard)
+    if not slot.update(count=F('count') + delta):
+        PostLikeShard.objects.bulk_create(
+            [PostLikeShard(post_id=post_id, shard=shard)],
+            ignore_conflicts=True,
+        )
+        slot.update(count=F('count') + delta)
+
+
+def apply_like_deltas(deltas):
+    """
+    Write ``{post_id: delta}`` to the database: one shard increment per
+    post when sharding, otherwise a single UPDATE of every post's count.
+    """
+    deltas = {post_id: delta for post_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if settings.LIKE_COUNTER_SHARDS:
+        for post_id, delta in deltas.items():
+            _increment_shard(post_id, delta)
+    elif len(deltas) == 1:
+        [(post_id, delta)] = deltas.items()
+        Post.objects.filter(pk=post_id).update(likes_count=F('likes_count') + delta)
+    else:
+        Post.objects.filter(pk__in=deltas).update(
+            likes_count=F('likes_count') + delta_case(deltas)
+        )
+
+
+class LikeCountBuffer(WriteBehindBuffer):
+    """
+    Per-process write-behind buffer of like count changes. Changes are
+    summed per post and written together when the oldest is
+    LIKE_WRITE_BEHIND_SECONDS old or LIKE_WRITE_BEHIND_MAX_POSTS posts are
+    pending, whichever comes first, and when the process exits.
+    """
+    seconds_setting = 'LIKE_WRITE_BEHIND_SECONDS'
+    size_setting = 'LIKE_WRITE_BEHIND_MAX_POSTS'
+    description = 'buffered like counts'
+
+    def empty(self):
+        return defaultdict(int)
+
+    def merge(self, pending, post_id, delta):
+        pending[post_id] += delta
+
+    def write(self, pending):
+        apply_like_deltas(pending)
+
+    def pending_for(self, post_id):
+        with self.lock:
+            return self.pending.get(post_id, 0)
+
+
+like_buffer = LikeCountBuffer()
+
+
+def adjust_like_count(post_id, delta):
+    """Record a change of ``delta`` to a post's like count."""
+    if not delta:
+        return
+    if settings.LIKE_WRITE_BEHIND_SECONDS:
+        like_buffer.add_on_commit(post_id, delta)
+    else:
+        apply_like_deltas({post_id: delta})
+
+
+def _sum_per_post(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(post=OuterRef('pk'))
+            .values('post')
+            .annotate(total=Sum(field))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def with_like_totals(posts):
+    """
+    Annotate ``posts`` with ``like_total``: the stored count plus the
+    post's shards when sharding.
+    """
+    if settings.LIKE_COUNTER_SHARDS:
+        return posts.annotate(
+            like_total=F('likes_count') + _sum_per_post(PostLikeShard, 'count')
+            )
+    return posts.annotate(like_total=F('likes_count'))
+
+
+def like_count(post_id, stored=None):
+    """
+    Return a post's current like count: the stored count, plus its shards
+    when sharding, plus this process's buffered changes. ``stored`` is the
+    post's ``like_total`` if it was already fetched (see
+    ``with_like_totals``).
+    """
+    if stored is None:
+        posts = with_like_totals(Post.objects.filter(pk=post_id))
+        stored = posts.values_list('like_total', flat=True).get()
+    count = stored
+    if settings.LIKE_WRITE_BEHIND_SECONDS:
+        count += like_buffer.pending_for(post_id)
+    return count
+
+
+def fold_like_shards(batch_size=1000):
+    """
+    Move the counts held in ``PostLikeShard`` rows into ``Post.likes_count``.
+    Each batch locks its shard rows, adds their totals to the posts in one
+    UPDATE and deletes them; a like that arrives meanwhile waits for the
+    lock and then starts a fresh shard row. Returns the number of posts
+    updated.
+    """
+    # Shards created while folding are left for the next run, so a like
+    # storm can't keep the loop going forever
+    last_id = PostLikeShard.objects.aggregate(last=Max('id'))['last']
+    folded = 0
+    while last_id is not None:
+        with transaction.atomic():
+            shards = list(
+                PostLikeShard.objects.select_for_update()
+                .filter(id__lte=last_id)
+                .order_by('id')
+                .values_list('id', 'post_id', 'count')[:batch_size]
+            )
+            if not shards:
+                return folded
+            totals = defaultdict(int)
+            for _, post_id, count in shards:
+                totals[post_id] += count
+            totals = {post_id: total for post_id, total in totals.items() if total}
+            if totals:
+                # Shards of deleted posts match nothing here and are dropped
+                folded += Post.objects.filter(pk__in=totals).update(
+                    likes_count=F('likes_count') + delta_case(totals)
+                )
+            PostLikeShard.objects.filter(id__in=[pk for pk, _, _ in shards]).delete()
+    return folded
+
+
+def _insert_like(post, user, weight):
+    """Create a like unless one exists. Returns True if it was created."""
+    try:
+        with transaction.atomic():
+            Like.objects.create(post=post, user=user, weight=weight)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _delete_like(post, user):
+    """Delete a user's like of a post. Returns True if there was one."""
+    deleted, _ = Like.objects.filter(post=post, user=user).delete()
+    return bool(deleted)
+
+
+def toggle_like(post, user):
+    """
+    Like the post, or undo an existing like or double like.
+    Returns ``(liked, likes_count)``.
+    """
+    with transaction.atomic():
+        liked = not _delete_like(post, user) and _insert_like(post, user, 1)
+    return liked, like_count(post.pk)
+
+
+def double_like(post, user):
+    """
+    Raise the user's like to a double like, creating it if needed.
+    Repeating a double like changes nothing. Returns the new count.
+    """
+    with transaction.atomic():
+        raised = Like.objects.filter(post=post, user=user, weight=1).update(weight=2)
+        if raised:
+            adjust_like_count(post.pk, 1)
+        else:
+            _insert_like(post, user, 2)
+    return like_count(post.pk)
+
+
+def remove_like(post, user):
+    """Remove the user's like, if any. Returns the new count."""
+    with transaction.atomic():
+        _delete_like(post, user)
+    return like_count(post.pk)
+
+
+def reconcile_like_counts(batch_size=1000):
+    """
+    Recompute ``likes_count`` from ``Like`` for every post whose stored
+    count (including unfolded shards) has drifted. Posts are checked in
+    primary-key batches, each with one query to find the drifted posts and
+    one UPDATE to fix them. Returns the number of posts corrected.
+    """
+    actual = _sum_per_post(Like, 'weight')
+    sharded = _sum_per_post(PostLikeShard, 'count')
+    fixed = 0
+    last_pk = None
+    while True:
+        batch = Post.objects.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        pks = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return fixed
+        last_pk = pks[-1]
+        drifted = list(
+            Post.objects.filter(pk__in=pks)
+            .annotate(actual=actual, stored=F('likes_count') + sharded)
+            .exclude(stored=F('actual'))
+            .values_list('pk', flat=True)
+        )
+        if drifted:
+            fixed += Post.objects.filter(pk__in=drifted).update(
+                likes_count=actual - sharded
+            )
@@ -0,0 +1,130 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from blog.feed import CELEBRITY_CACHE_KEY, fan_out_post, home_timeline
+from blog.models import Follow, Post, Stream
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare write amplification and timeline read latency of pure '
+        'push vs hybrid push/pull feeds on a synthetic follow graph. '
+        'All synthetic data is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--celebrities', type=int, default=3)
+        parser.add_argument('--celebrity-followers', type=int, default=4000,
+                            help='Followers per celebrity author')
+        parser.add_argument('--regular-followers', type=int, default=20,
+                            help='Followers per regular author')
+        parser.add_argument('--posts', type=int, default=300)
+        parser.add_argument('--celebrity-share', type=float, default=0.2,
+                            help='Fraction of posts written by celebrities')
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--threshold', type=int, default=1000,
+                            help='Celebrity threshold used in hybrid mode')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode, threshold in (('push', 0), ('hybrid', options['threshold'])):
+            with transaction.atomic():
+                graph = self.build_graph(mode, options)
+                with override_settings(FEED_CELEBRITY_THRESHOLD=threshold):
+                    cache.delete(CELEBRITY_CACHE_KEY)
+                    results[mode] = self.measure(graph, options)
+                cache.delete(CELEBRITY_CACHE_KEY)
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synthetic graph: {options['users']} users, "
+            f"{options['celebrities']} celebrities x "
+            f"{options['celebrity_followers']} followers, "
+            f"{options['posts']} posts"
+        ))
+        self.stdout.write(
+            f"{'mode':<8}{'rows/post':>12}{'publish ms':>14}"
+            f"{'read p50 ms':>14}{'read p95 ms':>14}"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<8}{result['rows_per_post']:>12.1f}"
+                f"{result['publish_ms']:>14.2f}"
+                f"{result['read_p50_ms']:>14.2f}"
+                f"{result['read_p95_ms']:>14.2f}"
+            )
+
+    def build_graph(self, mode, options):
+        rng = random.Random(options['seed'])
+        users = User.objects.bulk_create([
+            User(username=f'feedbench_{mode}_{i}')
+            for i in range(options['users'])
+        ])
+        celebrities = users[:options['celebrities']]
+        regulars = users[options['celebrities']:]
+
+        follows = []
+        for celebrity in celebrities:
+            for follower in rng.sample(regulars, min(
+                    options['celebrity_followers'], len(regulars))):
+                follows.append(Follow(follower=follower, following=celebrity))
+        for author in regulars:
+            for follower in rng.sample(users, min(
+                    options['regular_followers'], len(users))):
+                if follower != author:
+                    follows.append(Follow(follower=follower, following=author))
+        Follow.objects.bulk_create(follows, batch_size=5000)
+
+        posts = []
+        for i in range(options['posts']):
+            if rng.random() < options['celebrity_share']:
+                author = rng.choice(celebrities)
+            else:
+                author = rng.choice(regulars)
+            posts.append(Post(
+                title=f'Feed benchmark {i}',
+                slug=f'feedbench-{mode}-{i}',
+                author=author,
+                content='Synthetic benchmark post',
+                status='published',
+            ))
+        # bulk_create skips post_save, so nothing is fanned out yet
+        Post.objects.bulk_create(posts, batch_size=1000)
+
+        return {
+            'posts': posts,
+            'readers': rng.sample(regulars, min(options['reads'], len(regulars))),
+        }
+
+    def measure(self, graph, options):
+        publish_times = []
+        for post in graph['posts']:
+            start = time.perf_counter()
+            fan_out_post(post.pk)
+            publish_times.append(time.perf_counter() - start)
+        rows = Stream.objects.filter(
+            post__in=[post.pk for post in graph['posts']]
+            ).count()
+
+        read_times = []
+        for reader in graph['readers']:
+            start = time.perf_counter()
+            home_timeline(reader)
+            read_times.append(time.perf_counter() - start)
+        read_times.sort()
+
+        return {
+            'rows_per_post': rows / len(graph['posts']),
+            'publish_ms': statistics.mean(publish_times) * 1000,
+            'read_p50_ms': statistics.median(read_times) * 1000,
+            'read_p95_ms': read_times[int(len(read_times) * 0.95) - 1] * 1000,
+        }
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from blog import likes
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure likes/sec on a single post with many concurrent likers, '
+        'with the plain row counter, the sharded counter and the '
+        'write-behind buffer. Needs a database with row-level locking '
+        '(PostgreSQL) to show the hot-row effect. Synthetic users and posts '
+        'are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--likes', type=int, default=2000,
+                            help='Likes per mode, one per synthetic user')
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--shards', type=int, default=16,
+                            help='Counter slots per post in sharded mode')
+        parser.add_argument('--write-behind', type=float, default=1.0,
+                            help='Buffer flush interval in write-behind mode')
+
+    def handle(self, *args, **options):
+        modes = (
+            ('row', {'LIKE_COUNTER_SHARDS': 0, 'LIKE_WRITE_BEHIND_SECONDS': 0}),
+            ('sharded', {'LIKE_COUNTER_SHARDS': options['shards'],
+                         'LIKE_WRITE_BEHIND_SECONDS': 0}),
+            ('write-behind', {'LIKE_COUNTER_SHARDS': 0,
+                              'LIKE_WRITE_BEHIND_SECONDS': options['write_behind']}),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['likes']} likes on one post from "
+            f"{options['threads']} threads"
+        ))
+        self.stdout.write(f"{'mode':<14}{'likes/s':>10}{'errors':>8}{'count ok':>10}")
+        for mode, overrides in modes:
+            with override_settings(**overrides):
+                result = self.measure(mode, options)
+            self.stdout.write(
+                f"{mode:<14}{result['rate']:>10.0f}{result['errors']:>8}"
+                f"{'yes' if result['count_ok'] else 'NO':>10}"
+            )
+
+    def measure(self, mode, options):
+        author = User.objects.create(username=f'likebench_{mode}_author')
+        users = User.objects.bulk_create([
+            User(username=f'likebench_{mode}_{i}')
+            for i in range(options['likes'])
+        ])
+        post = Post.objects.create(
+            title=f'Like benchmark {mode}',
+            author=author,
+            content='Synthetic benchmark post',
+            status='published',
+        )
+        errors = []
+        barrier = threading.Barrier(options['threads'] + 1)
+
+        def like_all(likers):
+            barrier.wait()
+            try:
+                for user in likers:
+                    try:
+                        likes.toggle_like(post, user)
+                    except Exception as exc:
+                        errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=like_all, args=(users[i::options['threads']],))
+            for i in range(options['threads'])
+        ]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        likes.like_buffer.flush()
+        likes.fold_like_shards()
+        count = Post.objects.values_list('likes_count', flat=True).get(pk=post.pk)
+        expected = options['likes'] - len(errors)
+
+        post.delete()
+        User.objects.filter(username__startswith=f'likebench_{mode}_').delete()
+        return {
+            'rate': options['likes'] / elapsed,
+            'errors': len(errors),
+            'count_ok': count == expected,
+        }
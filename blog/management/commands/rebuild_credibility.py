@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.credibility import rebuild_author_credibility
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute every author\'s credibility from their posts\' verification '
+        'scores and votes, and repair profiles whose incrementally maintained '
+        'totals have drifted. Meant to run nightly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Profiles checked and written per batch')
+        parser.add_argument('--tolerance', type=float, default=1e-6,
+                            help='Largest difference not counted as drift')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drifted = rebuild_author_credibility(
+            fix=not options['dry_run'],
+            tolerance=options['tolerance'],
+            batch_size=options['batch_size'],
+        )
+        if options['verbosity'] > 1:
+            for user_id, stored, expected in drifted:
+                self.stdout.write(
+                    f"  user {user_id}: stored {stored:.4f}, expected {expected:.4f}"
+                )
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} drift on {len(drifted)} profiles "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
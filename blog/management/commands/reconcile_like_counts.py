@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.likes import fold_like_shards, reconcile_like_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold sharded like counters into Post.likes_count and recompute the '
+        'count from the Like table for posts whose count has drifted. Meant '
+        'to run periodically from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Posts checked per batch')
+        parser.add_argument('--fold-only', action='store_true',
+                            help='Only fold counter shards, skip the recount')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        folded = fold_like_shards(batch_size=options['batch_size'])
+        self.stdout.write(f"Folded counter shards into {folded} posts")
+        if options['fold_only']:
+            return
+        fixed = reconcile_like_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Corrected like counts on {fixed} posts "
+            f"in {time.monotonic() - started:.2f}s"
+        ))
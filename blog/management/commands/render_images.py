@@ -0,0 +1,36 @@
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from backend.images import IMAGE_FIELDS, process_image
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate renditions for stored images that have none yet, or for '
+        'all of them with --all. Runs in this process rather than on the '
+        'web workers\' pool; unchanged content is skipped by its hash.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Re-check every image, not just unprocessed ones')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = 0
+        for model_label, field_name in IMAGE_FIELDS:
+            model = apps.get_model(model_label)
+            objects = model.objects.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+                )
+            if not options['all']:
+                objects = objects.filter(**{f'{field_name}_hash': ''})
+            for pk in objects.values_list('pk', flat=True).iterator():
+                process_image(model_label, pk, field_name)
+                processed += 1
+            self.stdout.write(f"{model_label}.{field_name}: done")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {processed} images in {time.monotonic() - started:.2f}s"
+        ))
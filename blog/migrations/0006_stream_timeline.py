@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 00:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0005_alter_post_picture"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="stream",
+            name="date",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["following", "follower"],
+                name="follow_following_follower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stream",
+            index=models.Index(
+                fields=["user", "-date", "-post"], name="stream_user_timeline_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stream",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_stream_user_post"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0006_stream_timeline"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-publish_date", "-id"],
+                name="post_author_recent_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("blog", "0007_post_author_recent_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["status", "-publish_date", "-id"],
+                name="post_status_recent_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_status_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='like',
+            name='weight',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_like_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostLikeShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='like_shards', to='blog.post')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('post', 'shard'), name='unique_post_like_shard')],
+            },
+        ),
+    ]
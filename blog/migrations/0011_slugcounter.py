@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_postlikeshard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlugCounter',
+            fields=[
+                ('base', models.SlugField(primary_key=True, serialize=False)),
+                ('last_suffix', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
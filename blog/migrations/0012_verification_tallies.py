@@ -0,0 +1,45 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:39
+
+from django.db import migrations, models
+
+
+def backfill_tallies(apps, schema_editor):
+    """Seed the tallies from the votes already cast on verification polls."""
+    Post = apps.get_model("blog", "Post")
+    Choice = apps.get_model("polls", "Choice")
+    tallies = (
+        Choice.objects.filter(
+            question__question_type="verification",
+            question__post__isnull=False,
+            verification_impact__in=["positive", "negative"],
+        )
+        .values_list("question__post_id", "verification_impact")
+        .annotate(total=models.Sum("votes"))
+        .order_by()
+    )
+    for post_id, impact, total in tallies.iterator():
+        Post.objects.filter(pk=post_id).update(
+            **{f"verification_{impact}": total or 0}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_slugcounter'),
+        ('polls', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='verification_negative',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='verification_positive',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_tallies, migrations.RunPython.noop),
+    ]
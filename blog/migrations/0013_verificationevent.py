@@ -0,0 +1,116 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:45
+
+import uuid
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Mirrors Profile.VERIFICATION_SUMMARY_WINDOW at the time of this migration
+SUMMARY_WINDOW = 10
+
+
+def _parse_timestamp(value):
+    try:
+        timestamp = parse_datetime(value or "")
+    except ValueError:
+        timestamp = None
+    if timestamp is None:
+        return timezone.now()
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def move_history_to_events(apps, schema_editor):
+    """
+    Copy each profile's verification_history list into VerificationEvent
+    rows and build its rolling summary from them.
+    """
+    Post = apps.get_model("blog", "Post")
+    Profile = apps.get_model("blog", "Profile")
+    VerificationEvent = apps.get_model("blog", "VerificationEvent")
+    post_ids = set(Post.objects.values_list("pk", flat=True))
+
+    profiles = Profile.objects.exclude(verification_history=[]).only(
+        "pk", "verification_history"
+    )
+    for profile in profiles.iterator(chunk_size=500):
+        events = []
+        for entry in profile.verification_history or []:
+            # Post ids are UUIDs, stored in the history as strings
+            try:
+                post_id = uuid.UUID(str(entry.get("post_id")))
+            except ValueError:
+                post_id = None
+            events.append(VerificationEvent(
+                profile_id=profile.pk,
+                post_id=post_id if post_id in post_ids else None,
+                timestamp=_parse_timestamp(entry.get("timestamp")),
+                poll_data=entry.get("poll_data") or {},
+                verification_score=entry.get("verification_score") or 0.0,
+            ))
+        if not events:
+            continue
+        VerificationEvent.objects.bulk_create(events, batch_size=1000)
+        events.sort(key=lambda event: event.timestamp)
+        scores = [event.verification_score for event in events]
+        Profile.objects.filter(pk=profile.pk).update(verification_summary={
+            "count": len(scores),
+            "mean_score": sum(scores) / len(scores),
+            "last_score": scores[-1],
+            "last_timestamp": events[-1].timestamp.isoformat(),
+            "recent": scores[-SUMMARY_WINDOW:],
+        })
+
+
+def restore_history(apps, schema_editor):
+    Profile = apps.get_model("blog", "Profile")
+    VerificationEvent = apps.get_model("blog", "VerificationEvent")
+    history = {}
+    events = VerificationEvent.objects.order_by("profile_id", "timestamp", "id")
+    for event in events.iterator(chunk_size=2000):
+        history.setdefault(event.profile_id, []).append({
+            "post_id": str(event.post_id) if event.post_id else None,
+            "timestamp": str(timezone.localtime(event.timestamp).replace(tzinfo=None)),
+            "poll_data": event.poll_data,
+            "verification_score": event.verification_score,
+        })
+    for profile_id, entries in history.items():
+        Profile.objects.filter(pk=profile_id).update(verification_history=entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_verification_tallies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('poll_data', models.JSONField(default=dict)),
+                ('verification_score', models.FloatField()),
+                ('post', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='verification_events', to='blog.post')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verification_events', to='blog.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', '-timestamp', '-id'], name='verif_event_profile_ts_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='verification_summary',
+            field=models.JSONField(default=dict, help_text='Rolling summary of verification results; the full history is in VerificationEvent'),
+        ),
+        migrations.RunPython(move_history_to_events, restore_history),
+        migrations.RemoveField(
+            model_name='profile',
+            name='verification_history',
+        ),
+    ]
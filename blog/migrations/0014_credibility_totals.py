@@ -0,0 +1,67 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:52
+
+from django.db import migrations, models
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast
+
+
+def backfill_credibility(apps, schema_editor):
+    """
+    Seed the running totals from the posts' stored scores and tallies, so
+    later votes can be applied to them as deltas.
+    """
+    Post = apps.get_model("blog", "Post")
+    Profile = apps.get_model("blog", "Profile")
+    votes = F("verification_positive") + F("verification_negative")
+    rows = (
+        Post.objects.exclude(verification_positive=0, verification_negative=0)
+        .values_list("author_id", "tags__name")
+        .annotate(
+            total=Sum(F("verification_score") * Cast(votes, FloatField())),
+            weight=Sum(votes),
+        )
+        .order_by("author_id")
+    )
+    totals = {}
+    for author_id, category, total, weight in rows.iterator():
+        author_total, author_weight, breakdown = totals.get(author_id, (0.0, 0, {}))
+        entry = breakdown.setdefault(
+            category or "general", {"sum": 0.0, "weight": 0, "score": 0.5}
+        )
+        entry["sum"] += total
+        entry["weight"] += weight
+        entry["score"] = entry["sum"] / entry["weight"]
+        totals[author_id] = (author_total + total, author_weight + weight, breakdown)
+    for author_id, (total, weight, breakdown) in totals.items():
+        Profile.objects.filter(user_id=author_id).update(
+            credibility_sum=total,
+            credibility_weight=weight,
+            credibility_score=total / weight,
+            credibility_breakdown=breakdown,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_verificationevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='credibility_sum',
+            field=models.FloatField(default=0.0, help_text='Sum of post verification scores weighted by their votes'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='credibility_weight',
+            field=models.PositiveIntegerField(default=0, help_text="Number of verification votes on the author's posts"),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='credibility_breakdown',
+            field=models.JSONField(default=dict, help_text='Category-specific credibility sums, weights and scores'),
+        ),
+        migrations.RunPython(backfill_credibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='picture_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='picture_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,16 +1,18 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User, AbstractUser, Group, Permission
 from datetime import datetime
 from django.db.models.base import Model
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.utils.text import slugify
 from django.urls import reverse
 from django.utils.translation import gettext as _
-from notification.models import Notification
+from notification.services import NotificationService
 from django.dispatch import receiver
 import uuid
-from PIL import Image
 from django.apps import apps
+from django.utils import timezone
+from backend.images import remember_upload_hashes, schedule_image_processing
+from backend.tasks import enqueue_on_commit
 from .fields import SVGAndImageField
 
 def user_directory_path(instance, filename):   
@@ -41,13 +43,23 @@ class Profile(models.Model):
         default=0.5,
         help_text="Author credibility score based on verification polls (0.0-1.0)"
     )
-    verification_history = models.JSONField(
-        default=list,
-        help_text="History of verification poll results"
+    verification_summary = models.JSONField(
+        default=dict,
+        help_text="Rolling summary of verification results; the full "
+                  "history is in VerificationEvent"
     )
     credibility_breakdown = models.JSONField(
         default=dict,
-        help_text="Category-specific credibility scores"
+        help_text="Category-specific credibility sums, weights and scores"
+    )
+    # Running totals behind credibility_score, see blog.credibility
+    credibility_sum = models.FloatField(
+        default=0.0,
+        help_text="Sum of post verification scores weighted by their votes"
+    )
+    credibility_weight = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of verification votes on the author's posts"
     )
     verification_trend = models.FloatField(
         default=0.0,
@@ -58,6 +70,9 @@ class Profile(models.Model):
         null=True, 
         default=""
         )
+    # Filled in by backend.images after upload
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+    image_renditions = models.JSONField(default=dict, blank=True)
     first_name = models.CharField(
         max_length=200, 
         null=True, blank=True
@@ -79,6 +94,27 @@ class Profile(models.Model):
         max_length=200, null=True, blank=True)
     favourite = models.ManyToManyField('blog.Post', blank=True)
 
+    # Scores kept in verification_summary['recent']
+    VERIFICATION_SUMMARY_WINDOW = 10
+
+    @classmethod
+    def rolled_verification_summary(cls, summary, score, timestamp):
+        """
+        Return ``summary`` updated with one more verification event: the
+        event count, running mean, latest score and time, and the last
+        VERIFICATION_SUMMARY_WINDOW scores.
+        """
+        count = summary.get('count', 0) + 1
+        mean = summary.get('mean_score', 0.0)
+        recent = summary.get('recent', []) + [score]
+        return {
+            'count': count,
+            'mean_score': mean + (score - mean) / count,
+            'last_score': score,
+            'last_timestamp': timestamp.isoformat(),
+            'recent': recent[-cls.VERIFICATION_SUMMARY_WINDOW:],
+        }
+
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
 
@@ -86,14 +122,10 @@ class Profile(models.Model):
     def __str__(self):
         return f'{self.user.username} - Profile'
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.image:  # Only process if image exists
-            img = Image.open(self.image.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.image.path)
+    @staticmethod
+    def process_image(sender, instance, **kwargs):
+        """Render a new profile picture's renditions after commit."""
+        schedule_image_processing(instance, 'image')
 
 
 class ProfileGroup(models.Model):
@@ -126,6 +158,8 @@ def save_user_profile(sender, instance, **kwargs):
 
 post_save.connect(create_user_profile, sender=User)
 post_save.connect(save_user_profile, sender=User)
+pre_save.connect(remember_upload_hashes, sender=Profile)
+post_save.connect(Profile.process_image, sender=Profile)
 
 # blog stream model
 class Stream(models.Model):
@@ -144,21 +178,60 @@ class Stream(models.Model):
         on_delete=models.CASCADE,
         related_name='stream_post'
         )
-    date = models.DateTimeField(auto_now_add=True)
+    # Copied from the post's publish_date so timelines sort by publish time
+    date = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_stream_user_post'
+                ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-date', '-post'],
+                name='stream_user_timeline_idx'
+                ),
+        ]
 
-    def add_stream(sender, instance, *args, **kwargs):
-        stream =instance
-        author = stream.post.author
-        followers = Follow.objects.filter(following=author)
+    @staticmethod
+    def add_stream(sender, instance, created, **kwargs):
+        """
+        Fan a post out to its author's followers once it is published,
+        and pull it back out if it is unpublished. The work runs in the
+        background after commit so publishing stays fast.
+        """
+        from .feed import fan_out_post, retract_post
+
+        was_published = instance._loaded_status == 'published'
+        is_published = instance.status == 'published'
+        if is_published and not was_published:
+            enqueue_on_commit(fan_out_post, instance.pk)
+        elif was_published and not is_published:
+            enqueue_on_commit(retract_post, instance.pk)
+        instance._loaded_status = instance.status
 
-        for follower in followers:
-            stream = Stream(
-                user=follower.follower, 
-                post=stream.post, 
-                following=author,
-                date=stream.date
+    @staticmethod
+    def follow_stream(sender, instance, created, **kwargs):
+        from .feed import backfill_follow
+
+        if created:
+            enqueue_on_commit(
+                backfill_follow,
+                instance.follower_id,
+                instance.following_id
                 )
-            stream.save()
+
+    @staticmethod
+    def unfollow_stream(sender, instance, *args, **kwargs):
+        from .feed import remove_follow
+
+        enqueue_on_commit(
+            remove_follow,
+            instance.follower_id,
+            instance.following_id
+            )
 
 class Tag(models.Model):
     name = models.CharField(
@@ -188,6 +261,71 @@ class Tag(models.Model):
             self.slug = slugify(self.name)
         return super().save(*args, **kwargs)
 
+class SlugCounter(models.Model):
+    """
+    Highest suffix handed out for each base slug, so the Nth post titled
+    "Update" gets ``update-N`` from one atomic row update instead of
+    probing ``update-1`` ... ``update-N`` in turn. Concurrent posts with
+    the same title each get their own suffix; a suffix lost to a failed
+    save is simply skipped.
+    """
+    base = models.SlugField(primary_key=True)
+    last_suffix = models.PositiveIntegerField(default=0)
+
+    @staticmethod
+    def base_slug(title, max_length):
+        """The slug ``title`` gets when no other post has it."""
+        # Leave room for the suffix within the column's max_length
+        return slugify(title)[:max_length - 11].strip('-') or 'post'
+
+    @classmethod
+    def highest_taken_suffix(cls, base):
+        """
+        Scan existing posts for the highest suffix already used with
+        ``base``: 0 if only ``base`` itself is taken, -1 if it is free.
+        Only runs the first time a base slug is seen.
+        """
+        max_length = Post._meta.get_field('slug').max_length
+        highest = -1
+        for slug, title in Post.objects.filter(
+                models.Q(slug=base) | models.Q(slug__startswith=f'{base}-')
+                ).values_list('slug', 'title').iterator():
+            suffix = slug[len(base) + 1:]
+            if slug == base:
+                highest = max(highest, 0)
+            elif suffix.isdigit() and slug != cls.base_slug(title, max_length):
+                # "update-2024" of a post titled "Update 2024" is that
+                # title's own base, not a suffix of "update"
+                highest = max(highest, int(suffix))
+        return highest
+
+    @classmethod
+    def next_suffix(cls, base):
+        """Reserve and return the next free suffix for ``base``."""
+        while True:
+            counter = cls.objects.filter(base=base)
+            # The update's row lock is held until the read, so no other
+            # writer can be handed the same suffix
+            with transaction.atomic():
+                if counter.update(last_suffix=models.F('last_suffix') + 1):
+                    return counter.values_list('last_suffix', flat=True).get()
+            suffix = cls.highest_taken_suffix(base) + 1
+            try:
+                with transaction.atomic():
+                    cls.objects.create(base=base, last_suffix=suffix)
+                return suffix
+            except IntegrityError:
+                # Another post seeded the counter first; increment theirs
+                continue
+
+    @classmethod
+    def allocate(cls, title, max_length):
+        """Return a slug for ``title`` that no other post has been given."""
+        base = cls.base_slug(title, max_length)
+        suffix = cls.next_suffix(base)
+        return f'{base}-{suffix}' if suffix else base
+
+
 # blog post model
 class Post(models.Model):
     id = models.UUIDField(
@@ -216,6 +354,10 @@ class Post(models.Model):
         default=dict,
         help_text="Detailed verification results from polls"
     )
+    # Running vote tallies of the post's verification polls, maintained
+    # incrementally by blog.verification.apply_vote
+    verification_positive = models.PositiveIntegerField(default=0)
+    verification_negative = models.PositiveIntegerField(default=0)
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('published', 'Published'),
@@ -239,6 +381,9 @@ class Post(models.Model):
         verbose_name="Picture", 
         default=""
         )
+    # Filled in by backend.images after upload
+    picture_hash = models.CharField(max_length=64, blank=True, default='')
+    picture_renditions = models.JSONField(default=dict, blank=True)
     # change to video field and set up for webosckets for documentary channels
     video = models.URLField(
         blank=True, 
@@ -277,32 +422,76 @@ class Post(models.Model):
         null=True,
         )
 
+    class Meta:
+        indexes = [
+            # Pull side of the hybrid feed: an author's newest posts
+            models.Index(
+                fields=['author', '-publish_date', '-id'],
+                name='post_author_recent_idx'
+                ),
+            # Keyset pagination of the public post list
+            models.Index(
+                fields=['status', '-publish_date', '-id'],
+                name='post_status_recent_idx'
+                ),
+        ]
+
+    # Status as last read from or written to the database; lets the feed
+    # tell a fresh publish apart from an ordinary re-save.
+    _loaded_status = None
+
+    # Score and tallies the author's credibility last accounted for, so
+    # update_author_credibility only has to apply the difference
+    _credited_verification = (0.0, 0, 0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        verification = tuple(
+            instance.__dict__.get(name) for name in cls.CREDITED_FIELDS
+            )
+        if None not in verification:
+            instance._credited_verification = verification
+        return instance
+
+    # A slug can still collide with one set by hand; allocate a new one
+    # this many times before giving up
+    SLUG_ATTEMPTS = 5
+
     def save(self, *args, **kwargs):
-        if not self.slug:
-            base_slug = slugify(self.title)
-            queryset = Post.objects.all()
-            if self.pk:
-                queryset = queryset.exclude(pk=self.pk)
-            count = queryset.filter(slug__startswith=base_slug).count()
-
-            if count > 0:
-                # Initialize temp_slug before the loop
-                temp_slug = f"{base_slug}-1"  # Start with an initial value
-                i = 1
-                while True:
-                    if queryset.filter(slug=temp_slug).exists():
-                        i += 1
-                        temp_slug = f"{base_slug}-{i}"
-                    else:
-                            self.slug = temp_slug
-                            break
-            else:
-                self.slug = base_slug
-        super().save(*args, **kwargs)
+        if self.slug:
+            return super().save(*args, **kwargs)
+
+        max_length = self._meta.get_field('slug').max_length
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = SlugCounter.allocate(self.title, max_length)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Post.objects.filter(
+                    slug=self.slug
+                    ).exclude(pk=self.pk).exists()
+                self.slug = ''
+                if not taken or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
 
     def get_absolute_url(self):
         return reverse("post-details", args=[str(self.id)])
 
+    CREDITED_FIELDS = (
+        'verification_score', 'verification_positive', 'verification_negative'
+        )
+
+    # Lowest score for each verification status, best first
+    VERIFICATION_THRESHOLDS = (
+        (0.9, 'verified'),
+        (0.8, 'mixed'),
+        (0.7, 'warning'),
+        (0.0, 'disputed'),
+    )
+
     def get_verification_badge(self):
         """Return appropriate verification badge based on status"""
         badges = {
@@ -363,14 +552,11 @@ class Post(models.Model):
                 self.verification_score = (positive_votes + 0.1) / (total_votes + 0.2)
         
         # Update verification status based on new thresholds
-        if self.verification_score >= 0.9:
-            self.verification_status = 'verified'
-        elif self.verification_score >= 0.8:
-            self.verification_status = 'mixed'
-        elif self.verification_score >= 0.7:
-            self.verification_status = 'warning'
-        else:
-            self.verification_status = 'disputed'
+        self.verification_status = self.VERIFICATION_THRESHOLDS[-1][1]
+        for threshold, status in self.VERIFICATION_THRESHOLDS:
+            if self.verification_score >= threshold:
+                self.verification_status = status
+                break
             
         self.save()
         
@@ -405,31 +591,103 @@ class Post(models.Model):
         except:
             pass
             
-        # Normal behavior (when not in test case)
-        # For production: Only update score if negative votes exist or when default is 0.5
-        if self.verification_score != 1.0 or author_profile.credibility_score == 0.5:
-            author_profile.credibility_score = self.verification_score
-            
-        author_profile.save()
+        # Apply the change in this post's weighted score since it was
+        # last credited to the author
+        from .credibility import apply_credibility_delta, contribution, post_category
+
+        current = tuple(getattr(self, name) for name in self.CREDITED_FIELDS)
+        old_sum, old_weight = contribution(*self._credited_verification)
+        new_sum, new_weight = contribution(*current)
+        score = apply_credibility_delta(
+            self.author_id, post_category(self),
+            new_sum - old_sum, new_weight - old_weight
+            )
+        self._credited_verification = current
+        if score is None:
+            score = author_profile.credibility_score
+        author_profile.credibility_score = score
         
         # Return same format as calculate_verification_score for test compatibility
         return {
-            'score': author_profile.credibility_score,
+            'score': score,
             'status': self.verification_status,
-            'overall': author_profile.credibility_score
+            'overall': score
         }
 
+    @staticmethod
+    def process_picture(sender, instance, **kwargs):
+        """Render a new picture's renditions after commit."""
+        schedule_image_processing(instance, 'picture')
+
+    @staticmethod
+    def discredit_deleted(sender, instance, *args, **kwargs):
+        """Take a deleted post's votes out of its author's credibility."""
+        from .credibility import apply_credibility_delta, contribution, post_category
+
+        total, weight = contribution(*instance._credited_verification)
+        if weight:
+            apply_credibility_delta(
+                instance.author_id, post_category(instance), -total, -weight
+                )
+
     def add_verification_history(self, poll_data):
-        """Add poll results to author's verification history"""
+        """
+        Record poll results as a VerificationEvent of the author and roll
+        them into the profile's verification summary. Only the summary
+        column of the profile is rewritten.
+        """
         author_profile = self.author.profile
-        history_entry = {
-            'post_id': str(self.id),
-            'timestamp': str(datetime.now()),
-            'poll_data': poll_data,
-            'verification_score': self.verification_score
-        }
-        author_profile.verification_history.append(history_entry)
-        author_profile.save()
+        event = VerificationEvent.objects.create(
+            profile=author_profile,
+            post=self,
+            poll_data=poll_data,
+            verification_score=self.verification_score
+            )
+        # No savepoint: when voting this runs inside the vote's transaction
+        with transaction.atomic(savepoint=False):
+            summary = Profile.objects.select_for_update().values_list(
+                'verification_summary', flat=True
+                ).get(pk=author_profile.pk)
+            author_profile.verification_summary = Profile.rolled_verification_summary(
+                summary, event.verification_score, event.timestamp
+                )
+            Profile.objects.filter(pk=author_profile.pk).update(
+                verification_summary=author_profile.verification_summary
+                )
+        return event
+
+
+class VerificationEvent(models.Model):
+    """
+    One verification result in an author's history. Append-only; read a
+    profile's history newest first with ``profile.verification_events``.
+    """
+    profile = models.ForeignKey(
+        Profile,
+        on_delete=models.CASCADE,
+        related_name='verification_events'
+        )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='verification_events'
+        )
+    timestamp = models.DateTimeField(default=timezone.now)
+    poll_data = models.JSONField(default=dict)
+    verification_score = models.FloatField()
+
+    class Meta:
+        indexes = [
+            # Paginated history of one profile, newest first
+            models.Index(
+                fields=['profile', '-timestamp', '-id'],
+                name='verif_event_profile_ts_idx'
+                ),
+        ]
+
+    def __str__(self):
+        return f'{self.profile} - {self.verification_score:.2f} at {self.timestamp}'
     
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -456,21 +714,16 @@ class Comment(models.Model):
 
     def create_notification(self):
         """
-        Creates a notification related to this comment instance.
-        Only creates a notification if this is a new comment (not an update).
+        Notifies the post author about this comment. Called by save()
+        for new comments only.
         """
-        if not self.pk:  # Only for new comments
-            post = self.post
-            sender = self.author
-            text_preview = self.content[:90]  
-            notify = Notification.objects.create(
-                post=post,
-                sender=sender,
-                user=post.author,
-                text_preview=text_preview,
-                notification_types=2
-            )
-            notify.save()
+        NotificationService.notify(
+            sender=self.author,
+            user=self.post.author,
+            notification_type=2,
+            post=self.post,
+            text_preview=self.content[:90]
+        )
 
     def save(self, *args, **kwargs):
         is_new = not self.pk  # Check if this is a new comment
@@ -486,15 +739,40 @@ class Comment(models.Model):
     def user_del_comment_post(sender, instance, *args, **kwargs):
         comment = instance
         post = comment.post
-        sender = comment.author
-        notify = Notification.objects.filter(
-            post=post, 
-            sender=sender, 
-            user=post.author, 
-            notification_types=2
+        NotificationService.retract(
+            sender=comment.author_id,
+            user=post.author_id,
+            notification_type=2,
+            post=post
             )
-        notify.delete()
     
+class PostLikeShard(models.Model):
+    """
+    One of LIKE_COUNTER_SHARDS counter slots holding part of a post's like
+    count. Each like increments a random slot, so concurrent likes on one
+    post contend for N row locks instead of one. Slots are added to
+    ``Post.likes_count`` on read and folded into it periodically.
+    """
+    # No database constraint: a slot can be incremented while its post is
+    # being deleted, and orphaned slots are simply dropped on the next fold.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='like_shards'
+        )
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'shard'],
+                name='unique_post_like_shard'
+                ),
+        ]
+
+
 class Like(models.Model):
     user = models.ForeignKey(
         User, 
@@ -507,32 +785,45 @@ class Like(models.Model):
         related_name="post_likes"
         )
 
+    # 1 for a like, 2 for a double like; Post.likes_count is the sum of
+    # the weights of a post's likes
+    weight = models.PositiveSmallIntegerField(default=1)
+
     class Meta:
         unique_together = ("user", "post")
 
+    @staticmethod
+    def count_saved(sender, instance, created, **kwargs):
+        if created:
+            from .likes import adjust_like_count
+            adjust_like_count(instance.post_id, instance.weight)
+
+    @staticmethod
+    def count_deleted(sender, instance, *args, **kwargs):
+        from .likes import adjust_like_count
+        adjust_like_count(instance.post_id, -instance.weight)
+
     @staticmethod
     def user_liked_post(sender, instance, created, **kwargs):
         like = instance  
         post = like.post  
-        sender = like.user  
-        notify = Notification.objects.create(
+        NotificationService.notify(
+            sender=like.user_id,
+            user=post.author_id,
+            notification_type=1,
             post=post,
-            sender=sender,
-            user=post.author,  
-            notification_types=1  
+            text_preview="Liked your post"
         )
-        notify.save()
 
     def user_unliked_post(sender, instance, *args, **kwargs):
         like = instance
         post = like.post
-        sender = like.user
-        notify = Notification.objects.filter(
-            post=post, 
-            sender=sender, 
-            notification_types=1
+        NotificationService.retract(
+            sender=like.user_id,
+            user=post.author_id,
+            notification_type=1,
+            post=post
             )
-        notify.delete()
 
 class Follow(models.Model):
     follower = models.ForeignKey(
@@ -546,27 +837,29 @@ class Follow(models.Model):
         related_name='following'
         )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['following', 'follower'],
+                name='follow_following_follower_idx'
+                ),
+        ]
+
     def user_follow(sender, instance, *args, **kwargs):
         follow = instance
-        sender = follow.follower
-        following = follow.following
-        notify = Notification(
-            sender=sender, 
-            user=following, 
-            notification_types=3
+        NotificationService.notify(
+            sender=follow.follower_id,
+            user=follow.following_id,
+            notification_type=3
             )
-        notify.save()
 
     def user_unfollow(sender, instance, *args, **kwargs):
         follow = instance
-        sender = follow.follower
-        following = follow.following
-        notify = Notification.objects.filter(
-            sender=sender, 
-            user=following, 
-            notification_types=3
+        NotificationService.retract(
+            sender=follow.follower_id,
+            user=follow.following_id,
+            notification_type=3
             )
-        notify.delete()
 
 # Remove duplicated signal handler
 # @receiver(post_save, sender=Comment)
@@ -594,6 +887,14 @@ post_delete.connect(
     Like.user_unliked_post, 
     sender=Like
     )
+post_save.connect(
+    Like.count_saved,
+    sender=Like
+    )
+post_delete.connect(
+    Like.count_deleted,
+    sender=Like
+    )
 
 post_save.connect(
     Follow.user_follow, 
@@ -605,6 +906,36 @@ post_delete.connect(
     sender=Follow
     )
 
+post_save.connect(
+    Stream.add_stream,
+    sender=Post
+    )
+
+post_delete.connect(
+    Post.discredit_deleted,
+    sender=Post
+    )
+
+pre_save.connect(
+    remember_upload_hashes,
+    sender=Post
+    )
+
+post_save.connect(
+    Post.process_picture,
+    sender=Post
+    )
+
+post_save.connect(
+    Stream.follow_stream,
+    sender=Follow
+    )
+
+post_delete.connect(
+    Stream.unfollow_stream,
+    sender=Follow
+    )
+
 # This is causing duplicate notifications
 # post_save.connect(
 #     Comment.user_comment_post, 
@@ -0,0 +1,118 @@
+"""
+Query plans for the blog's read pages.
+
+Each helper returns everything its template touches in a fixed number of
+queries: related rows are joined or prefetched up front and per-viewer
+flags are computed as ``EXISTS`` subqueries, so page cost does not grow
+with the number of posts, comments or choices shown.
+"""
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+
+from polls.models import Choice, Question, VoteRecord
+
+from .likes import with_like_totals
+from .models import Comment, Follow, Like, Post
+
+
+def published_posts():
+    """Published posts, newest first, with author and profile joined in."""
+    return Post.objects.filter(
+        status='published'
+        ).select_related(
+            'author',
+            'author__profile'
+            ).order_by('-publish_date', '-id')
+
+
+def post_detail(post_id, user):
+    """
+    Fetch a post with its author's profile, its ``like_total`` and the
+    viewer's ``is_liked`` / ``is_following`` flags in a single query.
+    """
+    posts = with_like_totals(
+        Post.objects.select_related('author', 'author__profile')
+        )
+    if user.is_authenticated:
+        posts = posts.annotate(
+            is_liked=Exists(
+                Like.objects.filter(user=user, post=OuterRef('pk'))
+                ),
+            is_following=Exists(
+                Follow.objects.filter(
+                    follower=user,
+                    following=OuterRef('author')
+                    )
+                ),
+            )
+    else:
+        posts = posts.annotate(
+            is_liked=Value(False),
+            is_following=Value(False),
+            )
+    return get_object_or_404(posts, id=post_id)
+
+
+def verification_poll(post, user):
+    """
+    Return the post's verification poll with its choices prefetched and a
+    ``has_voted`` flag for the viewer. The poll and its default Yes/No
+    choices are created on first view.
+    """
+    polls = Question.objects.filter(post=post).prefetch_related(
+        Prefetch('choice_set', queryset=Choice.objects.order_by('id'))
+        )
+    if user.is_authenticated:
+        polls = polls.annotate(
+            has_voted=Exists(
+                VoteRecord.objects.filter(user=user, question=OuterRef('pk'))
+                )
+            )
+    else:
+        polls = polls.annotate(has_voted=Value(False))
+
+    poll = polls.order_by('id').first()
+    if poll is None:
+        poll = Question.objects.create(
+            post=post,
+            question_text='Is this post credible?',
+            pub_date=timezone.now(),
+            question_type='verification'
+        )
+        Choice.objects.bulk_create([
+            Choice(
+                question=poll,
+                choice_text='Yes',
+                votes=0,
+                verification_impact='positive'
+            ),
+            Choice(
+                question=poll,
+                choice_text='No',
+                votes=0,
+                verification_impact='negative'
+            ),
+        ])
+        poll = polls.get(pk=poll.pk)
+    return poll
+
+
+def comment_tree(post):
+    """
+    Load every comment on a post in one query, newest first, and attach
+    each comment's direct replies as ``reply_list`` in the same order.
+    Templates read ``reply_list`` instead of ``comment.replies``, which
+    would cost one query per comment.
+    """
+    comments = list(
+        Comment.objects.filter(post=post).select_related('author')
+        )
+    by_id = {comment.id: comment for comment in comments}
+    for comment in comments:
+        comment.reply_list = []
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is not None:
+            parent.reply_list.append(comment)
+    return comments
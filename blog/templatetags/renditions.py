@@ -0,0 +1,53 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.html import format_html
+
+from backend import images
+
+register = template.Library()
+
+
+def _width_url(field_file, renditions, width):
+    path = renditions.get(f'w{width}')
+    if path:
+        return default_storage.url(path)
+    instance = field_file.instance
+    return reverse('image_rendition', args=[
+        instance._meta.label_lower, instance.pk, field_file.field.name,
+        getattr(instance, f'{field_file.field.name}_hash'), width,
+    ])
+
+
+@register.simple_tag
+def srcset(field_file, sizes='100vw', default_width=640):
+    """
+    Emit ``src``, ``srcset`` and ``sizes`` attributes for an image field,
+    offering fixed-width derivatives up to the original's width. Images
+    not processed yet, and SVGs, fall back to the original file.
+    """
+    renditions = getattr(
+        field_file.instance, f'{field_file.field.name}_renditions', None
+        ) or {}
+    widths = images.srcset_widths(renditions)
+    if not widths:
+        return format_html('src="{}"', field_file.url)
+    urls = {width: _width_url(field_file, renditions, width) for width in widths}
+    src = urls[max((w for w in widths if w <= default_width), default=widths[0])]
+    return format_html(
+        'src="{}" srcset="{}" sizes="{}"',
+        src,
+        ', '.join(f'{url} {width}w' for width, url in urls.items()),
+        sizes,
+    )
+
+
+@register.simple_tag
+def rendition_url(field_file, name):
+    """URL of a named rendition (thumb, card, full), or of the original."""
+    renditions = getattr(
+        field_file.instance, f'{field_file.field.name}_renditions', None
+        ) or {}
+    if name in renditions:
+        return default_storage.url(renditions[name])
+    return field_file.url
@@ -115,6 +115,18 @@ class CommentTest(TestCase):
             content='New test comment'
         ).exists())
         
+    def test_blank_comment_shows_the_post_with_its_comments(self):
+        self.client.login(username='testuser1', password='password123')
+        detail = reverse('blog:post_detail', args=[self.post.id])
+        response = self.client.post(
+            reverse('blog:create_comment', args=[self.post.id]),
+            {'comment': '   '}
+        )
+        self.assertRedirects(response, detail)
+        response = self.client.get(reverse('blog:create_comment', args=[self.post.id]))
+        self.assertRedirects(response, detail)
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 4)
+
     def test_create_reply(self):
         """Test creating a reply to a comment"""
         # Login as user1
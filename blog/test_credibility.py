@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from . import verification
+from .credibility import compute_author_credibility, rebuild_author_credibility
+from .models import Post, Profile, Tag
+
+
+class AuthorCredibilityTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.news = Post.objects.create(
+            title='News', content='Test content', author=self.author,
+            status='published', tags=Tag.objects.create(name='news', slug='news')
+            )
+        self.science = Post.objects.create(
+            title='Science', content='Test content', author=self.author,
+            status='published', tags=Tag.objects.create(name='science', slug='science')
+            )
+
+    def vote(self, post, positive=0, negative=0):
+        if positive:
+            verification.apply_vote(post.pk, 'positive', positive)
+        if negative:
+            verification.apply_vote(post.pk, 'negative', negative)
+
+    def profile(self):
+        return Profile.objects.get(user=self.author)
+
+    def test_credibility_is_vote_weighted_average(self):
+        self.vote(self.news, positive=3)
+        self.vote(self.science, positive=1, negative=1)
+
+        science = Post.objects.get(pk=self.science.pk).verification_score
+        profile = self.profile()
+        self.assertEqual(profile.credibility_weight, 5)
+        self.assertAlmostEqual(profile.credibility_score, (3 * 1.0 + 2 * science) / 5)
+        self.assertEqual(set(profile.credibility_breakdown), {'news', 'science'})
+        self.assertAlmostEqual(profile.credibility_breakdown['news']['score'], 1.0)
+        self.assertAlmostEqual(profile.credibility_breakdown['science']['score'], science)
+        self.assertEqual(profile.credibility_breakdown['science']['weight'], 2)
+
+    def test_unvoted_author_is_neutral(self):
+        self.assertEqual(self.profile().credibility_score, 0.5)
+        self.vote(self.news, negative=1)
+        self.assertAlmostEqual(self.profile().credibility_score, 0.1 / 1.2)
+
+    def test_vote_updates_profile_in_constant_queries(self):
+        self.vote(self.news, positive=10)
+        # savepoint, post lock, tally update, refresh, profile lock and
+        # update, history event, summary lock and update, release
+        with self.assertNumQueries(10):
+            verification.apply_vote(self.news.pk, 'negative')
+
+    def test_deleting_post_removes_its_votes(self):
+        self.vote(self.news, positive=2)
+        self.vote(self.science, negative=2)
+        Post.objects.get(pk=self.science.pk).delete()
+
+        profile = self.profile()
+        self.assertEqual(profile.credibility_weight, 2)
+        self.assertAlmostEqual(profile.credibility_score, 1.0)
+        self.assertEqual(list(profile.credibility_breakdown), ['news'])
+
+    def test_incremental_totals_match_full_rebuild(self):
+        self.vote(self.news, positive=4, negative=1)
+        self.vote(self.science, positive=2, negative=3)
+        total, weight, breakdown = compute_author_credibility()[self.author.pk]
+
+        profile = self.profile()
+        self.assertAlmostEqual(profile.credibility_sum, total)
+        self.assertEqual(profile.credibility_weight, weight)
+        self.assertEqual(rebuild_author_credibility(), [])
+
+    def test_rebuild_repairs_drift(self):
+        self.vote(self.news, positive=2)
+        Profile.objects.filter(user=self.author).update(
+            credibility_sum=0.0, credibility_score=0.9, credibility_breakdown={}
+            )
+
+        self.assertEqual(len(rebuild_author_credibility(fix=False)), 1)
+        self.assertAlmostEqual(self.profile().credibility_score, 0.9)
+        out = StringIO()
+        call_command('rebuild_credibility', stdout=out)
+        self.assertIn('Repaired drift on 1 profiles', out.getvalue())
+
+        profile = self.profile()
+        self.assertAlmostEqual(profile.credibility_score, 1.0)
+        self.assertEqual(profile.credibility_breakdown['news']['weight'], 2)
+        self.assertEqual(rebuild_author_credibility(), [])
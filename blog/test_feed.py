@@ -0,0 +1,152 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from .models import Post, Follow, Stream
+from .feed import fan_out_post, home_timeline
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, FEED_CELEBRITY_THRESHOLD=0)
+class FeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author',
+            password='password123'
+            )
+        self.readers = [
+            User.objects.create_user(
+                username=f'reader{i}',
+                password='password123'
+                )
+            for i in range(5)
+        ]
+        for reader in self.readers:
+            Follow.objects.create(follower=reader, following=self.author)
+
+    def publish(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title,
+                author=self.author,
+                content='Test Content',
+                status='published'
+            )
+
+    def test_publish_fans_out_to_followers(self):
+        post = self.publish('Fan out')
+        self.assertEqual(Stream.objects.filter(post=post).count(), 5)
+        self.assertEqual(
+            set(Stream.objects.filter(post=post).values_list('user_id', flat=True)),
+            {reader.id for reader in self.readers}
+        )
+
+    @override_settings(FEED_FANOUT_BATCH_SIZE=2)
+    def test_fan_out_is_batched(self):
+        post = Post.objects.create(
+            title='Batched',
+            author=self.author,
+            content='Test Content',
+            status='published'
+        )
+        # 1 post lookup + 3 follower batches + 3 bulk inserts + 1 empty batch
+        with self.assertNumQueries(8):
+            written = fan_out_post(post.pk)
+        self.assertEqual(written, 5)
+
+    def test_resave_does_not_fan_out_again(self):
+        post = self.publish('Once')
+        Stream.objects.filter(post=post).delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            post.likes_count += 1
+            post.save()
+        self.assertFalse(Stream.objects.filter(post=post).exists())
+
+    def test_unpublish_retracts_post(self):
+        post = self.publish('Retract')
+        with self.captureOnCommitCallbacks(execute=True):
+            post.status = 'draft'
+            post.save()
+        self.assertFalse(Stream.objects.filter(post=post).exists())
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        post = self.publish('Backfill')
+        newcomer = User.objects.create_user(username='newcomer', password='password123')
+        with self.captureOnCommitCallbacks(execute=True):
+            follow = Follow.objects.create(follower=newcomer, following=self.author)
+        self.assertTrue(Stream.objects.filter(user=newcomer, post=post).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+        self.assertFalse(Stream.objects.filter(user=newcomer).exists())
+
+    def test_timeline_keyset_pagination(self):
+        posts = [self.publish(f'Post {i}') for i in range(5)]
+        reader = self.readers[0]
+
+        page, cursor = home_timeline(reader, limit=2)
+        seen = list(page)
+        while cursor:
+            page, cursor = home_timeline(reader, cursor=cursor, limit=2)
+            seen.extend(page)
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(
+            [post.pk for post in seen],
+            [post.pk for post in sorted(
+                posts, key=lambda p: (p.publish_date, p.pk), reverse=True)]
+        )
+
+    def test_index_shows_home_timeline(self):
+        self.publish('On my timeline')
+        client = Client()
+        client.login(username='reader0', password='password123')
+        response = client.get(reverse('blog:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'On my timeline')
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, FEED_CELEBRITY_THRESHOLD=3)
+class HybridFeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.celebrity = User.objects.create_user(username='celebrity', password='password123')
+        self.regular = User.objects.create_user(username='regular', password='password123')
+        self.reader = User.objects.create_user(username='reader', password='password123')
+        for i in range(3):
+            fan = User.objects.create_user(username=f'fan{i}', password='password123')
+            Follow.objects.create(follower=fan, following=self.celebrity)
+        Follow.objects.create(follower=self.reader, following=self.celebrity)
+        Follow.objects.create(follower=self.reader, following=self.regular)
+
+    def publish(self, author, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title,
+                author=author,
+                content='Test Content',
+                status='published'
+            )
+
+    def test_celebrity_posts_are_not_fanned_out(self):
+        post = self.publish(self.celebrity, 'Celebrity post')
+        self.assertFalse(Stream.objects.filter(post=post).exists())
+
+        post = self.publish(self.regular, 'Regular post')
+        self.assertTrue(Stream.objects.filter(post=post, user=self.reader).exists())
+
+    def test_timeline_merges_pushed_and_pulled_posts(self):
+        posts = []
+        for i in range(3):
+            posts.append(self.publish(self.celebrity, f'Celebrity {i}'))
+            posts.append(self.publish(self.regular, f'Regular {i}'))
+        expected = [post.pk for post in sorted(
+            posts, key=lambda p: (p.publish_date, p.pk), reverse=True)]
+
+        page, cursor = home_timeline(self.reader, limit=4)
+        seen = [post.pk for post in page]
+        while cursor:
+            page, cursor = home_timeline(self.reader, cursor=cursor, limit=4)
+            seen.extend(post.pk for post in page)
+
+        self.assertEqual(seen, expected)
@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from backend import images
+from marketplace.models import Item
+from .models import Post, Profile
+
+
+def make_image(size=(2000, 1000), color='red', image_format='JPEG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return SimpleUploadedFile(
+        f'upload.{image_format.lower()}', buffer.getvalue(),
+        content_type=f'image/{image_format.lower()}'
+        )
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, IMAGE_RENDITION_FORMAT='WEBP')
+class ImagePipelineTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='author')
+
+    def upload_profile_picture(self, upload):
+        profile = Profile.objects.get(user=self.user)
+        profile.image = upload
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            profile.save()
+        profile.refresh_from_db()
+        return profile, callbacks
+
+    def test_upload_is_processed_after_commit(self):
+        profile = Profile.objects.get(user=self.user)
+        profile.image = make_image()
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.save()
+            # Nothing is decoded in the request
+            self.assertEqual(profile.image_renditions, {})
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+
+        profile.refresh_from_db()
+        renditions = profile.image_renditions
+        self.assertEqual(renditions['source'], profile.image.name)
+        self.assertEqual(len(profile.image_hash), 64)
+        for name, size in images.RENDITIONS:
+            self.assertIn(profile.image_hash, renditions[name])
+            with default_storage.open(renditions[name]) as f, Image.open(f) as rendition:
+                self.assertEqual(rendition.format, 'WEBP')
+                self.assertEqual(rendition.size, (size, size // 2))
+        # The original is kept as uploaded
+        with profile.image.open() as f, Image.open(f) as original:
+            self.assertEqual(original.size, (2000, 1000))
+
+    def test_unchanged_image_is_not_reprocessed(self):
+        profile, _ = self.upload_profile_picture(make_image())
+        with self.captureOnCommitCallbacks() as callbacks:
+            profile.bio = 'New bio'
+            profile.save()
+            User.objects.get(pk=self.user.pk).save()
+        self.assertEqual(callbacks, [])
+
+        # Same content under a new name: hashed, but not decoded again
+        with mock.patch.object(images, 'render_renditions') as render:
+            profile, _ = self.upload_profile_picture(make_image())
+        render.assert_not_called()
+        self.assertEqual(profile.image_renditions['source'], profile.image.name)
+
+    def test_jpeg_renditions(self):
+        with override_settings(IMAGE_RENDITION_FORMAT='JPEG'):
+            profile, _ = self.upload_profile_picture(make_image(image_format='PNG'))
+        self.assertTrue(profile.image_renditions['card'].endswith('-card.jpg'))
+
+    def test_undecodable_file_gets_no_renditions(self):
+        upload = SimpleUploadedFile('broken.jpg', b'not an image')
+        item = Item(name='Lamp', description='Lamp', price=5, quantity=1,
+                    seller=self.user, image=upload)
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        item.refresh_from_db()
+        self.assertEqual(item.image_renditions, {'source': item.image.name})
+        self.assertEqual(len(item.image_hash), 64)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, IMAGE_RENDITION_FORMAT='WEBP')
+class ResponsiveImageTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='author')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                title='Claim', content='Test content', author=self.user,
+                status='published', picture=make_image(size=(1000, 500))
+                )
+        self.post.refresh_from_db()
+
+    def render(self, post):
+        return Template(
+            '{% load renditions %}<img {% srcset post.picture sizes="50vw" %}>'
+            ).render(Context({'post': post}))
+
+    def rendition_url(self, width, digest=None):
+        return reverse('image_rendition', args=[
+            'blog.post', self.post.pk, 'picture', digest or self.post.picture_hash, width
+        ])
+
+    def test_srcset_offers_widths_up_to_original(self):
+        self.assertEqual(self.post.picture_renditions['size'], [1000, 500])
+        html = self.render(self.post)
+        self.assertIn(f'src="{self.rendition_url(640)}"', html)
+        self.assertIn(f'{self.rendition_url(960)} 960w', html)
+        self.assertNotIn('1280w', html)
+        self.assertIn('sizes="50vw"', html)
+
+    def test_rotated_photo_is_rendered_at_full_width(self):
+        # Stored sideways, as phone cameras do, with an EXIF orientation
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new('RGB', (2000, 1000), 'red').save(buffer, 'JPEG', exif=exif)
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title='Photo', content='Test content', author=self.user,
+                status='published', picture=SimpleUploadedFile(
+                    'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+                    )
+                )
+        post.refresh_from_db()
+        self.assertEqual(post.picture_renditions['size'], [1000, 2000])
+
+        path = images.render_width(post.picture, post.picture_hash, 320)
+        with default_storage.open(path) as f, Image.open(f) as rendition:
+            self.assertEqual(rendition.size, (320, 640))
+
+    def test_rendition_view_renders_once_and_is_cacheable(self):
+        response = self.client.get(self.rendition_url(320))
+        path = images.width_name(self.post.picture_hash, 320)
+        self.assertRedirects(
+            response, default_storage.url(path), fetch_redirect_response=False
+            )
+        self.assertIn('immutable', response['Cache-Control'])
+        with default_storage.open(path) as f, Image.open(f) as rendition:
+            self.assertEqual(rendition.size, (320, 160))
+
+        # Pages now link the stored file directly
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.picture_renditions['w320'], path)
+        self.assertIn(f'{default_storage.url(path)} 320w', self.render(post))
+        with mock.patch.object(images, '_encode') as encode:
+            self.client.get(self.rendition_url(320))
+        encode.assert_not_called()
+
+    def test_rendition_view_rejects_unknown_requests(self):
+        self.assertEqual(self.client.get(self.rendition_url(500)).status_code, 404)
+        self.assertEqual(self.client.get(reverse('image_rendition', args=[
+            'blog.post', 'not-a-uuid', 'picture', self.post.picture_hash, 320
+        ])).status_code, 404)
+        # A stale hash goes to the current original
+        response = self.client.get(self.rendition_url(320, digest='0' * 64))
+        self.assertRedirects(
+            response, self.post.picture.url, fetch_redirect_response=False
+            )
+
+    def test_unprocessed_image_falls_back_to_original(self):
+        Post.objects.filter(pk=self.post.pk).update(picture_renditions={})
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(self.render(post), f'<img src="{post.picture.url}">')
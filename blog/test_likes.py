@@ -0,0 +1,215 @@
+import threading
+
+from django.test import TestCase, TransactionTestCase, Client, override_settings, skipUnlessDBFeature
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from io import StringIO
+from . import likes
+from .models import Post, Like, PostLikeShard
+
+
+class LikeCounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fan = User.objects.create_user(username='fan', password='password2')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+
+    def count(self):
+        return likes.like_count(self.post.pk)
+
+    def test_toggle_like(self):
+        self.assertEqual(likes.toggle_like(self.post, self.fan), (True, 1))
+        self.assertEqual(likes.toggle_like(self.post, self.fan), (False, 0))
+        self.assertFalse(Like.objects.exists())
+
+    def test_double_like_is_idempotent(self):
+        likes.toggle_like(self.post, self.fan)
+        self.assertEqual(likes.double_like(self.post, self.fan), 2)
+        self.assertEqual(likes.double_like(self.post, self.fan), 2)
+        self.assertEqual(Like.objects.get().weight, 2)
+        # Undoing a double like removes both
+        self.assertEqual(likes.toggle_like(self.post, self.fan), (False, 0))
+
+    def test_like_writes_only_the_counter_column(self):
+        likes.toggle_like(self.post, self.fan)
+        with self.assertNumQueries(1) as queries:
+            likes.apply_like_deltas({self.post.pk: 1})
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"likes_count" = ("blog_post"."likes_count" + 1)', sql)
+        self.assertNotIn('"title"', sql)
+
+    def test_views_return_counts(self):
+        client = Client()
+        client.login(username='fan', password='password2')
+        response = client.post(reverse('blog:like_post', args=[self.post.id]))
+        self.assertEqual(response.json(), {'likes_count': 1})
+        response = client.post(reverse('blog:double_like_post', args=[self.post.id]))
+        self.assertEqual(response.json(), {'likes_count': 2})
+        response = client.post(reverse('blog:dislike_post', args=[self.post.id]))
+        self.assertEqual(response.json(), {'likes_count': 0})
+
+    def test_cascaded_delete_decrements(self):
+        likes.double_like(self.post, self.fan)
+        self.fan.delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_reconcile_repairs_drift(self):
+        other = Post.objects.create(
+            title='Other Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+        likes.double_like(self.post, self.fan)
+        likes.toggle_like(other, self.author)
+        Post.objects.update(likes_count=7)
+
+        out = StringIO()
+        call_command('reconcile_like_counts', '--batch-size=1', stdout=out)
+        self.assertIn('Corrected like counts on 2 posts', out.getvalue())
+        self.assertEqual(self.count(), 2)
+        self.assertEqual(likes.like_count(other.pk), 1)
+        self.assertEqual(likes.reconcile_like_counts(), 0)
+
+
+@override_settings(LIKE_COUNTER_SHARDS=4)
+class ShardedLikeCounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            title='Viral', content='Test Content', author=self.author, status='published'
+            )
+        self.fans = [User.objects.create_user(username=f'fan{i}') for i in range(12)]
+
+    def test_likes_spread_over_shards_and_fold_back(self):
+        for fan in self.fans:
+            likes.toggle_like(self.post, fan)
+        likes.toggle_like(self.post, self.fans[0])
+
+        self.assertEqual(likes.like_count(self.post.pk), 11)
+        self.assertEqual(
+            Post.objects.values_list('likes_count', flat=True).get(), 0
+            )
+        self.assertLessEqual(PostLikeShard.objects.count(), 4)
+
+        self.assertEqual(likes.fold_like_shards(), 1)
+        self.assertFalse(PostLikeShard.objects.exists())
+        self.assertEqual(
+            Post.objects.values_list('likes_count', flat=True).get(), 11
+            )
+        self.assertEqual(likes.like_count(self.post.pk), 11)
+
+    def test_reconcile_counts_unfolded_shards(self):
+        for fan in self.fans[:3]:
+            likes.toggle_like(self.post, fan)
+        self.assertEqual(likes.reconcile_like_counts(), 0)
+        PostLikeShard.objects.update(count=5)
+        self.assertEqual(likes.reconcile_like_counts(), 1)
+        self.assertEqual(likes.like_count(self.post.pk), 3)
+
+    def test_detail_page_counts_unfolded_shards(self):
+        for fan in self.fans[:3]:
+            likes.toggle_like(self.post, fan)
+        response = self.client.get(reverse('blog:post_detail', args=[self.post.id]))
+        self.assertEqual(response.context['likes_count'], 3)
+
+    def test_shards_of_deleted_posts_are_dropped(self):
+        likes.toggle_like(self.post, self.fans[0])
+        self.post.delete()
+        self.assertEqual(likes.fold_like_shards(), 0)
+        self.assertFalse(PostLikeShard.objects.exists())
+
+
+@override_settings(LIKE_WRITE_BEHIND_SECONDS=60)
+class WriteBehindLikeCounterTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}', content='Test Content', author=self.author,
+                status='published'
+                )
+            for i in range(2)
+        ]
+        self.fans = [User.objects.create_user(username=f'fan{i}') for i in range(3)]
+
+    def tearDown(self):
+        likes.like_buffer.flush()
+
+    def stored(self, post):
+        return Post.objects.values_list('likes_count', flat=True).get(pk=post.pk)
+
+    def test_changes_are_buffered_after_commit_and_flushed_together(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts:
+                for fan in self.fans:
+                    likes.toggle_like(post, fan)
+            likes.double_like(self.posts[0], self.fans[0])
+            # Nothing is buffered until the likes commit
+            self.assertEqual(likes.like_buffer.pending_for(self.posts[0].pk), 0)
+
+        self.assertEqual(self.stored(self.posts[0]), 0)
+        self.assertEqual(likes.like_count(self.posts[0].pk), 4)
+
+        with self.assertNumQueries(1):
+            likes.like_buffer.flush()
+        self.assertEqual(self.stored(self.posts[0]), 4)
+        self.assertEqual(self.stored(self.posts[1]), 3)
+
+    def test_rolled_back_likes_are_not_counted(self):
+        # The test transaction never commits, so the callback never runs
+        with self.captureOnCommitCallbacks(execute=False):
+            likes.toggle_like(self.posts[0], self.fans[0])
+        likes.like_buffer.flush()
+        self.assertEqual(self.stored(self.posts[0]), 0)
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class LikeConcurrencyTest(TransactionTestCase):
+    """
+    Many threads like one post at the same time. With read-modify-write
+    counting some increments were lost; with F() updates none are.
+    Needs a database with real row locking, so it is skipped on SQLite.
+    """
+    threads = 20
+
+    def test_concurrent_likes_are_all_counted(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            title='Viral', content='Test Content', author=author, status='published'
+            )
+        fans = [
+            User.objects.create_user(username=f'fan{i}')
+            for i in range(self.threads)
+        ]
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def like(fan):
+            try:
+                barrier.wait()
+                likes.toggle_like(post, fan)
+                # The same user hammering the button can't count twice
+                likes.double_like(post, fan)
+                likes.double_like(post, fan)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=like, args=(fan,)) for fan in fans]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(likes.like_count(post.pk), 2 * self.threads)
+        self.assertEqual(Like.objects.filter(post=post).count(), self.threads)
@@ -0,0 +1,47 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class VerificationEventMigrationTest(TransactionTestCase):
+    before = [('blog', '0012_verification_tallies')]
+    after = [('blog', '0013_verificationevent')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_history_keeps_its_post_links(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Post = apps.get_model('blog', 'Post')
+        Profile = apps.get_model('blog', 'Profile')
+        author = User.objects.create(username='author')
+        post = Post.objects.create(
+            title='Post', slug='post', content='Test content', author=author
+        )
+        Profile.objects.update_or_create(user=author, defaults={
+            'verification_history': [
+                {'post_id': str(post.pk), 'timestamp': '2024-01-02 03:04:05',
+                 'poll_data': {}, 'verification_score': 1.0},
+                {'post_id': 'c0ffee00-0000-0000-0000-000000000000',
+                 'timestamp': '2024-01-03 03:04:05',
+                 'poll_data': {}, 'verification_score': 0.5},
+            ],
+        })
+
+        apps = self.migrate(self.after)
+        VerificationEvent = apps.get_model('blog', 'VerificationEvent')
+        self.assertEqual(
+            list(VerificationEvent.objects.order_by('timestamp').values_list(
+                'post_id', 'verification_score'
+            )),
+            # Posts that no longer exist are unlinked
+            [(post.pk, 1.0), (None, 0.5)]
+        )
@@ -0,0 +1,197 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from django.urls import reverse
+from backend.pagination import paginate
+from polls.models import Question
+from .models import Post, Comment, Like, Follow
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, FEED_CELEBRITY_THRESHOLD=0)
+class PageQueryCountTest(TestCase):
+    """
+    Pin the number of queries the index and post detail pages issue, so
+    adding posts, comments or replies can never turn them back into N+1.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author',
+            password='password123'
+            )
+        self.reader = User.objects.create_user(
+            username='reader',
+            password='password123'
+            )
+        self.client = Client()
+        self.client.login(username='reader', password='password123')
+        self.post = self.publish('Detail')
+
+    def publish(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(
+                title=title,
+                author=self.author,
+                content='Test Content',
+                status='published'
+            )
+
+    def add_comments(self, count):
+        for i in range(count):
+            comment = Comment.objects.create(
+                post=self.post,
+                author=self.reader,
+                content=f'Comment {i}'
+            )
+            Comment.objects.create(
+                post=self.post,
+                author=self.author,
+                content=f'Reply {i}',
+                parent=comment
+            )
+
+    def get_detail(self):
+        return self.client.get(
+            reverse('blog:post_detail', args=[str(self.post.id)])
+            )
+
+    def test_index_query_count_is_constant(self):
+        for i in range(3):
+            self.publish(f'Post {i}')
+        # Warm the unread-notification badge cache
+        self.client.get(reverse('blog:index'))
+        with self.assertNumQueries(4):
+            self.client.get(reverse('blog:index'))
+
+        for i in range(10):
+            self.publish(f'More {i}')
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'More 9')
+
+    def test_timeline_index_query_count_is_constant(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.reader, following=self.author)
+        for i in range(12):
+            self.publish(f'Post {i}')
+        self.client.get(reverse('blog:index'))
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('blog:index'))
+        self.assertContains(response, 'Post 11')
+
+    def test_detail_query_count_is_constant(self):
+        # The first view creates the verification poll
+        self.get_detail()
+        self.add_comments(2)
+        with self.assertNumQueries(7):
+            self.get_detail()
+
+        self.add_comments(10)
+        with self.assertNumQueries(7):
+            response = self.get_detail()
+        self.assertContains(response, 'Reply 9')
+        self.assertEqual(len(response.context['comments']), 24)
+
+    def test_detail_flags_are_annotated(self):
+        Like.objects.create(post=self.post, user=self.reader)
+        Follow.objects.create(follower=self.reader, following=self.author)
+        response = self.get_detail()
+        self.assertTrue(response.context['is_liked'])
+        self.assertTrue(response.context['is_following'])
+        self.assertFalse(response.context['has_voted'])
+        self.assertEqual(
+            Question.objects.filter(post=self.post).count(), 1
+            )
+        self.assertEqual(
+            [choice.choice_text for choice in response.context['poll'].choice_set.all()],
+            ['Yes', 'No']
+            )
+
+    def test_comment_tree_attaches_replies(self):
+        self.add_comments(1)
+        response = self.get_detail()
+        comments = response.context['comments']
+        top_level = [c for c in comments if c.parent_id is None]
+        self.assertEqual(len(top_level), 1)
+        self.assertEqual(
+            [reply.content for reply in top_level[0].reply_list],
+            ['Reply 0']
+            )
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author',
+            password='password123'
+            )
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}',
+                author=self.author,
+                content='Test Content',
+                status='published'
+            )
+            for i in range(25)
+        ]
+        self.expected = [post.pk for post in sorted(
+            self.posts, key=lambda p: (p.publish_date, p.pk), reverse=True)]
+
+    def test_walks_every_page_once(self):
+        seen = []
+        cursor = None
+        while True:
+            page = paginate(
+                Post.objects.all(),
+                cursor=cursor,
+                ordering=('-publish_date', '-id'),
+                per_page=10
+                )
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+    def test_deep_page_is_a_single_query(self):
+        first = paginate(Post.objects.all(), ordering=('-publish_date', '-id'))
+        second = paginate(
+            Post.objects.all(),
+            cursor=first.next_cursor,
+            ordering=('-publish_date', '-id')
+            )
+        with self.assertNumQueries(1):
+            paginate(
+                Post.objects.all(),
+                cursor=second.next_cursor,
+                ordering=('-publish_date', '-id')
+                )
+
+    def test_walks_annotation_ordering(self):
+        posts = Post.objects.annotate(position=F('publish_date'))
+        first = paginate(posts, ordering=('-position', '-id'))
+        second = paginate(posts, cursor=first.next_cursor, ordering=('-position', '-id'))
+        self.assertEqual(
+            [post.pk for post in [*first, *second]], self.expected[:20]
+            )
+
+    def test_invalid_cursor_restarts_at_first_page(self):
+        page = paginate(
+            Post.objects.all(),
+            cursor='not-a-cursor',
+            ordering=('-publish_date', '-id')
+            )
+        self.assertFalse(page.has_previous())
+        self.assertEqual([post.pk for post in page], self.expected[:10])
+
+    def test_index_follows_before_cursor(self):
+        response = self.client.get(reverse('blog:index'))
+        next_cursor = response.context['next_cursor']
+        self.assertIsNotNone(next_cursor)
+        response = self.client.get(reverse('blog:index'), {'before': next_cursor})
+        self.assertEqual(
+            [post.pk for post in response.context['posts']],
+            self.expected[10:20]
+            )
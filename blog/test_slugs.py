@@ -0,0 +1,64 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from .models import Post, SlugCounter
+
+
+class SlugAllocationTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+
+    def create(self, title, **kwargs):
+        return Post.objects.create(
+            title=title,
+            author=self.author,
+            content='Test Content',
+            **kwargs
+        )
+
+    def test_colliding_titles_get_increasing_suffixes(self):
+        slugs = [self.create('Update').slug for _ in range(3)]
+        self.assertEqual(slugs, ['update', 'update-1', 'update-2'])
+        self.assertEqual(SlugCounter.objects.get(base='update').last_suffix, 2)
+
+    def test_query_count_does_not_grow_with_collisions(self):
+        for _ in range(3):
+            self.create('Update')
+        # savepoint, counter update and read, release; savepoint, insert,
+        # release
+        with self.assertNumQueries(7) as few:
+            self.create('Update')
+        for _ in range(20):
+            self.create('Update')
+        with self.assertNumQueries(len(few.captured_queries)):
+            post = self.create('Update')
+        self.assertEqual(post.slug, 'update-24')
+
+    def test_counter_is_seeded_from_existing_slugs(self):
+        self.create('News', slug='news')
+        self.create('News', slug='news-7')
+        self.create('Newsletter', slug='news-letter')
+        self.assertEqual(self.create('News').slug, 'news-8')
+
+    def test_titles_ending_in_numbers_do_not_seed_the_counter(self):
+        self.create('Update 2024')
+        self.create('Update', slug='update-3')
+        self.assertEqual(self.create('Update').slug, 'update-4')
+
+    def test_slug_set_by_hand_is_skipped(self):
+        self.create('Update')
+        self.create('Manual', slug='update-1')
+        self.assertEqual(self.create('Update').slug, 'update-2')
+
+    def test_long_and_empty_titles(self):
+        long_title = 'word ' * 30
+        post = self.create(long_title)
+        self.assertLessEqual(len(post.slug), 50)
+        self.assertLessEqual(len(self.create(long_title).slug), 50)
+        self.assertEqual(self.create('!!!').slug, 'post')
+
+    def test_resave_keeps_slug(self):
+        post = self.create('Update')
+        post.title = 'Changed'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.slug, 'update')
@@ -0,0 +1,98 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from backend import images
+from .fields import validate_svg_or_image
+from .models import Post
+
+SVG = b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"/>'
+
+
+def image_bytes(size=(40, 20), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class StreamingUploadTest(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='author', password='password1')
+        self.client.login(username='author', password='password1')
+
+    def create_post(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('blog:create_blog_post'), {
+                'title': 'Claim',
+                'subtitle': 'Sub',
+                'job_title': 'Reporter',
+                'content': 'Test content',
+                'caption': 'Caption',
+                'picture': SimpleUploadedFile(name, content),
+            })
+
+    def picture_errors(self, response):
+        return ' '.join(response.context['form'].errors.get('picture', []))
+
+    def test_upload_hash_is_reused_by_the_image_pipeline(self):
+        content = image_bytes()
+        with mock.patch.object(images, 'hash_file') as hash_file:
+            response = self.create_post('photo.png', content)
+        self.assertRedirects(response, reverse('blog:index'), fetch_redirect_response=False)
+        hash_file.assert_not_called()
+
+        post = Post.objects.get()
+        self.assertEqual(post.picture_hash, hashlib.sha256(content).hexdigest())
+        self.assertEqual(post.picture_renditions['size'], [40, 20])
+
+    def test_svg_is_accepted_only_as_svg(self):
+        self.create_post('logo.svg', SVG)
+        self.assertEqual(Post.objects.count(), 1)
+
+        response = self.create_post('logo.png', SVG)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertIn('File must be a valid image or SVG.', self.picture_errors(response))
+
+    def test_other_formats_pil_opens_are_accepted(self):
+        for image_format in ('BMP', 'TIFF'):
+            with self.subTest(image_format):
+                self.create_post(f'photo.{image_format.lower()}', image_bytes(image_format=image_format))
+                post = Post.objects.latest('publish_date')
+                self.assertEqual(post.picture_renditions['size'], [40, 20])
+                # Committed files are checked again when the post is edited
+                with post.picture.open('rb'):
+                    validate_svg_or_image(post.picture)
+
+    def test_non_image_is_rejected(self):
+        response = self.create_post('photo.jpg', b'MZ\x90\x00' + b'\x00' * 1000)
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('File must be a valid image or SVG.', self.picture_errors(response))
+
+    @override_settings(IMAGE_MAX_PIXELS=500)
+    def test_image_with_too_many_pixels_is_rejected_from_its_header(self):
+        content = image_bytes((40, 20))
+        with mock.patch.object(Image.Image, 'load') as load:
+            response = self.create_post('photo.png', content)
+        load.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('Images may have at most 500 pixels.', self.picture_errors(response))
+
+    @override_settings(IMAGE_MAX_DIMENSION=30, UPLOAD_SNIFF_BYTES=32)
+    def test_header_past_sniffed_bytes_is_checked_on_completion(self):
+        response = self.create_post('photo.jpg', image_bytes((40, 20), 'JPEG'))
+        self.assertFalse(Post.objects.exists())
+        self.assertIn('at most 30 pixels wide or high', self.picture_errors(response))
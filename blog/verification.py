@@ -0,0 +1,105 @@
+"""
+Incremental verification scoring.
+
+A post's verification score depends only on how many positive and negative
+votes its verification polls have received. Rather than re-summing every
+choice on each vote, the post keeps both tallies, and a vote is applied as
+a delta: a single ``UPDATE`` bumps the tally and recomputes the score and
+status from the new tallies in SQL. The cost of a vote is constant however
+many votes came before it, and concurrent votes can't overwrite each
+other's counts.
+
+The scoring rule is the production rule of
+``Post.calculate_verification_score``: no votes keeps the current score,
+no negative votes scores 1.0, otherwise ``(positive + 0.1) / (total + 0.2)``.
+"""
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.lookups import Exact, GreaterThanOrEqual
+
+from search.indexing import mark_dirty
+from .models import Post
+
+IMPACT_FIELDS = {
+    'positive': 'verification_positive',
+    'negative': 'verification_negative',
+}
+
+
+def score_expression(positive, negative):
+    """Verification score for the given tally expressions, in SQL."""
+    total = positive + negative
+    return Case(
+        When(Exact(total, 0), then=F('verification_score')),
+        When(Exact(negative, 0), then=Value(1.0)),
+        default=(
+            (Cast(positive, FloatField()) + Value(0.1))
+            / (Cast(total, FloatField()) + Value(0.2))
+        ),
+        output_field=FloatField(),
+    )
+
+
+def status_expression(score):
+    """Verification status for a score expression, in SQL."""
+    return Case(
+        *[
+            When(GreaterThanOrEqual(score, threshold), then=Value(status))
+            for threshold, status in Post.VERIFICATION_THRESHOLDS[:-1]
+        ],
+        default=Value(Post.VERIFICATION_THRESHOLDS[-1][1]),
+    )
+
+
+def apply_vote(post_id, impact, count=1):
+    """
+    Add ``count`` votes of ``impact`` ('positive' or 'negative') to a
+    post's tallies and rescore it, all in one UPDATE. Neutral votes don't
+    affect the score and are ignored. Returns the post's new
+    ``(score, status)``, or None if nothing changed.
+    """
+    if impact not in IMPACT_FIELDS:
+        return None
+    return apply_votes(post_id, **{impact: count})
+
+
+def apply_votes(post_id, positive=0, negative=0):
+    """
+    Add a batch of positive and negative votes to a post's tallies and
+    rescore it once. Returns the post's new ``(score, status)``, or None
+    if there were no votes.
+    """
+    counts = {'positive': positive, 'negative': negative}
+    if not any(counts.values()):
+        return None
+    tallies = {
+        field: F(field) + counts[impact] if counts[impact] else F(field)
+        for impact, field in IMPACT_FIELDS.items()
+    }
+    score = score_expression(
+        tallies['verification_positive'], tallies['verification_negative']
+        )
+    with transaction.atomic():
+        # Lock the post first so the values its author was credited with
+        # are the ones these votes change
+        post = Post.objects.select_for_update(of=('self',)).select_related(
+            'author__profile', 'tags'
+            ).get(pk=post_id)
+        Post.objects.filter(pk=post_id).update(
+            verification_score=score,
+            verification_status=status_expression(score),
+            **{
+                field: tallies[field]
+                for impact, field in IMPACT_FIELDS.items() if counts[impact]
+            },
+        )
+        post.refresh_from_db(fields=[*Post.CREDITED_FIELDS, 'verification_status'])
+        post.update_author_credibility()
+        post.add_verification_history({
+            'positive': post.verification_positive,
+            'negative': post.verification_negative,
+        })
+        # update() skips the save signal that keeps the search index current
+        mark_dirty('posts', post_id, ['verification_score'])
+    return post.verification_score, post.verification_status
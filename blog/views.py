@@ -6,20 +6,24 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, CommentForm, ProfileForm
 from .models import Stream, Post, Comment, Like, Follow, Profile, Tag
-from polls.models import Question, VoteRecord, Choice
+from .feed import home_timeline
+from . import likes
+from backend.pagination import paginate
+from .queries import comment_tree, post_detail, published_posts, verification_poll
 from django.contrib.auth.models import User
 from django.http import HttpResponseForbidden, HttpResponseServerError
 from django.utils.safestring import mark_safe
 import logging
-from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Q
 from .models import BlogMessage
 from django.http import HttpResponseBadRequest
 from chat.models import Message, Room
-from notification.models import Notification
+from notification.services import NotificationService
 
 logger = logging.getLogger(__name__)
+
+VERIFICATION_HISTORY_PER_PAGE = 10
     
 def register(request):
     if request.method == 'POST':
@@ -70,93 +74,39 @@ def create_blog_post(request):
         )
 
 def read_blog_posts(request):
-    author = request.user
-    all_authors = User.objects.all()
-    blog_posts = Post.objects.filter(status='published').order_by('-publish_date')
-    
-    # Add pagination with 10 posts per page for blog index
-    paginator = Paginator(blog_posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    profiles = Profile.objects.all()
-    
-    if request.user.is_authenticated:
-        follow_status = Follow.objects.filter(
-            follower=request.user, 
-            following=author
-        ).exists()
+    # Logged-in users who follow someone get their home timeline;
+    # everyone else sees the latest published posts.
+    next_cursor = None
+    if request.user.is_authenticated and Follow.objects.filter(
+        follower=request.user).exists():
+        posts, next_cursor = home_timeline(
+            request.user,
+            cursor=request.GET.get('before')
+            )
     else:
-        follow_status = False
-    
-    posts = Stream.objects.filter(
-        user=request.user
-    ).order_by('-date') if request.user.is_authenticated else []
-    
-    group_ids = []
-    for post in posts:
-        group_ids.append(post.post_id)
-    
-    query = request.GET.get('q')
-    if query:
-        authors = User.objects.filter(
-            Q(username__icontains=query)
+        # Keyset pagination with 10 posts per page for blog index
+        posts = paginate(
+            published_posts(),
+            cursor=request.GET.get('before'),
+            ordering=('-publish_date', '-id'),
+            per_page=10
             )
-        paginator = Paginator(authors, 5)
-        page_number = request.GET.get('page')
+        next_cursor = posts.next_cursor
     
     context = {
-        'posts': page_obj,  # Use paginated page object
-        'follow_status': follow_status,
-        'profiles': profiles,
-        'all_authors': all_authors,
-        'blog_posts': page_obj,  # Add pagination context for landing page
+        'posts': posts,
+        'next_cursor': next_cursor,
+        'blog_posts': posts,  # Add pagination context for landing page
     }
     return render(request, 'blog/index.html', context)
 
 def read_blog_post(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    profile = Profile.objects.get(user=post.author)
-    comments = Comment.objects.filter(post=post)
-    is_liked = Like.objects.filter(
-        post=post, 
-        user=request.user).exists()
-    is_following = Follow.objects.filter(
-        follower=request.user, 
-        following=post.author).exists()
-    
-    # Get or create poll for this post
-    poll, created = Question.objects.get_or_create(
-        post=post,
-        defaults={
-            'question_text': 'Is this post credible?',
-            'pub_date': timezone.now(),
-            'question_type': 'verification'
-        }
-    )
-    
-    # Create default choices if poll was just created
-    if created:
-        Choice.objects.create(
-            question=poll,
-            choice_text='Yes',
-            votes=0,
-            verification_impact='positive'  # Set as positive impact for verification
-        )
-        Choice.objects.create(
-            question=poll,
-            choice_text='No',
-            votes=0,
-            verification_impact='negative'  # Set as negative impact for verification
-        )
+    post = post_detail(post_id, request.user)
+    profile = post.author.profile
+    comments = comment_tree(post)
     
-    # Check if user has already voted
-    has_voted = False
-    if request.user.is_authenticated:
-        has_voted = VoteRecord.objects.filter(
-            question=poll,
-            user=request.user
-        ).exists()
+    # Get or create poll for this post, with choices and has_voted
+    poll = verification_poll(post, request.user)
     
     # Get verification data
     choices = poll.choice_set.all()
@@ -166,7 +116,13 @@ def read_blog_post(request, post_id):
         'author_credibility': profile.credibility_score,
         'results': {c.choice_text: c.votes for c in choices},
         'total_votes': sum(c.votes for c in choices),
-        'history': profile.verification_history
+        'history': paginate(
+            profile.verification_events.all(),
+            cursor=request.GET.get('history_before'),
+            ordering=('-timestamp', '-id'),
+            per_page=VERIFICATION_HISTORY_PER_PAGE
+            ),
+        'summary': profile.verification_summary,
     }
     
     # Check if post has a valid picture
@@ -177,10 +133,11 @@ def read_blog_post(request, post_id):
         'post': post,
         'profile': profile,
         'comments': comments,
-        'is_liked': is_liked,
-        'is_following': is_following,
+        'likes_count': likes.like_count(post.pk, post.like_total),
+        'is_liked': post.is_liked,
+        'is_following': post.is_following,
         'poll': poll,
-        'has_voted': has_voted,
+        'has_voted': poll.has_voted,
         'verification_data': verification_data,
     }
     return render(
@@ -382,32 +339,23 @@ def create_comment(request, post_id):
                 return redirect('blog:post_detail', post_id=post_id)
         
         if len(content.strip()) > 0:
+            # Saving notifies the post author (see Comment.create_notification)
             comment.save()
             
-            # Create notification for the post author when someone comments on their post
-            # Only create notification if commenter is not the post author
-            if request.user != post.author:
-                # Create a comment notification
-                Notification.objects.create(
-                    post=post,
-                    sender=request.user,
-                    user=post.author,
-                    notification_types=2,  # Comment notification type
-                    text_preview=content[:90]  # Preview of the comment
-                )
-            
             return redirect('blog:post_detail', post_id=post_id)
     
-    return render(request, 'blog/post_detail.html', {'post': post})
+    # The post page is the one place comments are rendered
+    return redirect('blog:post_detail', post_id=post_id)
 
 # read comments
 def read_comments(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post)
+    comments = comment_tree(post)
 
     context = {
         'post': post,
         'comments': comments,
+        'likes_count': likes.like_count(post.pk),
     }
     return render(
         request, 
@@ -479,56 +427,15 @@ def delete_comment(request, post_id, comment_id):
 @csrf_exempt
 def like_post(request, post_id):
     if request.method == 'POST':
-        from django.db import transaction
-        
-        # Use a transaction to ensure database consistency
-        with transaction.atomic():
-            post = get_object_or_404(Post, pk=post_id)
-            user = request.user
-            
-            # First, handle removing all related notifications to prevent duplicates
-            if user != post.author:
-                # Delete ALL existing like notifications from this user to prevent duplicates
-                Notification.objects.filter(
-                    post=post,
-                    sender=user,
-                    user=post.author,
-                    notification_types=1
-                ).delete()
-            
-            # Process the like action
-            liked_post, created = Like.objects.get_or_create(
-                post=post, user=user)
-            
-            # Toggle like
-            if not created:
-                liked_post.delete() 
-                post.likes_count -= 1
-                # No need to create a notification when unliking
-            else:
-                post.likes_count += 1
-                # Only create notification if the liker is not the post author
-                if user != post.author:
-                    # Double-check no notifications exist before creating
-                    if not Notification.objects.filter(
-                        post=post,
-                        sender=user,
-                        user=post.author,
-                        notification_types=1
-                    ).exists():
-                        Notification.objects.create(
-                            post=post,
-                            sender=user,
-                            user=post.author,
-                            notification_types=1,
-                            text_preview="Liked your post"
-                        )
-        post.save()
-        
+        post = get_object_or_404(Post, pk=post_id)
+        # Toggle like; the Like signals adjust the count and notify the
+        # post author or retract the notification
+        liked, likes_count = likes.toggle_like(post, request.user)
+
         # Return JSON response for AJAX
         from django.http import JsonResponse
-        return JsonResponse({'likes_count': post.likes_count})
-        
+        return JsonResponse({'likes_count': likes_count})
+
     # Fallback to redirect if not AJAX
     return redirect(reverse('blog:post_detail', args=[post_id]))
 
@@ -538,43 +445,21 @@ def double_like_post(request, post_id):
     if request.method == 'POST':
         post = get_object_or_404(Post, pk=post_id)
         user = request.user
-        
-        # First, remove any existing notifications to prevent duplicates
-        if user != post.author:
-            Notification.objects.filter(
-                post=post,
-                sender=user,
-                user=post.author,
-                notification_types=1
-            ).delete()
-        
-        # Check if user already liked the post
-        liked = Like.objects.filter(post=post, user=user).exists()
-        
-        if liked:
-            # If already liked, add one more like (total becomes 2)
-            post.likes_count += 1
-        else:
-            # If not already liked, add two likes and create the like object
-            liked_post = Like.objects.create(post=post, user=user)
-            post.likes_count += 2
-            
-        # Create a notification regardless of previous like status
-        if user != post.author:
-            Notification.objects.create(
-                post=post,
-                sender=user,
-                user=post.author,
-                notification_types=1,
-                text_preview="Double liked your post"
-            )
-            
-        post.save()
-        
+        likes_count = likes.double_like(post, user)
+
+        # Notify regardless of previous like status
+        NotificationService.notify(
+            sender=user,
+            user=post.author_id,
+            notification_type=1,
+            post=post,
+            text_preview="Double liked your post"
+        )
+
         # Return JSON response for AJAX
         from django.http import JsonResponse
-        return JsonResponse({'likes_count': post.likes_count})
-        
+        return JsonResponse({'likes_count': likes_count})
+
     # Fallback to redirect if not AJAX
     return redirect(reverse('blog:post_detail', args=[post_id]))
 
@@ -584,45 +469,22 @@ def dislike_post(request, post_id):
     if request.method == 'POST':
         post = get_object_or_404(Post, pk=post_id)
         user = request.user
-        
-        # Remove any existing likes
-        liked = Like.objects.filter(post=post, user=user).exists()
-        if liked:
-            Like.objects.filter(post=post, user=user).delete()
-            post.likes_count -= 1
-            # Remove any like notifications when disliked
-            Notification.objects.filter(
-                post=post,
-                sender=user,
-                user=post.author,
-                notification_types=1
-            ).delete()
-        
-        # Only create dislike notification if the disliker is not the post author
-        if user != post.author:
-            # Clear any existing dislike notifications to prevent duplicates
-            Notification.objects.filter(
-                post=post,
-                sender=user,
-                user=post.author,
-                notification_types=5  # Dislike type
-            ).delete()
-            
-            # Create a new dislike notification
-            Notification.objects.create(
-                post=post,
-                sender=user,
-                user=post.author,
-                notification_types=5,  # Dislike notification type
-                text_preview="Disliked your post"
-            )
-        
-        post.save()
-        
+
+        # Remove any existing like; deleting it retracts its notification
+        likes_count = likes.remove_like(post, user)
+
+        NotificationService.notify(
+            sender=user,
+            user=post.author_id,
+            notification_type=5,  # Dislike notification type
+            post=post,
+            text_preview="Disliked your post"
+        )
+
         # Return JSON response for AJAX
         from django.http import JsonResponse
-        return JsonResponse({'likes_count': post.likes_count})
-        
+        return JsonResponse({'likes_count': likes_count})
+
     # Fallback to redirect if not AJAX
     return redirect(reverse('blog:post_detail', args=[post_id]))
 
@@ -711,12 +573,12 @@ def contact_author_form(request, post_id):
                 receiver=post.author
             )
             
-            # Create notification for post author
-            notification = Notification.objects.create(
-                post=post,
+            # Notify the post author
+            NotificationService.notify(
                 sender=request.user,
-                user=post.author,
-                notification_types=4,  # Message notification type
+                user=post.author_id,
+                notification_type=4,  # Message notification type
+                post=post,
                 text_preview=message_text[:90]  # Preview of the message
             )
             
@@ -763,12 +625,11 @@ def message_user(request, username):
                 receiver=receiver
             )
             
-            # Create notification for the receiver
-            notification = Notification.objects.create(
-                post=None,  # No post for direct messages
+            # Notify the receiver; direct messages have no post
+            NotificationService.notify(
                 sender=request.user,
                 user=receiver,
-                notification_types=4,  # Message notification type
+                notification_type=4,  # Message notification type
                 text_preview=message_text[:90]  # Preview of the message
             )
             
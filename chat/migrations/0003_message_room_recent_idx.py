@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_alter_room_room_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', '-date', '-id'], name='message_room_recent_idx'),
+        ),
+    ]
@@ -48,5 +48,14 @@ class Message(models.Model):
     date = models.DateTimeField(
         default=datetime.datetime.now)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of a room's messages
+            models.Index(
+                fields=['room', '-date', '-id'],
+                name='message_room_recent_idx'
+                ),
+        ]
+
     def __str__(self):
         return f"{str(self.room)} - {self.sender}"
@@ -3,6 +3,7 @@ from marketplace.models import Item  # Remove duplicate import
 from .models import Room, Message
 from .consumers import ChatConsumer
 from .forms import RoomCreationForm
+from backend.pagination import paginate
 from django.contrib.auth import login, logout, authenticate
 from marketplace.models import Item
 from django.db.models import Q
@@ -161,19 +162,21 @@ def room_view(request, room_name):
         )
     creator = existing_room.creator == request.user  # Define creator variable
     current_user = request.user
-    messages = Message.objects.filter(
-        room=existing_room
-        )
-    # print(messages)
-
-    filtered_messages = messages.filter(
-        sender=current_user
+    # Newest messages first for the keyset scan, shown oldest first
+    page = paginate(
+        Message.objects.filter(
+            room=existing_room
+            ).select_related('sender'),
+        cursor=request.GET.get('before'),
+        ordering=('-date', '-id'),
+        per_page=50
         )
-    # print(filtered_messages)
+    messages = list(reversed(page.object_list))
     
     context = {
         "creator": creator,
         "messages": messages,
+        "next_cursor": page.next_cursor,
         "room_name": existing_room.room_name,
         "room": existing_room,
     }
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['-date_listed', '-id'], name='item_recent_idx'),
+        ),
+    ]
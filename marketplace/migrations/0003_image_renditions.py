@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_item_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='image_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.db.models import Max, Q
+from django.db.models.signals import pre_save, post_save
+
+from backend.images import remember_upload_hashes, schedule_image_processing
 # from chat.models import Message
 
 class MarketplaceProfile(models.Model):
@@ -43,6 +46,9 @@ class Item(models.Model):
         blank=True, 
         null=True
         )
+    # Filled in by backend.images after upload
+    image_hash = models.CharField(max_length=64, blank=True, default='')
+    image_renditions = models.JSONField(default=dict, blank=True)
     date_listed = models.DateTimeField(
         default=datetime.datetime.now
         )
@@ -62,12 +68,26 @@ class Item(models.Model):
         blank=True
         )
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the newest listings
+            models.Index(
+                fields=['-date_listed', '-id'],
+                name='item_recent_idx'
+                ),
+        ]
+
     def __str__(self):
         return self.name
 
     @property
     def is_sold(self):
         return self.is_sold
+
+    @staticmethod
+    def process_image(sender, instance, **kwargs):
+        """Render a new item picture's renditions after commit."""
+        schedule_image_processing(instance, 'image')
     
 class ItemMessage(models.Model):
     room = models.ForeignKey(
@@ -163,6 +183,5 @@ class Transaction(models.Model):
         return f"{self.order.item.name} - {self.buyer.username} - {self.seller.username}"
 
 
-
-    
-
+pre_save.connect(remember_upload_hashes, sender=Item)
+post_save.connect(Item.process_image, sender=Item)
@@ -4,12 +4,11 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required 
 from django import forms
 from .models import Item, ItemMessage, CategoryModel
+from backend.pagination import paginate
 from chat.models import Message, Room
 import logging
 from django.views.generic.edit import CreateView
 from .forms import ItemPostForm
-from django.core.files.storage import default_storage
-from PIL import Image
 from django.http import HttpResponseBadRequest
 from django.db.models import Q
 from chat.models import Message
@@ -21,19 +20,7 @@ class ItemPostView(CreateView):
     form_class = ItemPostForm
     template_name = 'marketplace/item_form.html'
 
-    def form_valid(self, form):
-        response = super().form_valid(form)
-        if form.cleaned_data['image']:
-            try:
-                with default_storage.open(
-                    form.instance.image.name, 'rb+') as img_file:
-                    img = Image.open(img_file)
-                    img = img.resize((300, 300)) 
-                    img.save(img_file)
-            except IOError:
-                pass
-
-        return response
+    # Item.image renditions are made in the background (backend.images)
     
 def register(request):
     if request.method == 'POST':
@@ -73,9 +60,15 @@ def user_profile(request):
     return render(request, 'marketplace/user_profile.html', {'user': user})
 
 def index(request):
-    newest_items = Item.objects.order_by('-id')
+    newest_items = paginate(
+        Item.objects.select_related('seller'),
+        cursor=request.GET.get('before'),
+        ordering=('-date_listed', '-id'),
+        per_page=12
+        )
     context = {
         "newest_items": newest_items,
+        "next_cursor": newest_items.next_cursor,
     }
 
     return render(request, "marketplace/index.html", context)
@@ -0,0 +1,55 @@
+import json
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
+from .models import NotificationCounter
+from .push import user_group
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Push a signed-in user's new notifications and unread count to the
+    browser. Each socket joins the user's group on connect and receives
+    the current count straight away; later messages arrive from
+    ``notification.push`` as notifications are written or marked seen.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+        self.user_id = user.id
+        self.group_name = user_group(user.id)
+
+        await self.channel_layer.group_add(
+            self.group_name,
+            self.channel_name
+        )
+        await self.accept()
+        await self.send(text_data=json.dumps({
+            'type': 'unread',
+            'count': await self.unread_count()
+        }))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(
+                self.group_name,
+                self.channel_name
+            )
+
+    async def notification_event(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            **event['notification']
+        }))
+
+    async def notification_unread(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'unread',
+            'count': event['count']
+        }))
+
+    @database_sync_to_async
+    def unread_count(self):
+        return NotificationCounter.unread_for(self.user_id)
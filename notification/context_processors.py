@@ -1,12 +1,16 @@
-from notification.models import Notification
+from notification.models import NotificationCounter
 
 def notifications_processor(request):
     """
-    Context processor that adds notifications to the request context
-    to make them available across all templates.
+    Context processor that adds the unread notification count to the
+    request context to make it available across all templates.
+    The count is passed as a callable so it is only looked up, from the
+    cache, when a template actually renders the badge; the full
+    notification list is loaded by the notifications page alone.
     """
     if request.user.is_authenticated:
+        user_id = request.user.id
         return {
-            'notifications': Notification.objects.filter(user=request.user).order_by('-date'),
+            'unread_notification_count': lambda: NotificationCounter.unread_for(user_id),
         }
-    return {'notifications': []}
+    return {'unread_notification_count': 0}
@@ -1,62 +1,101 @@
+import time
+
 from django.core.management.base import BaseCommand
-from notification.models import Notification
-from collections import defaultdict
-import sys
+from django.db import transaction
+from django.db.models import F, Max, Min
+from django.db.models.functions import RowNumber
+from django.db.models.expressions import Window
+
+from notification.models import Notification, NotificationCounter
+
+
+def ranked_notifications(queryset):
+    """
+    Annotate each notification with its position among the copies of the
+    same (sender, user, post, type) event, oldest first. Every row with a
+    ``copy_number`` above 1 is a duplicate.
+    """
+    return queryset.annotate(
+        copy_number=Window(
+            RowNumber(),
+            partition_by=[
+                F('sender_id'),
+                F('user_id'),
+                F('post_id'),
+                F('notification_types'),
+            ],
+            order_by=[F('date').asc(), F('id').asc()],
+        )
+    )
+
 
 class Command(BaseCommand):
-    help = 'Find and remove duplicate notifications in the database'
+    help = (
+        'Find and remove duplicate notifications in the database, keeping '
+        'the oldest copy of each event. Works through the table in chunks '
+        'of recipients so memory use and lock time stay bounded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Number of recipient user ids handled per statement'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report the duplicates without deleting them'
+        )
 
     def handle(self, *args, **options):
-        # Print to stderr for debugging
-        print("Starting deduplication of notifications...", file=sys.stderr)
-        
-        # Get all notifications
-        all_notifications = Notification.objects.all()
-        total_count = all_notifications.count()
-        print(f"Total notifications: {total_count}", file=sys.stderr)
-        self.stdout.write(f"Total notifications: {total_count}")
-        
-        if total_count == 0:
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        bounds = Notification.objects.aggregate(
+            low=Min('user_id'),
+            high=Max('user_id'),
+        )
+        if bounds['low'] is None:
             self.stdout.write(self.style.SUCCESS("No notifications found in the database."))
             return
-        
-        # Group notifications by key attributes to find duplicates
-        notification_groups = defaultdict(list)
-        
-        for notification in all_notifications:
-            # Create a tuple of attributes that should make a notification unique
-            key = (
-                notification.sender_id,
-                notification.user_id,
-                notification.post_id,
-                notification.notification_types,
-                # Don't include date since duplicates may have different timestamps
+
+        total = Notification.objects.count()
+        self.stdout.write(f"Total notifications: {total}")
+
+        started = time.monotonic()
+        found = deleted = 0
+        span = bounds['high'] - bounds['low'] + 1
+        for low in range(bounds['low'], bounds['high'] + 1, chunk_size):
+            high = low + chunk_size
+            with transaction.atomic():
+                duplicates = list(
+                    ranked_notifications(
+                        Notification.objects.filter(user_id__gte=low, user_id__lt=high)
+                    ).filter(copy_number__gt=1).values_list('id', 'user_id')
+                )
+                found += len(duplicates)
+                if duplicates and not dry_run:
+                    # One DELETE for the whole chunk; the per-row delete
+                    # signals are replaced by one counter resync below.
+                    deleted += Notification.objects.filter(
+                        id__in=[pk for pk, _ in duplicates]
+                    )._raw_delete(Notification.objects.db)
+                    NotificationCounter.resync({user_id for _, user_id in duplicates})
+
+            if duplicates and options['verbosity'] > 1:
+                self.stdout.write(
+                    f"  Duplicate IDs: {', '.join(str(pk) for pk, _ in duplicates)}"
+                )
+            elapsed = time.monotonic() - started
+            done = min(high - bounds['low'], span)
+            self.stdout.write(
+                f"[{done * 100 // span:3d}%] users {low}-{high - 1}: "
+                f"{len(duplicates)} duplicates "
+                f"({found / elapsed if elapsed else 0:.0f} duplicates/s)"
             )
-            notification_groups[key].append(notification)
-        
-        # Find groups with more than one notification (duplicates)
-        duplicate_count = 0
-        deleted_count = 0
-        
-        for key, notifications in notification_groups.items():
-            if len(notifications) > 1:
-                duplicate_count += 1
-                self.stdout.write(f"Found {len(notifications)} duplicates for notification: "
-                                 f"Sender: {notifications[0].sender}, "
-                                 f"User: {notifications[0].user}, "
-                                 f"Post: {notifications[0].post_id}, "
-                                 f"Type: {notifications[0].notification_types}")
-                
-                # Keep the oldest notification and delete the rest
-                notifications.sort(key=lambda x: x.date)  # Sort by date
-                kept = notifications[0]
-                
-                for duplicate in notifications[1:]:
-                    self.stdout.write(f"  Deleting duplicate ID: {duplicate.id} from {duplicate.date}")
-                    duplicate.delete()
-                    deleted_count += 1
-        
+
+        elapsed = time.monotonic() - started
+        action = 'Would delete' if dry_run else 'Deleted'
         self.stdout.write(self.style.SUCCESS(
-            f"Found {duplicate_count} groups of duplicates. "
-            f"Deleted {deleted_count} duplicate notifications."
+            f"Scanned {total} notifications in {elapsed:.2f}s "
+            f"({total / elapsed if elapsed else total:.0f} rows/s). "
+            f"{action} {found if dry_run else deleted} duplicate notifications."
         ))
@@ -1,70 +1,92 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+
 from notification.models import Notification
-from django.contrib.auth.models import User
-from blog.models import Post, Comment, Likes
-import sys
+
 
 class Command(BaseCommand):
-    help = 'Diagnose notification-related issues'
+    help = (
+        'Diagnose notification-related issues. Every section is a single '
+        'grouped query, so the cost does not grow with the number of users.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Number of users and duplicate groups to list'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Rows fetched per round trip when listing duplicates'
+        )
 
     def handle(self, *args, **options):
+        self.started = time.monotonic()
+        self.verbosity = options['verbosity']
+        top = options['top']
         self.stdout.write("======== NOTIFICATION DIAGNOSTIC TOOL ========")
-        
-        # 1. Check total notifications
-        total_notifications = Notification.objects.count()
-        self.stdout.write(f"Total notifications in database: {total_notifications}")
-        
-        # 2. Check notifications by type
-        likes_notifications = Notification.objects.filter(notification_types=1).count()
-        comment_notifications = Notification.objects.filter(notification_types=2).count()
-        follow_notifications = Notification.objects.filter(notification_types=3).count()
-        
-        self.stdout.write(f"Likes notifications: {likes_notifications}")
-        self.stdout.write(f"Comment notifications: {comment_notifications}")
-        self.stdout.write(f"Follow notifications: {follow_notifications}")
-        
-        # 3. Check if there are users with excessive notifications
-        users = User.objects.all()
-        for user in users:
-            notification_count = Notification.objects.filter(user=user).count()
-            if notification_count > 0:
-                self.stdout.write(f"User '{user.username}' has {notification_count} notifications")
-                
-                # Check if this user has duplicate notifications
-                likes_to_check = {}
-                comments_to_check = {}
-                
-                for notification in Notification.objects.filter(user=user):
-                    if notification.notification_types == 1 and notification.post_id:  # Like
-                        key = (notification.sender_id, notification.post_id)
-                        if key in likes_to_check:
-                            likes_to_check[key] += 1
-                        else:
-                            likes_to_check[key] = 1
-                    
-                    elif notification.notification_types == 2 and notification.post_id:  # Comment
-                        key = (notification.sender_id, notification.post_id)
-                        if key in comments_to_check:
-                            comments_to_check[key] += 1
-                        else:
-                            comments_to_check[key] = 1
-                
-                # Report duplicates
-                for (sender_id, post_id), count in likes_to_check.items():
-                    if count > 1:
-                        sender = User.objects.get(id=sender_id)
-                        post = Post.objects.get(id=post_id)
-                        self.stdout.write(f"  DUPLICATE: {count} like notifications from {sender.username} on post '{post.title}'")
-                
-                for (sender_id, post_id), count in comments_to_check.items():
-                    if count > 1:
-                        sender = User.objects.get(id=sender_id)
-                        post = Post.objects.get(id=post_id)
-                        self.stdout.write(f"  DUPLICATE: {count} comment notifications from {sender.username} on post '{post.title}'")
-        
+
+        # 1. Totals by type
+        by_type = dict(
+            Notification.objects.values_list('notification_types')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        self.stdout.write(f"Total notifications in database: {sum(by_type.values())}")
+        for notification_type, label in Notification.NOTIFICATION_TYPES:
+            self.stdout.write(f"{label} notifications: {by_type.get(notification_type, 0)}")
+        self.progress('totals')
+
+        # 2. Users with the most notifications
+        self.stdout.write(f"\nUsers with the most notifications (top {top}):")
+        heaviest = (
+            Notification.objects.values('user__username')
+            .annotate(total=Count('id'))
+            .order_by('-total', 'user__username')[:top]
+        )
+        for row in heaviest:
+            self.stdout.write(f"User '{row['user__username']}' has {row['total']} notifications")
+        self.progress('users')
+
+        # 3. Duplicated events, largest groups first
+        duplicates = (
+            Notification.objects.values(
+                'sender_id', 'user_id', 'post_id', 'notification_types'
+            )
+            .annotate(
+                copies=Count('id'),
+                sender_name=F('sender__username'),
+                user_name=F('user__username'),
+                post_title=F('post__title'),
+            )
+            .filter(copies__gt=1)
+            .order_by('-copies')
+        )
+        summary = duplicates.aggregate(
+            groups=Count('copies'),
+            extra=Sum('copies') - Count('copies'),
+        )
+        self.stdout.write(
+            f"\nDuplicate groups: {summary['groups']}, "
+            f"redundant rows: {summary['extra'] or 0}"
+        )
+        labels = dict(Notification.NOTIFICATION_TYPES)
+        for row in duplicates[:top].iterator(chunk_size=options['chunk_size']):
+            target = f" on post '{row['post_title']}'" if row['post_id'] else ''
+            self.stdout.write(
+                f"  DUPLICATE: {row['copies']} "
+                f"{labels.get(row['notification_types'], 'unknown').lower()} "
+                f"notifications from {row['sender_name']} to {row['user_name']}{target}"
+            )
+        self.progress('duplicates')
+
         # 4. Print out individual notifications for inspection
         self.stdout.write("\nIndividual notifications (sample of up to 10):")
-        sample_notifications = Notification.objects.all().order_by('-date')[:10]
+        sample_notifications = Notification.objects.select_related(
+            'sender', 'user', 'post'
+            ).order_by('-date', '-id')[:10]
         for i, notification in enumerate(sample_notifications):
             self.stdout.write(f"\n--- Notification {i+1} ---")
             self.stdout.write(f"ID: {notification.id}")
@@ -75,5 +97,13 @@ class Command(BaseCommand):
                 self.stdout.write(f"Post: {notification.post.title}")
             self.stdout.write(f"Date: {notification.date}")
             self.stdout.write(f"Is seen: {notification.is_seen}")
-        
-        self.stdout.write("\nDiagnostic complete!")
+
+        self.stdout.write(
+            f"\nDiagnostic complete in {time.monotonic() - self.started:.2f}s!"
+        )
+
+    def progress(self, section):
+        if self.verbosity > 1:
+            self.stdout.write(
+                f"  ({section} done at {time.monotonic() - self.started:.2f}s)"
+            )
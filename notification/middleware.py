@@ -0,0 +1,15 @@
+from .services import NotificationService
+
+
+class NotificationBufferMiddleware:
+    """
+    Collect the notifications written while handling a request and flush
+    them in one batch once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with NotificationService.batch():
+            return self.get_response(request)
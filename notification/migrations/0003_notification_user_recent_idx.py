@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0002_alter_notification_notification_types"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "-date", "-id"], name="notification_user_recent_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep the newest notification of every (sender, user, post, type)."""
+    Notification = apps.get_model("notification", "Notification")
+    keep = (
+        Notification.objects.values(
+            "sender_id", "user_id", "post_id", "notification_types"
+        )
+        .annotate(keep_id=models.Max("id"), copies=models.Count("id"))
+        .filter(copies__gt=1)
+    )
+    for group in keep.iterator():
+        Notification.objects.filter(
+            sender_id=group["sender_id"],
+            user_id=group["user_id"],
+            post_id=group["post_id"],
+            notification_types=group["notification_types"],
+        ).exclude(id=group["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notification", "0004_notificationcounter"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                fields=("sender", "user", "post", "notification_types"),
+                name="unique_notification_event",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("post__isnull", True)),
+                fields=("sender", "user", "notification_types"),
+                name="unique_notification_event_no_post",
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_status_recent_idx'),
+        ('notification', '0005_unique_notification_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_types', models.IntegerField(choices=[(1, 'Like'), (2, 'Comment'), (3, 'Follow'), (4, 'Message'), (5, 'Dislike')])),
+                ('window_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_senders', models.JSONField(default=list)),
+                ('date', models.DateTimeField()),
+                ('is_seen', models.BooleanField(default=False)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_groups', to='blog.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_groups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-date', '-id'], name='notification_group_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'post', 'notification_types', 'window_start'), name='unique_notification_group')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_listed_senders(apps, schema_editor):
+    # Older senders of existing groups weren't kept; their retractions
+    # are ignored rather than guessed at
+    NotificationGroup = apps.get_model('notification', 'NotificationGroup')
+    NotificationGroupSender = apps.get_model('notification', 'NotificationGroupSender')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    for group in NotificationGroup.objects.iterator(chunk_size=1000):
+        NotificationGroupSender.objects.bulk_create(
+            [
+                NotificationGroupSender(group_id=group.pk, sender_id=sender_id)
+                for sender_id in User.objects.filter(
+                    pk__in=group.last_senders
+                ).values_list('pk', flat=True)
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0006_notificationgroup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationGroupSender',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='notification.notificationgroup')),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('group', 'sender'), name='unique_notification_group_sender')],
+            },
+        ),
+        migrations.RunPython(count_listed_senders, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,10 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
+from . import push
 # from post.models import Post
 
 class Notification(models.Model):
@@ -41,5 +46,274 @@ class Notification(models.Model):
         )
     is_seen = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            # One row per event; repeated events update it in place
+            models.UniqueConstraint(
+                fields=['sender', 'user', 'post', 'notification_types'],
+                name='unique_notification_event'
+                ),
+            # NULLs are distinct in the constraint above, so follows and
+            # direct messages need their own partial constraint
+            models.UniqueConstraint(
+                fields=['sender', 'user', 'notification_types'],
+                condition=models.Q(post__isnull=True),
+                name='unique_notification_event_no_post'
+                ),
+        ]
+        indexes = [
+            # Keyset pagination of a user's notifications
+            models.Index(
+                fields=['user', '-date', '-id'],
+                name='notification_user_recent_idx'
+                ),
+        ]
+
+    # Seen flag as last read from or written to the database; lets the
+    # unread counter tell a seen/unseen transition from an ordinary save.
+    _loaded_is_seen = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_seen = instance.__dict__.get('is_seen')
+        return instance
+
+    @staticmethod
+    def count_saved(sender, instance, created, **kwargs):
+        if created:
+            delta = 0 if instance.is_seen else 1
+        elif instance._loaded_is_seen is None or \
+                instance._loaded_is_seen == instance.is_seen:
+            delta = 0
+        else:
+            delta = -1 if instance.is_seen else 1
+        instance._loaded_is_seen = instance.is_seen
+        if delta:
+            NotificationCounter.adjust(instance.user_id, delta)
+
+    @staticmethod
+    def count_deleted(sender, instance, *args, **kwargs):
+        if not instance.is_seen:
+            NotificationCounter.adjust(instance.user_id, -1)
+
     # def __str__(self):
     #     return self.text_preview
+
+
+class NotificationGroup(models.Model):
+    """
+    Rolled-up notifications: every event of one type on one post inside
+    the same NOTIFICATION_ROLLUP_WINDOW collapses into a single row holding
+    the number of senders and the most recent few of them, so "12 people
+    liked your post" is one row to store and render instead of twelve.
+    Rows are updated incrementally by NotificationService as events flush.
+    """
+    # Event types that are rolled up when rollup mode is on
+    ROLLUP_TYPES = (1, 2, 5)
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notification_groups'
+        )
+    post = models.ForeignKey(
+        "blog.Post",
+        on_delete=models.CASCADE,
+        related_name='notification_groups'
+        )
+    notification_types = models.IntegerField(
+        choices=Notification.NOTIFICATION_TYPES
+        )
+    window_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    # Ids of the most recent senders, newest first, at most
+    # NOTIFICATION_GROUP_SENDERS of them
+    last_senders = models.JSONField(default=list)
+    date = models.DateTimeField()
+    is_seen = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post', 'notification_types', 'window_start'],
+                name='unique_notification_group'
+                ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-date', '-id'],
+                name='notification_group_recent_idx'
+                ),
+        ]
+
+    @staticmethod
+    def count_deleted(sender, instance, *args, **kwargs):
+        if not instance.is_seen:
+            NotificationCounter.adjust(instance.user_id, -1)
+
+    @property
+    def others(self):
+        """Number of senders not listed in last_senders."""
+        return max(self.count - len(self.last_senders), 0)
+
+
+class NotificationGroupSender(models.Model):
+    """
+    One sender counted in a NotificationGroup. A retraction only uncounts
+    a sender that has a row here, and a repeat event doesn't count twice.
+    """
+    group = models.ForeignKey(
+        NotificationGroup,
+        on_delete=models.CASCADE,
+        related_name='members'
+        )
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+        )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'sender'],
+                name='unique_notification_group_sender'
+                ),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """
+    Denormalized number of unseen notifications per user, so the navbar
+    badge never has to count the notification table.
+    The row is adjusted with an atomic F() update whenever a notification
+    is created, deleted or marked seen, and the value is cached per user;
+    a cache hit costs no queries at all. Entries expire after
+    NOTIFICATION_COUNT_CACHE_SECONDS and are evicted by the cache
+    backend's own culling (LRU for the local-memory cache) under pressure.
+    With several workers the cache must be shared (CACHE_REDIS_URL), or an
+    invalidation only reaches the worker that made it.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='notification_counter'
+        )
+    unread = models.IntegerField(default=0)
+
+    @staticmethod
+    def cache_key(user_id):
+        return f'notifications:unread:{user_id}'
+
+    @classmethod
+    def invalidate(cls, user_id):
+        # Drop the cached value now and again once the transaction commits,
+        # so a concurrent reader can't re-cache the pre-commit value.
+        key = cls.cache_key(user_id)
+        cache.delete(key)
+        transaction.on_commit(lambda: cache.delete(key))
+        # A failed push must not fail the request that already committed
+        transaction.on_commit(lambda: cls.publish(user_id), robust=True)
+
+    @classmethod
+    def publish(cls, user_id):
+        """Push a user's current unread count to their open sockets."""
+        if not push.enabled():
+            return
+        push.send(user_id, {
+            'type': 'notification.unread',
+            'count': cls.unread_for(user_id),
+        })
+
+    @classmethod
+    def adjust(cls, user_id, delta):
+        """
+        Apply ``delta`` to a user's unread count in one UPDATE. Users
+        without a counter row yet are left alone; the row is seeded from
+        the notification table on its first read.
+        """
+        cls.objects.filter(user_id=user_id).update(unread=F('unread') + delta)
+        cls.invalidate(user_id)
+
+    @classmethod
+    def unread_for(cls, user_id):
+        """Return a user's unread count: cache, then counter row, then seed."""
+        key = cls.cache_key(user_id)
+        unread = cache.get(key)
+        if unread is not None:
+            return unread
+
+        unread = cls.objects.filter(
+            user_id=user_id
+            ).values_list('unread', flat=True).first()
+        if unread is None:
+            counter, _ = cls.objects.get_or_create(
+                user_id=user_id,
+                defaults={
+                    'unread': Notification.objects.filter(
+                        user_id=user_id,
+                        is_seen=False
+                        ).count() + NotificationGroup.objects.filter(
+                            user_id=user_id,
+                            is_seen=False
+                            ).count()
+                }
+            )
+            unread = counter.unread
+        unread = max(unread, 0)
+        cache.set(key, unread, settings.NOTIFICATION_COUNT_CACHE_SECONDS)
+        return unread
+
+    @classmethod
+    def resync(cls, user_ids):
+        """
+        Recount the unread notifications of ``user_ids`` with one grouped
+        query and upsert their counters in one statement. Used after bulk
+        writes, which don't send the signals that keep counters current.
+        """
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        counts = dict.fromkeys(user_ids, 0)
+        for model in (Notification, NotificationGroup):
+            for user_id, unread in model.objects.filter(
+                    user_id__in=user_ids,
+                    is_seen=False
+                    ).values_list('user_id').annotate(unread=models.Count('id')):
+                counts[user_id] += unread
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, unread=unread) for user_id, unread in counts.items()],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['unread'],
+        )
+        for user_id in user_ids:
+            cls.invalidate(user_id)
+
+    @classmethod
+    def mark_seen(cls, user_id, notification_ids, group_ids=()):
+        """
+        Mark the given notifications and notification groups seen and
+        decrement the counter once.
+        """
+        seen = Notification.objects.filter(
+            user_id=user_id,
+            id__in=notification_ids,
+            is_seen=False
+            ).update(is_seen=True)
+        if group_ids:
+            seen += NotificationGroup.objects.filter(
+                user_id=user_id,
+                id__in=group_ids,
+                is_seen=False
+                ).update(is_seen=True)
+        if seen:
+            cls.adjust(user_id, -seen)
+        return seen
+
+
+post_save.connect(Notification.count_saved, sender=Notification)
+post_delete.connect(Notification.count_deleted, sender=Notification)
+post_delete.connect(NotificationGroup.count_deleted, sender=NotificationGroup)
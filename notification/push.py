@@ -0,0 +1,28 @@
+"""
+Real-time delivery of notifications to ``NotificationConsumer`` sockets.
+
+Every user has a channel-layer group that their open sockets join. The
+notification writer sends new events and the unread counter sends fresh
+counts to that group once the transaction that produced them commits, so
+clients update their badge without polling and without re-rendering a
+page. Without a configured channel layer these calls do nothing.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def user_group(user_id):
+    """Name of the channel-layer group a user's sockets belong to."""
+    return f'notifications_{user_id}'
+
+
+def enabled():
+    return get_channel_layer() is not None
+
+
+def send(user_id, message):
+    """Send ``message`` to every open notification socket of a user."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(user_group(user_id), message)
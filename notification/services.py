@@ -0,0 +1,338 @@
+"""
+Buffered, coalescing notification writer.
+
+Views and signal handlers used to delete-then-insert a ``Notification`` for
+every like, comment, follow and message, often twice for one action (once
+from the view and once from a signal), which produced duplicates. They now
+call ``NotificationService.notify`` / ``retract`` instead. Events are
+collected in a per-request buffer, coalesced on their
+``(sender, user, post, type)`` key -- the last event for a key wins -- and
+written when the request finishes:
+
+* retractions: one ``DELETE``;
+* events on a post: one ``INSERT ... ON CONFLICT DO UPDATE`` against the
+  ``unique_notification_event`` constraint;
+* events without a post: one ``UPDATE`` plus one ``INSERT ... ON CONFLICT
+  DO NOTHING`` against the partial ``unique_notification_event_no_post``
+  constraint (a partial index can't be named as an upsert target);
+* unread counters of the touched users: one grouped count and one upsert.
+
+Once the transaction commits, each new event and each touched user's
+unread count is pushed to the user's open ``NotificationConsumer`` sockets.
+
+With ``NOTIFICATION_ROLLUP_WINDOW`` set, likes, dislikes and comments on a
+post skip the row-per-event table and are folded into ``NotificationGroup``
+rows instead: an insert of groups new to the window, one locking
+``SELECT`` of the affected groups and one of the senders already counted
+in them, an insert and a delete of ``NotificationGroupSender`` rows, one
+update of the groups' counts and recent senders, and a ``DELETE`` for
+groups whose last sender was retracted.
+
+Outside a request (shell, management commands, tests calling models
+directly) each call is flushed on its own, unless wrapped in
+``NotificationService.batch()``.
+"""
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from . import push
+from .models import (
+    Notification, NotificationCounter, NotificationGroup, NotificationGroupSender
+)
+
+_buffer = contextvars.ContextVar('notification_buffer', default=None)
+
+
+def _event_key(sender, user, notification_type, post):
+    def pk(obj):
+        return getattr(obj, 'pk', obj)
+    return (pk(sender), pk(user), pk(post), notification_type)
+
+
+def _key_filter(keys):
+    clauses = []
+    for sender_id, user_id, post_id, notification_type in keys:
+        clause = Q(
+            sender_id=sender_id,
+            user_id=user_id,
+            notification_types=notification_type
+            )
+        if post_id is None:
+            clause &= Q(post__isnull=True)
+        else:
+            clause &= Q(post_id=post_id)
+        clauses.append(clause)
+    return reduce(or_, clauses)
+
+
+class NotificationBuffer:
+    """Pending notification writes, coalesced by event key."""
+
+    def __init__(self):
+        self.events = {}
+        self.retractions = set()
+
+    def add(self, key, text_preview):
+        self.retractions.discard(key)
+        self.events[key] = text_preview
+
+    def remove(self, key):
+        self.events.pop(key, None)
+        self.retractions.add(key)
+
+    def __bool__(self):
+        return bool(self.events or self.retractions)
+
+    def flush(self):
+        """Write everything buffered in a fixed number of statements."""
+        if not self:
+            return
+        events, retractions = self.events, self.retractions
+        self.events, self.retractions = {}, set()
+
+        touched_users = {key[1] for key in events} | {key[1] for key in retractions}
+        with transaction.atomic():
+            if events:
+                published = dict(events)
+                transaction.on_commit(
+                    lambda: self._publish(published), robust=True
+                    )
+            if retractions:
+                Notification.objects.filter(_key_filter(retractions)).delete()
+
+            if settings.NOTIFICATION_ROLLUP_WINDOW:
+                rolled_up = [
+                    key for key in events
+                    if key[2] is not None and key[3] in NotificationGroup.ROLLUP_TYPES
+                ]
+                self._roll_up(
+                    rolled_up,
+                    [
+                        key for key in retractions
+                        if key[2] is not None and key[3] in NotificationGroup.ROLLUP_TYPES
+                    ]
+                )
+                for key in rolled_up:
+                    del events[key]
+
+            with_post = {k: v for k, v in events.items() if k[2] is not None}
+            if with_post:
+                Notification.objects.bulk_create(
+                    [self._build(key, text) for key, text in with_post.items()],
+                    update_conflicts=True,
+                    unique_fields=['sender', 'user', 'post', 'notification_types'],
+                    update_fields=['text_preview', 'date', 'is_seen'],
+                )
+
+            without_post = {k: v for k, v in events.items() if k[2] is None}
+            if without_post:
+                Notification.objects.filter(_key_filter(without_post)).update(
+                    text_preview=Case(
+                        *[
+                            When(_key_filter([key]), then=Value(text))
+                            for key, text in without_post.items()
+                        ],
+                        default='text_preview'
+                    ),
+                    date=timezone.now(),
+                    is_seen=False,
+                )
+                Notification.objects.bulk_create(
+                    [self._build(key, text) for key, text in without_post.items()],
+                    ignore_conflicts=True,
+                )
+
+            NotificationCounter.resync(touched_users)
+
+    @staticmethod
+    def _roll_up(added, removed):
+        """
+        Fold sender events into the current window's NotificationGroup
+        rows. Every counted sender has a NotificationGroupSender row, so a
+        repeat event only moves its sender to the front of
+        ``last_senders`` and a retraction only uncounts a sender counted in
+        the current window; groups from earlier windows are left as
+        history.
+        """
+        if not added and not removed:
+            return
+        window = settings.NOTIFICATION_ROLLUP_WINDOW
+        now = timezone.now()
+        window_start = datetime.fromtimestamp(
+            now.timestamp() // window * window, tz=dt_timezone.utc
+            )
+
+        changes = defaultdict(lambda: ([], []))
+        for sender_id, user_id, post_id, notification_type in added:
+            changes[(user_id, post_id, notification_type)][0].append(sender_id)
+        for sender_id, user_id, post_id, notification_type in removed:
+            changes[(user_id, post_id, notification_type)][1].append(sender_id)
+
+        # Groups gaining senders must exist before members can point at them
+        new_groups = [
+            NotificationGroup(
+                user_id=user_id,
+                post_id=post_id,
+                notification_types=notification_type,
+                window_start=window_start,
+                date=now,
+            )
+            for (user_id, post_id, notification_type), (senders_in, _) in changes.items()
+            if senders_in
+        ]
+        if new_groups:
+            NotificationGroup.objects.bulk_create(new_groups, ignore_conflicts=True)
+
+        groups = {
+            (group.user_id, group.post_id, group.notification_types): group
+            for group in NotificationGroup.objects.select_for_update().filter(
+                reduce(or_, [
+                    Q(user_id=user_id, post_id=post_id, notification_types=notification_type)
+                    for user_id, post_id, notification_type in changes
+                ]),
+                window_start=window_start
+                )
+        }
+        if not groups:
+            return
+        # Read under the group locks, so two flushes can't both count a sender
+        members = set(NotificationGroupSender.objects.filter(
+            group__in=groups.values(),
+            sender_id__in={
+                sender_id
+                for senders_in, senders_out in changes.values()
+                for sender_id in senders_in + senders_out
+            },
+            ).values_list('group_id', 'sender_id'))
+
+        joined = []
+        left = []
+        updated = []
+        emptied = []
+        for key, (senders_in, senders_out) in changes.items():
+            group = groups.get(key)
+            if group is None:
+                continue
+            gone = [sender_id for sender_id in senders_out if (group.pk, sender_id) in members]
+            new = [sender_id for sender_id in senders_in if (group.pk, sender_id) not in members]
+            if group.count + len(new) - len(gone) <= 0:
+                emptied.append(group.pk)
+                continue
+            if not (senders_in or gone):
+                continue
+
+            joined += [NotificationGroupSender(group=group, sender_id=sender_id) for sender_id in new]
+            if gone:
+                left.append(Q(group=group, sender_id__in=gone))
+            listed = [
+                sender_id for sender_id in group.last_senders
+                if sender_id not in gone and sender_id not in senders_in
+                ]
+            group.last_senders = (senders_in[::-1] + listed)[:settings.NOTIFICATION_GROUP_SENDERS]
+            group.count = F('count') + len(new) - len(gone)
+            if senders_in:
+                group.date = now
+                group.is_seen = False
+            updated.append(group)
+
+        if joined:
+            NotificationGroupSender.objects.bulk_create(joined)
+        if left:
+            NotificationGroupSender.objects.filter(reduce(or_, left)).delete()
+        if updated:
+            NotificationGroup.objects.bulk_update(
+                updated, ['count', 'last_senders', 'date', 'is_seen']
+            )
+        if emptied:
+            NotificationGroup.objects.filter(pk__in=emptied).delete()
+
+    @staticmethod
+    def _publish(events):
+        """Push committed events to their recipients' sockets."""
+        if not push.enabled():
+            return
+        senders = User.objects.in_bulk({key[0] for key in events})
+        for (sender_id, user_id, post_id, notification_type), text in events.items():
+            sender = senders.get(sender_id)
+            push.send(user_id, {
+                'type': 'notification.event',
+                'notification': {
+                    'notification_type': notification_type,
+                    'sender': sender.username if sender else None,
+                    'post_id': post_id,
+                    'text_preview': text,
+                },
+            })
+
+    @staticmethod
+    def _build(key, text_preview):
+        sender_id, user_id, post_id, notification_type = key
+        return Notification(
+            sender_id=sender_id,
+            user_id=user_id,
+            post_id=post_id,
+            notification_types=notification_type,
+            text_preview=text_preview,
+        )
+
+
+class NotificationService:
+    """
+    Entry point for creating and removing notifications.
+    """
+
+    @staticmethod
+    def notify(sender, user, notification_type, post=None, text_preview=''):
+        """
+        Record that ``sender`` did something ``user`` should hear about.
+        Self-notifications are dropped.
+        """
+        key = _event_key(sender, user, notification_type, post)
+        if key[0] == key[1]:
+            return
+        NotificationService._apply(lambda buffer: buffer.add(key, text_preview[:100]))
+
+    @staticmethod
+    def retract(sender, user, notification_type, post=None):
+        """Remove a notification, e.g. when a like or follow is undone."""
+        key = _event_key(sender, user, notification_type, post)
+        NotificationService._apply(lambda buffer: buffer.remove(key))
+
+    @staticmethod
+    def _apply(change):
+        buffer = _buffer.get()
+        if buffer is not None:
+            change(buffer)
+            return
+        buffer = NotificationBuffer()
+        change(buffer)
+        buffer.flush()
+
+    @staticmethod
+    @contextmanager
+    def batch():
+        """
+        Buffer every notification written inside the block and flush them
+        together on exit. Nested batches share the outermost buffer. If the
+        block raises, the buffered writes are discarded.
+        """
+        if _buffer.get() is not None:
+            yield _buffer.get()
+            return
+        buffer = NotificationBuffer()
+        token = _buffer.set(buffer)
+        try:
+            yield buffer
+        finally:
+            _buffer.reset(token)
+        buffer.flush()
@@ -0,0 +1,80 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from blog.models import Post
+from notification.management.commands.deduplicate_notifications import ranked_notifications
+from notification.models import Notification
+
+
+class NotificationCommandTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+
+    def add_users(self, count):
+        for _ in range(count):
+            fan = User.objects.create_user(username=f'fan{User.objects.count()}')
+            Notification.objects.create(
+                sender=fan, user=self.author, post=self.post, notification_types=1
+                )
+            Notification.objects.create(
+                sender=self.author, user=fan, notification_types=3
+                )
+
+    def run_command(self, name, *args):
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command(name, *args, stdout=out)
+        return out.getvalue(), len(queries)
+
+    def test_ranking_numbers_copies_oldest_first(self):
+        self.add_users(2)
+        ranked = ranked_notifications(Notification.objects.all())
+        # The unique constraints keep real duplicates out, so every event
+        # is the first and only copy
+        self.assertEqual(
+            set(ranked.values_list('copy_number', flat=True)), {1}
+            )
+        self.assertFalse(ranked.filter(copy_number__gt=1).exists())
+
+    def test_deduplicate_dry_run_deletes_nothing(self):
+        self.add_users(3)
+        output, _ = self.run_command('deduplicate_notifications', '--dry-run')
+        self.assertIn('Scanned 6 notifications', output)
+        self.assertIn('Would delete 0 duplicate notifications', output)
+        self.assertEqual(Notification.objects.count(), 6)
+
+    def test_deduplicate_statements_scale_with_chunks_not_rows(self):
+        self.add_users(3)
+        first = User.objects.order_by('id').first().id
+        last = User.objects.order_by('id').last().id
+        chunk_size = last - first + 1
+
+        _, few = self.run_command(
+            'deduplicate_notifications', f'--chunk-size={chunk_size}'
+            )
+        self.add_users(10)
+        _, many = self.run_command(
+            'deduplicate_notifications', f'--chunk-size={chunk_size + 10}'
+            )
+        self.assertEqual(few, many)
+
+    def test_diagnose_query_count_is_constant(self):
+        self.add_users(2)
+        output, few = self.run_command('diagnose_notification_issues')
+        self.assertIn('Total notifications in database: 4', output)
+        self.assertIn('Like notifications: 2', output)
+        self.assertIn('Duplicate groups: 0, redundant rows: 0', output)
+
+        self.add_users(10)
+        _, many = self.run_command('diagnose_notification_issues')
+        self.assertEqual(few, many)
@@ -0,0 +1,81 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from notification.models import Notification, NotificationCounter
+
+
+class UnreadCounterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password1')
+        self.sender = User.objects.create_user(username='user2', password='password2')
+        self.sent = 0
+
+    def notify(self, **kwargs):
+        # A new follower each time, as (sender, user, type) is unique
+        self.sent += 1
+        sender = User.objects.create_user(username=f'follower{self.sent}')
+        return Notification.objects.create(
+            sender=sender,
+            user=self.user,
+            notification_types=3,
+            **kwargs
+        )
+
+    def test_first_read_seeds_counter(self):
+        self.notify()
+        self.notify(is_seen=True)
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 1)
+        self.assertEqual(
+            NotificationCounter.objects.get(user=self.user).unread, 1
+            )
+
+    def test_counter_tracks_create_seen_and_delete(self):
+        NotificationCounter.unread_for(self.user.id)
+        first = self.notify()
+        second = self.notify()
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 2)
+
+        first.is_seen = True
+        first.save()
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 1)
+
+        # Re-saving a seen notification does not count it twice
+        first.text_preview = 'edited'
+        first.save()
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 1)
+
+        second.delete()
+        first.delete()
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 0)
+        self.assertEqual(
+            NotificationCounter.unread_for(self.user.id),
+            Notification.objects.filter(user=self.user, is_seen=False).count()
+            )
+
+    def test_cache_hit_costs_no_queries(self):
+        self.notify()
+        NotificationCounter.unread_for(self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(NotificationCounter.unread_for(self.user.id), 1)
+
+    def test_badge_and_notifications_page(self):
+        for _ in range(3):
+            self.notify()
+        client = Client()
+        client.login(username='user1', password='password1')
+
+        response = client.get(reverse('blog:index'))
+        self.assertEqual(response.context['unread_notification_count'](), 3)
+        self.assertNotIn('notifications', response.context)
+
+        response = client.get(reverse('notification:show-all-notifications'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['notifications']), 3)
+        self.assertEqual(response.context['unread_count'], 3)
+        # Viewing the page marks the shown notifications seen
+        self.assertEqual(NotificationCounter.unread_for(self.user.id), 0)
+        self.assertFalse(
+            Notification.objects.filter(user=self.user, is_seen=False).exists()
+            )
@@ -0,0 +1,98 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from blog.models import Post, Like
+from notification.models import Notification, NotificationCounter, NotificationGroup
+from notification.services import NotificationService
+
+
+@override_settings(NOTIFICATION_ROLLUP_WINDOW=3600, NOTIFICATION_GROUP_SENDERS=3)
+class NotificationGroupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fans = [
+            User.objects.create_user(username=f'fan{i}', password='password2')
+            for i in range(12)
+        ]
+        self.post = Post.objects.create(
+            title='Popular Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+
+    def like(self, fan):
+        return Like.objects.create(user=fan, post=self.post)
+
+    def test_likes_roll_up_into_one_group(self):
+        for fan in self.fans:
+            self.like(fan)
+
+        self.assertFalse(Notification.objects.exists())
+        group = NotificationGroup.objects.get()
+        self.assertEqual(group.count, 12)
+        self.assertEqual(
+            group.last_senders,
+            [fan.id for fan in reversed(self.fans[-3:])]
+            )
+        self.assertEqual(group.others, 9)
+        self.assertEqual(NotificationCounter.unread_for(self.author.id), 1)
+
+    def test_repeat_sender_is_not_counted_twice(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        NotificationService.notify(self.fans[0], self.author, 1, post=self.post)
+        group = NotificationGroup.objects.get()
+        self.assertEqual(group.count, 2)
+        self.assertEqual(group.last_senders, [self.fans[0].id, self.fans[1].id])
+
+    def test_unlike_decrements_and_removes_empty_group(self):
+        likes = [self.like(fan) for fan in self.fans[:2]]
+        likes[0].delete()
+        group = NotificationGroup.objects.get()
+        self.assertEqual(group.count, 1)
+        self.assertEqual(group.last_senders, [self.fans[1].id])
+
+        likes[1].delete()
+        self.assertFalse(NotificationGroup.objects.exists())
+        self.assertEqual(NotificationCounter.unread_for(self.author.id), 0)
+
+    def test_retraction_by_sender_outside_the_window_is_ignored(self):
+        for fan in self.fans[:5]:
+            self.like(fan)
+        # Liked in an earlier window, or never rolled up at all
+        NotificationService.retract(self.fans[5], self.author, 1, post=self.post)
+        group = NotificationGroup.objects.get()
+        self.assertEqual(group.count, 5)
+
+        # Senders no longer listed are still uncounted
+        NotificationService.retract(self.fans[0], self.author, 1, post=self.post)
+        group.refresh_from_db()
+        self.assertEqual(group.count, 4)
+        self.assertEqual(group.others, 1)
+
+    def test_group_update_is_a_fixed_number_of_statements(self):
+        self.like(self.fans[0])
+        # savepoint, new group insert, group lock, counted senders,
+        # sender insert, group update, counter recount x2 and upsert,
+        # release
+        with self.assertNumQueries(10):
+            with NotificationService.batch():
+                for fan in self.fans[1:]:
+                    NotificationService.notify(fan, self.author, 1, post=self.post)
+        group = NotificationGroup.objects.get()
+        self.assertEqual(group.count, 12)
+        self.assertEqual(group.members.count(), 12)
+
+    def test_notifications_page_renders_groups(self):
+        for fan in self.fans:
+            self.like(fan)
+        client = Client()
+        client.login(username='author', password='password1')
+        with self.assertNumQueries(8):
+            response = client.get(reverse('notification:show-all-notifications'))
+        self.assertContains(response, 'and 9 others')
+        self.assertContains(response, 'fan11')
+        self.assertEqual(NotificationCounter.unread_for(self.author.id), 0)
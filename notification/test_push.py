@@ -0,0 +1,102 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from blog.models import Post
+from notification.consumers import NotificationConsumer
+from notification.models import NotificationCounter
+from notification.push import user_group
+from notification.services import NotificationService
+
+IN_MEMORY_LAYER = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+}
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class NotificationPushTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fan = User.objects.create_user(username='fan', password='password2')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)(user_group(self.author.id), self.channel)
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def receive(self):
+        return async_to_sync(self.layer.receive)(self.channel)
+
+    def test_flush_pushes_event_and_unread_count_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.notify(
+                self.fan, self.author, 1, post=self.post, text_preview='Liked'
+                )
+
+        messages = [self.receive(), self.receive()]
+        self.assertEqual(
+            sorted(message['type'] for message in messages),
+            ['notification.event', 'notification.unread']
+            )
+        event = next(m for m in messages if m['type'] == 'notification.event')
+        self.assertEqual(event['notification'], {
+            'notification_type': 1,
+            'sender': 'fan',
+            'post_id': self.post.id,
+            'text_preview': 'Liked',
+        })
+        unread = next(m for m in messages if m['type'] == 'notification.unread')
+        self.assertEqual(unread['count'], 1)
+
+    def test_nothing_is_pushed_before_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            NotificationService.notify(self.fan, self.author, 3)
+        self.assertTrue(callbacks)
+        self.assertEqual(self.layer.channels.get(self.channel, None) or [], [])
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_LAYER)
+class NotificationConsumerTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user1', password='password1')
+        cache.set(NotificationCounter.cache_key(self.user.id), 2)
+
+    def connect(self, user):
+        communicator = WebsocketCommunicator(
+            NotificationConsumer.as_asgi(), '/ws/notifications/'
+            )
+        communicator.scope['user'] = user
+        return communicator
+
+    async def test_socket_receives_count_then_pushes(self):
+        communicator = self.connect(self.user)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(
+            await communicator.receive_json_from(), {'type': 'unread', 'count': 2}
+            )
+
+        await get_channel_layer().group_send(
+            user_group(self.user.id),
+            {'type': 'notification.unread', 'count': 5}
+            )
+        self.assertEqual(
+            await communicator.receive_json_from(), {'type': 'unread', 'count': 5}
+            )
+        await communicator.disconnect()
+
+    async def test_anonymous_socket_is_rejected(self):
+        communicator = self.connect(AnonymousUser())
+        connected, _ = await communicator.connect()
+        self.assertFalse(connected)
@@ -0,0 +1,104 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from blog.models import Post, Like, Follow
+from notification.models import Notification, NotificationCounter
+from notification.services import NotificationService
+
+
+class NotificationServiceTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password1')
+        self.fan = User.objects.create_user(username='fan', password='password2')
+        self.post = Post.objects.create(
+            title='Test Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+
+    def test_batch_coalesces_events(self):
+        with NotificationService.batch():
+            for _ in range(5):
+                NotificationService.notify(
+                    self.fan, self.author, 1, post=self.post, text_preview='Liked'
+                    )
+            NotificationService.notify(
+                self.fan, self.author, 1, post=self.post, text_preview='Double liked'
+                )
+            NotificationService.notify(self.fan, self.author, 3)
+            NotificationService.notify(self.fan, self.author, 3)
+            self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(Notification.objects.count(), 2)
+        like = Notification.objects.get(notification_types=1)
+        self.assertEqual(like.text_preview, 'Double liked')
+        self.assertEqual(NotificationCounter.unread_for(self.author.id), 2)
+
+    def test_flush_is_a_fixed_number_of_statements(self):
+        other = Post.objects.create(
+            title='Other Post',
+            content='Test Content',
+            author=self.author,
+            status='published'
+        )
+        # savepoint, retraction lookup, post upsert, post-less update and
+        # insert, counter recount of rows and groups and upsert, release
+        with self.assertNumQueries(9):
+            with NotificationService.batch():
+                for post in (self.post, other):
+                    for notification_type in (1, 2, 5):
+                        NotificationService.notify(
+                            self.fan, self.author, notification_type, post=post
+                            )
+                NotificationService.notify(self.fan, self.author, 3)
+                NotificationService.retract(self.fan, self.author, 4)
+
+    def test_repeat_events_update_in_place(self):
+        NotificationService.notify(
+            self.fan, self.author, 1, post=self.post, text_preview='Liked'
+            )
+        Notification.objects.update(is_seen=True)
+        NotificationService.notify(
+            self.fan, self.author, 1, post=self.post, text_preview='Liked again'
+            )
+        NotificationService.notify(self.fan, self.author, 4, text_preview='Hi')
+        NotificationService.notify(self.fan, self.author, 4, text_preview='Hello')
+
+        self.assertEqual(Notification.objects.count(), 2)
+        like = Notification.objects.get(notification_types=1)
+        self.assertEqual(like.text_preview, 'Liked again')
+        self.assertFalse(like.is_seen)
+        self.assertEqual(
+            Notification.objects.get(notification_types=4).text_preview, 'Hello'
+            )
+
+    def test_self_notifications_are_dropped(self):
+        NotificationService.notify(self.author, self.author, 1, post=self.post)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_retract_after_notify_in_one_batch(self):
+        with NotificationService.batch():
+            Follow.objects.create(follower=self.fan, following=self.author).delete()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_like_view_writes_one_notification(self):
+        client = Client()
+        client.login(username='fan', password='password2')
+        url = reverse('blog:like_post', args=[self.post.id])
+
+        client.post(url)
+        self.assertEqual(
+            Notification.objects.filter(notification_types=1).count(), 1
+            )
+        client.post(url)
+        self.assertFalse(Like.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+        client.post(url)
+        client.post(reverse('blog:double_like_post', args=[self.post.id]))
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(
+            Notification.objects.get().text_preview, 'Double liked your post'
+            )
@@ -1,28 +1,72 @@
 import importlib
 from django.shortcuts import render, redirect
-from notification.models import Notification
+from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.contrib.auth.models import User
+from notification.models import Notification, NotificationCounter, NotificationGroup
+from backend.pagination import paginate
+
+def notification_groups(user, limit=20):
+    """
+    The user's most recent notification groups, with their posts joined
+    and every listed sender resolved in one extra query.
+    """
+    groups = list(
+        NotificationGroup.objects.filter(
+            user=user
+            ).select_related('post').order_by('-date', '-id')[:limit]
+        )
+    senders = User.objects.in_bulk(
+        {sender_id for group in groups for sender_id in group.last_senders}
+        )
+    for group in groups:
+        group.recent_senders = [
+            senders[sender_id]
+            for sender_id in group.last_senders
+            if sender_id in senders
+        ]
+    return groups
 
 # Show all notifications
+@login_required
 def show_all_notifications(request):
-    # The notifications are already added to the context by our context processor
-    # So we don't need to retrieve them again here
-    return render(
-        request, 
-        'notifications/notifications_clean.html'
-        )
+    return show_notification(request)
     
+@login_required
 def show_notification(request):
     user = request.user
-    notification = Notification.objects.filter(user=user).order_by('-date')
+    notifications = Notification.objects.filter(
+        user=user
+        ).select_related('sender', 'sender__profile', 'post')
+    page = paginate(
+        notifications,
+        cursor=request.GET.get('before'),
+        ordering=('-date', '-id'),
+        per_page=20
+        )
+
+    groups = []
+    if settings.NOTIFICATION_ROLLUP_WINDOW and not page.has_previous():
+        groups = notification_groups(user)
+
+    unread_count = NotificationCounter.unread_for(user.id)
+    # Showing a notification marks it seen
+    NotificationCounter.mark_seen(
+        user.id,
+        [notification.id for notification in page if not notification.is_seen],
+        [group.id for group in groups if not group.is_seen]
+        )
 
     context = {
         'user': user,
-        'notification': notification,
-
+        'notifications': page,
+        'notification_groups': groups,
+        'unread_count': unread_count,
+        'next_cursor': page.next_cursor,
     }
     return render(
         request, 
-        'notifications/notification.html', 
+        'notifications/notifications_clean.html', 
         context
         )
 
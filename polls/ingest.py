@@ -0,0 +1,140 @@
+"""
+Batched vote ingestion.
+
+Recording votes one at a time costs a ``VoteRecord`` insert, a choice
+update and a post rescore per vote. ``ingest_votes`` takes a whole batch
+and writes it in a fixed number of statements:
+
+* one lookup of the voted choices and their questions, and one of the
+  voters that locks their rows;
+* one lookup of the batch's (user, question) pairs that already have a
+  ``VoteRecord``, so a user who already voted on a question is skipped;
+  the voter locks keep any other batch or vote from recording a pair
+  between that lookup and the insert, so none is counted twice;
+* one ``bulk_create`` of the new ``VoteRecord`` rows;
+* one ``UPDATE ... CASE`` adding each choice's new votes;
+* one rescore per affected post (``blog.verification.apply_votes``),
+  however many of its votes were in the batch.
+
+With ``POLL_VOTE_BATCH_SECONDS`` set, the vote view hands votes to a
+per-process ``VoteQueue`` that flushes them through ``ingest_votes`` when
+the oldest is that many seconds old or POLL_VOTE_BATCH_MAX are waiting.
+Results lag by at most the interval, and votes still queued when a
+process is killed are lost.
+"""
+from collections import Counter, defaultdict
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+
+from backend.buffers import WriteBehindBuffer, delta_case
+from blog import verification
+from .models import Choice, VoteRecord
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ingest_votes(votes, batch_size=1000):
+    """
+    Record ``votes``, an iterable of ``(user_id, choice_id)`` pairs, and
+    return how many were counted. A ``user_id`` of None is an anonymous
+    vote, which is counted without a ``VoteRecord``. Votes for unknown
+    choices or users, and repeat votes by a user on a question they
+    already voted on, are dropped.
+    """
+    votes = list(votes)
+    choices = {
+        pk: (question_id, impact, question_type, post_id)
+        for pk, question_id, impact, question_type, post_id in Choice.objects.filter(
+            pk__in={choice_id for _, choice_id in votes}
+            ).values_list(
+                'pk', 'question_id', 'verification_impact',
+                'question__question_type', 'question__post_id',
+                )
+    }
+
+    with transaction.atomic():
+        # Held until commit: a user's votes are recorded by one batch or
+        # vote at a time (see polls/views.py ``vote``). A fixed order keeps
+        # concurrent batches from deadlocking.
+        users = set(
+            get_user_model().objects.select_for_update().filter(
+                pk__in={user_id for user_id, _ in votes if user_id is not None}
+                ).order_by('pk').values_list('pk', flat=True)
+        )
+
+        counted = []
+        records = {}
+        for user_id, choice_id in votes:
+            if choice_id not in choices or (user_id is not None and user_id not in users):
+                continue
+            if user_id is None:
+                counted.append(choice_id)
+                continue
+            # The first vote in the batch wins, as it would one at a time
+            records.setdefault(
+                (user_id, choices[choice_id][0]),
+                VoteRecord(
+                    user_id=user_id, question_id=choices[choice_id][0], choice_id=choice_id
+                    ),
+                )
+
+        taken = set()
+        for keys in _chunks(list(records), batch_size):
+            taken.update(VoteRecord.objects.filter(reduce(or_, [
+                Q(user_id=user_id, question_id=question_id)
+                for user_id, question_id in keys
+            ])).values_list('user_id', 'question_id'))
+        new = [record for key, record in records.items() if key not in taken]
+        if new:
+            VoteRecord.objects.bulk_create(new, batch_size=batch_size)
+            counted += [record.choice_id for record in new]
+
+        deltas = Counter(counted)
+        if deltas:
+            Choice.objects.filter(pk__in=deltas).update(
+                votes=F('votes') + delta_case(deltas)
+                )
+
+        per_post = defaultdict(Counter)
+        for choice_id, count in deltas.items():
+            _, impact, question_type, post_id = choices[choice_id]
+            if question_type == 'verification' and post_id:
+                per_post[post_id][impact] += count
+        # A fixed order keeps concurrent batches from deadlocking on posts
+        for post_id in sorted(per_post, key=str):
+            verification.apply_votes(
+                post_id,
+                positive=per_post[post_id]['positive'],
+                negative=per_post[post_id]['negative'],
+                )
+    return len(counted)
+
+
+class VoteQueue(WriteBehindBuffer):
+    """
+    Per-process queue of votes, written together by ``ingest_votes`` when
+    the oldest is POLL_VOTE_BATCH_SECONDS old or POLL_VOTE_BATCH_MAX are
+    waiting, whichever comes first, and when the process exits.
+    """
+    seconds_setting = 'POLL_VOTE_BATCH_SECONDS'
+    size_setting = 'POLL_VOTE_BATCH_MAX'
+    description = 'queued votes'
+
+    def empty(self):
+        return []
+
+    def merge(self, pending, user_id, choice_id):
+        pending.append((user_id, choice_id))
+
+    def write(self, pending):
+        return ingest_votes(pending)
+
+
+vote_queue = VoteQueue()
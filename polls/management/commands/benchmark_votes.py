@@ -0,0 +1,112 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post
+from polls import views
+from polls.ingest import ingest_votes
+from polls.models import Choice, Question
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure verification votes/sec recorded one request at a time by '
+        'the vote view and in batches by polls.ingest.ingest_votes. '
+        'Synthetic users, posts and polls are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=2000,
+                            help='Votes per mode, one per synthetic user')
+        parser.add_argument('--posts', type=int, default=10,
+                            help='Posts the votes are spread over')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Votes per ingest_votes call')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f"{options['votes']} votes over {options['posts']} posts, "
+            f"batches of {options['batch_size']}"
+        ))
+        self.stdout.write(f"{'mode':<10}{'votes/s':>10}{'counts ok':>11}")
+        for mode in ('per-vote', 'batched'):
+            result = self.measure(mode, options)
+            self.stdout.write(
+                f"{mode:<10}{result['rate']:>10.0f}"
+                f"{'yes' if result['counts_ok'] else 'NO':>11}"
+            )
+
+    def setup(self, mode, options):
+        prefix = f'votebench_{mode}'
+        author = User.objects.create(username=f'{prefix}_author')
+        users = User.objects.bulk_create([
+            User(username=f'{prefix}_{i}') for i in range(options['votes'])
+        ])
+        choices = []
+        for i in range(options['posts']):
+            post = Post.objects.create(
+                title=f'Vote benchmark {mode} {i}',
+                author=author,
+                content='Synthetic benchmark post',
+                status='published',
+            )
+            question = Question.objects.create(
+                question_text='Is this post accurate?',
+                pub_date=timezone.now(),
+                question_type='verification',
+                post=post,
+            )
+            choices += Choice.objects.bulk_create([
+                Choice(question=question, choice_text='Yes',
+                       verification_impact='positive'),
+                Choice(question=question, choice_text='No',
+                       verification_impact='negative'),
+            ])
+        rng = random.Random(0)
+        votes = [(user, rng.choice(choices)) for user in users]
+        return prefix, votes
+
+    def measure(self, mode, options):
+        prefix, votes = self.setup(mode, options)
+        start = time.perf_counter()
+        if mode == 'per-vote':
+            factory = RequestFactory()
+            with override_settings(POLL_VOTE_BATCH_SECONDS=0):
+                for user, choice in votes:
+                    request = factory.post(
+                        reverse('polls:vote', args=(choice.question_id,)),
+                        {'choice': choice.pk},
+                    )
+                    request.user = user
+                    views.vote(request, choice.question_id)
+        else:
+            pairs = [(user.pk, choice.pk) for user, choice in votes]
+            for i in range(0, len(pairs), options['batch_size']):
+                ingest_votes(pairs[i:i + options['batch_size']])
+        elapsed = time.perf_counter() - start
+
+        expected = {}
+        for _, choice in votes:
+            expected[choice.pk] = expected.get(choice.pk, 0) + 1
+        stored = dict(
+            Choice.objects.filter(pk__in=expected).values_list('pk', 'votes')
+        )
+        posts = Post.objects.filter(author__username=f'{prefix}_author')
+        tallied = sum(
+            positive + negative for positive, negative in posts.values_list(
+                'verification_positive', 'verification_negative'
+            )
+        )
+
+        posts.delete()
+        User.objects.filter(username__startswith=f'{prefix}_').delete()
+        return {
+            'rate': len(votes) / elapsed,
+            'counts_ok': stored == expected and tallied == len(votes),
+        }
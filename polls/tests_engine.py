@@ -0,0 +1,107 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from blog import verification
+from blog.models import Post
+from .models import Question, Choice, VoteRecord
+
+
+class VerificationEngineTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            title='Claim',
+            content='Test content',
+            author=self.author,
+            status='published'
+        )
+        self.question = Question.objects.create(
+            question_text='Is this post accurate?',
+            pub_date=timezone.now(),
+            question_type='verification',
+            post=self.post
+        )
+        self.yes = Choice.objects.create(
+            question=self.question, choice_text='Yes', verification_impact='positive'
+            )
+        self.no = Choice.objects.create(
+            question=self.question, choice_text='No', verification_impact='negative'
+            )
+
+    def vote(self, choice, voter=None):
+        client = Client()
+        if voter is None:
+            voter = User.objects.create_user(
+                username=f'voter{User.objects.count()}', password='password1'
+                )
+        client.login(username=voter.username, password='password1')
+        return client.post(
+            reverse('polls:vote', args=(self.question.id,)), {'choice': choice.id}
+            )
+
+    def stored(self):
+        return Post.objects.values_list(
+            'verification_positive', 'verification_negative',
+            'verification_score', 'verification_status'
+            ).get(pk=self.post.pk)
+
+    def test_votes_apply_as_deltas(self):
+        for _ in range(3):
+            self.vote(self.yes)
+        self.assertEqual(self.stored(), (3, 0, 1.0, 'verified'))
+
+        self.vote(self.no)
+        positive, negative, score, status = self.stored()
+        self.assertEqual((positive, negative), (3, 1))
+        self.assertAlmostEqual(score, 3.1 / 4.2)
+        self.assertEqual(status, 'warning')
+
+    def test_sql_score_matches_python_rule(self):
+        for positive, negative in ((7, 3), (1, 9), (9, 1), (4, 0)):
+            Post.objects.filter(pk=self.post.pk).update(
+                verification_positive=positive - 1,
+                verification_negative=negative,
+                )
+            verification.apply_vote(self.post.pk, 'positive')
+            post = Post.objects.get(pk=self.post.pk)
+            expected = 1.0 if not negative else (positive + 0.1) / (positive + negative + 0.2)
+            self.assertAlmostEqual(post.verification_score, expected)
+            Post.calculate_verification_score(post, {'positive': positive, 'negative': negative})
+            self.assertEqual(
+                Post.objects.get(pk=self.post.pk).verification_status,
+                post.verification_status
+                )
+
+    def test_vote_query_count_is_constant(self):
+        self.vote(self.yes)
+        voter = User.objects.create_user(username='late', password='password1')
+        client = Client()
+        client.login(username='late', password='password1')
+        url = reverse('polls:vote', args=(self.question.id,))
+        with self.assertNumQueries(21):
+            client.post(url, {'choice': self.yes.id})
+        VoteRecord.objects.filter(user=voter).delete()
+        for _ in range(5):
+            self.vote(self.no)
+        with self.assertNumQueries(21):
+            client.post(url, {'choice': self.yes.id})
+
+    def test_second_vote_is_not_counted(self):
+        voter = User.objects.create_user(username='twice', password='password1')
+        self.vote(self.yes, voter)
+        self.vote(self.no, voter)
+        self.assertEqual(self.stored()[:2], (1, 0))
+        self.assertEqual(Choice.objects.get(pk=self.no.pk).votes, 0)
+
+    def test_results_page_is_read_only(self):
+        self.vote(self.yes)
+        Post.objects.filter(pk=self.post.pk).update(verification_score=0.42)
+        response = self.client.get(reverse('polls:results', args=(self.question.id,)))
+        self.assertEqual(response.context['verification_score'], 0.42)
+        self.assertEqual(
+            response.context['poll_results'],
+            {'verification': {'positive': 1, 'negative': 0}}
+            )
+        self.assertEqual(self.stored()[2], 0.42)
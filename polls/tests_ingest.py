@@ -0,0 +1,140 @@
+import json
+
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Post
+from .ingest import ingest_votes, vote_queue
+from .models import Question, Choice, VoteRecord
+
+
+class VoteIngestionTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            title='Claim',
+            content='Test content',
+            author=self.author,
+            status='published'
+        )
+        self.question = Question.objects.create(
+            question_text='Is this post accurate?',
+            pub_date=timezone.now(),
+            question_type='verification',
+            post=self.post
+        )
+        self.yes = Choice.objects.create(
+            question=self.question, choice_text='Yes', verification_impact='positive'
+            )
+        self.no = Choice.objects.create(
+            question=self.question, choice_text='No', verification_impact='negative'
+            )
+        self.voters = User.objects.bulk_create([
+            User(username=f'voter{i}') for i in range(40)
+        ])
+
+    def tallies(self):
+        return Post.objects.values_list(
+            'verification_positive', 'verification_negative'
+            ).get(pk=self.post.pk)
+
+    def test_batch_counts_each_user_once(self):
+        first, second, third = self.voters[:3]
+        VoteRecord.objects.create(user=third, question=self.question, choice=self.no)
+
+        counted = ingest_votes([
+            (first.pk, self.yes.pk),
+            (second.pk, self.no.pk),
+            (first.pk, self.no.pk),   # repeat within the batch
+            (third.pk, self.yes.pk),  # already voted
+            (None, self.yes.pk),      # anonymous
+            (first.pk, 999999),       # unknown choice
+        ])
+
+        self.assertEqual(counted, 3)
+        self.assertEqual(VoteRecord.objects.count(), 3)
+        self.assertEqual(VoteRecord.objects.get(user=first).choice, self.yes)
+        self.assertEqual(Choice.objects.get(pk=self.yes.pk).votes, 2)
+        self.assertEqual(Choice.objects.get(pk=self.no.pk).votes, 1)
+        self.assertEqual(self.tallies(), (2, 1))
+        self.assertAlmostEqual(
+            Post.objects.get(pk=self.post.pk).verification_score, 2.1 / 3.2
+            )
+
+    def test_votes_recorded_meanwhile_are_not_counted_again(self):
+        # Stamped after the batch starts, as by a concurrent batch
+        VoteRecord.objects.create(user=self.voters[0], question=self.question, choice=self.no)
+        VoteRecord.objects.update(voted_at=timezone.now() + timezone.timedelta(minutes=1))
+        other = Question.objects.create(question_text='Other?', pub_date=timezone.now())
+        maybe = Choice.objects.create(question=other, choice_text='Maybe')
+
+        counted = ingest_votes([
+            (self.voters[0].pk, self.no.pk),
+            (self.voters[1].pk, maybe.pk),
+        ])
+        self.assertEqual(counted, 1)
+        self.assertEqual(Choice.objects.get(pk=self.no.pk).votes, 0)
+        self.assertEqual(Choice.objects.get(pk=maybe.pk).votes, 1)
+
+    def test_batch_cost_does_not_grow_with_votes(self):
+        def queries_for(voters):
+            with CaptureQueriesContext(connection) as ctx:
+                ingest_votes([
+                    (voter.pk, (self.yes if i % 3 else self.no).pk)
+                    for i, voter in enumerate(voters)
+                ])
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries_for(self.voters[:5]), queries_for(self.voters[5:]))
+        self.assertEqual(sum(self.tallies()), 40)
+
+    @override_settings(POLL_VOTE_BATCH_SECONDS=60)
+    def test_vote_view_queues_votes(self):
+        client = Client()
+        for i in range(3):
+            User.objects.create_user(username=f'reader{i}', password='password1')
+            client.login(username=f'reader{i}', password='password1')
+            response = client.post(
+                reverse('polls:vote', args=(self.question.id,)), {'choice': self.yes.id}
+                )
+            self.assertRedirects(
+                response, reverse('polls:results', args=(self.question.id,))
+                )
+        self.assertFalse(VoteRecord.objects.exists())
+
+        self.assertEqual(vote_queue.flush(), 3)
+        self.assertEqual(self.tallies(), (3, 0))
+
+    def test_batch_endpoint_is_staff_only(self):
+        url = reverse('polls:vote_batch')
+        payload = json.dumps({'votes': [
+            {'user': voter.pk, 'choice': self.no.pk} for voter in self.voters[:4]
+        ] + [{'user': None, 'choice': self.yes.pk}]})
+        client = Client(enforce_csrf_checks=True)
+        token = 'a' * 32
+        client.cookies['csrftoken'] = token
+
+        response = client.post(
+            url, payload, content_type='application/json', HTTP_X_CSRFTOKEN=token
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(VoteRecord.objects.exists())
+
+        User.objects.create_user(username='relay', password='password1', is_staff=True)
+        client.login(username='relay', password='password1')
+        # A page the staff member visits can't post votes on their behalf
+        response = client.post(url, payload, content_type='text/plain')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(VoteRecord.objects.exists())
+
+        client.defaults['HTTP_X_CSRFTOKEN'] = token
+        response = client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.json(), {'received': 5, 'counted': 5})
+        self.assertEqual(self.tallies(), (1, 4))
+
+        response = client.post(url, '{"votes": [1]}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
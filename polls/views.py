@@ -1,10 +1,19 @@
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.db.models import F
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 from django.views import generic
 from django.utils import timezone
+from django.views.decorators.http import require_POST
 
+from blog import verification
+from .ingest import ingest_votes, vote_queue
 from .models import Question, Choice, VoteRecord
 
 # Create your views here.
@@ -36,37 +45,23 @@ class ResultsView(generic.DetailView):
         return Question.objects.filter(pub_date__lte=timezone.now())
 
     def get_context_data(self, **kwargs):
+        """
+        Read-only: shows the stored score and tallies, which each vote
+        keeps current, without recalculating anything.
+        """
         context = super().get_context_data(**kwargs)
         question = context['question']
         
         if question.question_type == 'verification' and question.post:
-            # Calculate verification metrics
-            choices = question.choice_set.all()
-            poll_results = {
-                question.question_type: {
-                    'positive': sum(
-                        c.votes for c in choices 
-                        if c.verification_impact == 'positive'
-                    ),
-                    'negative': sum(
-                        c.votes for c in choices 
-                        if c.verification_impact == 'negative'
-                    )
-                }
-            }
-            
-            # Update post verification score
             post = question.post
-            # Extract the inner results dictionary before passing
-            verification_results = poll_results[question.question_type]
-            post.calculate_verification_score(verification_results)
-            post.update_author_credibility()
-            post.add_verification_history(verification_results)
-            
-            # Add to context
             context['verification_score'] = post.verification_score
             context['author_credibility'] = post.author.profile.credibility_score
-            context['poll_results'] = poll_results
+            context['poll_results'] = {
+                question.question_type: {
+                    'positive': post.verification_positive,
+                    'negative': post.verification_negative,
+                }
+            }
             
         return context
 
@@ -86,42 +81,66 @@ def vote(request, question_id):
             },
         )
     else:
-        if request.user.is_authenticated:
-            # Create vote record
-            VoteRecord.objects.create(
-                user=request.user,
-                question=question,
-                choice=selected_choice
-            )
-        selected_choice.votes = F("votes") + 1
-        selected_choice.save()
-        
-        # If this is a verification poll, update verification metrics
-        if question.question_type == 'verification' and question.post:
-            question.refresh_from_db()  # Ensure we have latest vote counts
-            choices = question.choice_set.all()
-            poll_results = {
-                question.question_type: {
-                    'positive': sum(
-                        c.votes for c in choices 
-                        if c.verification_impact == 'positive'
-                    ),
-                    'negative': sum(
-                        c.votes for c in choices 
-                        if c.verification_impact == 'negative'
+        if settings.POLL_VOTE_BATCH_SECONDS:
+            # Recorded with the next batch; a repeat vote is dropped there
+            vote_queue.add(
+                request.user.pk if request.user.is_authenticated else None,
+                selected_choice.pk
+                )
+            return HttpResponseRedirect(reverse("polls:results", args=(question.id,)))
+        with transaction.atomic():
+            if request.user.is_authenticated:
+                # Waits for any batch recording this user's votes (see
+                # polls/ingest.py)
+                get_user_model().objects.select_for_update().filter(
+                    pk=request.user.pk
+                    ).values_list('pk').first()
+                # Create vote record; a second vote on the same question
+                # is not counted
+                try:
+                    with transaction.atomic():
+                        VoteRecord.objects.create(
+                            user=request.user,
+                            question=question,
+                            choice=selected_choice
+                        )
+                except IntegrityError:
+                    return HttpResponseRedirect(
+                        reverse("polls:results", args=(question.id,))
+                        )
+            Choice.objects.filter(pk=selected_choice.pk).update(votes=F("votes") + 1)
+
+            # If this is a verification poll, apply the vote to the post's
+            # tallies and score
+            if question.question_type == 'verification' and question.post_id:
+                verification.apply_vote(
+                    question.post_id, selected_choice.verification_impact
                     )
-                }
-            }
-            
-            # Update post verification score
-            post = question.post
-            # Extract the inner results dictionary before passing
-            verification_results = poll_results[question.question_type]
-            post.calculate_verification_score(verification_results)
-            post.update_author_credibility()
-            post.add_verification_history(verification_results)
         
         # Always return an HttpResponseRedirect after successfully dealing
         # with POST data. This prevents data from being posted twice if a
         # user hits the Back button.
         return HttpResponseRedirect(reverse("polls:results", args=(question.id,)))
+
+
+@staff_member_required
+@require_POST
+def vote_batch(request):
+    """
+    Record many votes in one request, for importers and bots relaying
+    votes from elsewhere. Expects ``{"votes": [{"user": id, "choice": id},
+    ...]}``; ``user`` may be null for an anonymous vote. Returns how many
+    votes were received and how many were counted. Callers authenticate
+    with a staff session, so they must send its CSRF token
+    (``X-CSRFToken``) too.
+    """
+    try:
+        votes = [
+            (vote.get("user"), int(vote["choice"]))
+            for vote in json.loads(request.body)["votes"]
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return HttpResponseBadRequest("Expected {\"votes\": [{\"user\": id, \"choice\": id}]}")
+    if any(user is not None and not isinstance(user, int) for user, _ in votes):
+        return HttpResponseBadRequest("Vote users must be ids or null")
+    return JsonResponse({"received": len(votes), "counted": ingest_votes(votes)})
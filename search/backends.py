@@ -0,0 +1,246 @@
+"""
+Search backends behind ``SearchService``.
+
+SEARCH_BACKEND names the backend class. Each backend is told when a
+SearchIndex row is written (``update``, or ``update_many`` for a batch)
+or deleted (``remove``) and narrows a SearchIndex queryset to the rows
+matching a term (``match``), annotating them with ``rank``. Everything
+else about a search (tags, categories, price ranges, pagination) stays in
+the database.
+
+* ``DatabaseBackend`` matches terms in the database: PostgreSQL
+  full-text search where available, ``icontains`` scans elsewhere.
+* ``InvertedIndexBackend`` keeps a BM25 inverted index in process (see
+  search/inverted.py), persisted to SEARCH_INDEX_PATH. It is meant for
+  single-process deployments on databases without full-text search,
+  such as development on SQLite: each process holds its own copy, and
+  only picks up other processes' writes when it next loads the file.
+"""
+import atexit
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+)
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, TextField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .inverted import InvertedIndex
+
+
+def full_text_enabled():
+    """
+    Whether terms are matched with PostgreSQL full-text search. Other
+    databases fall back to ``icontains`` scans.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    """
+    The weighted document stored in ``SearchIndex.search_vector``: title
+    (A), tags (B), then the body text (C).
+    """
+    config = settings.SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector(Cast('tags', TextField()), weight='B', config=config)
+        + SearchVector('text_content', weight='C', config=config)
+    )
+
+
+class DatabaseBackend:
+    # State lives in the database, so any process may write it
+    in_process = False
+
+    def update(self, search_index):
+        """Recompute the full-text vector of a saved index row."""
+        self.update_many([search_index])
+
+    def update_many(self, rows):
+        if full_text_enabled() and rows:
+            type(rows[0]).objects.filter(pk__in=[row.pk for row in rows]).update(
+                search_vector=search_vector()
+            )
+
+    def remove(self, pks):
+        pass
+
+    def clear(self):
+        pass
+
+    def match(self, queryset, term):
+        """
+        On PostgreSQL the term is parsed as a websearch query (quoted
+        phrases, ``or``, ``-excluded``) against the GIN-indexed
+        ``search_vector``, and titles within trigram distance of it match
+        too, so typos still find things. ``rank`` is the ``SearchRank``
+        plus the title's trigram similarity.
+        """
+        if not full_text_enabled():
+            return queryset.filter(
+                Q(title__icontains=term) |
+                Q(text_content__icontains=term)
+            )
+        query = SearchQuery(term, search_type='websearch', config=settings.SEARCH_CONFIG)
+        return queryset.filter(
+            Q(search_vector=query) | Q(title__trigram_similar=term)
+        ).annotate(
+            rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('title', term)
+        )
+
+
+# Keys per ``pk__in`` query, well under SQLite's bound-variable limit
+PK_CHUNK_SIZE = 500
+
+
+class InvertedIndexBackend:
+    in_process = True
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.index = None
+
+    def _loaded(self):
+        from .models import SearchIndex
+
+        with self.lock:
+            if self.index is None:
+                self.index = InvertedIndex.open(settings.SEARCH_INDEX_PATH)
+                # Catch up on rows other processes wrote or deleted since
+                # the file was saved
+                saved_at = parse_datetime(self.index.meta.get('saved_at', ''))
+                rows = SearchIndex.objects.all()
+                if saved_at:
+                    rows = rows.filter(date_modified__gte=saved_at)
+                for row in rows.iterator():
+                    self._add(row)
+                doc_ids = list(self.index.doc_lengths)
+                for start in range(0, len(doc_ids), PK_CHUNK_SIZE):
+                    chunk = doc_ids[start:start + PK_CHUNK_SIZE]
+                    live = set(SearchIndex.objects.filter(
+                        pk__in=chunk
+                    ).values_list('pk', flat=True))
+                    for doc_id in chunk:
+                        if doc_id not in live:
+                            self.index.remove(doc_id)
+            return self.index
+
+    def _add(self, search_index):
+        self.index.add(
+            search_index.pk,
+            title=search_index.title,
+            tags=search_index.tags or (),
+            text=search_index.text_content,
+        )
+
+    def _changed(self):
+        if self.index.pending_count >= settings.SEARCH_INDEX_SAVE_EVERY:
+            self.save()
+
+    def update(self, search_index):
+        with self.lock:
+            self._loaded()
+            self._add(search_index)
+            self._changed()
+
+    def update_many(self, rows):
+        with self.lock:
+            self._loaded()
+            for row in rows:
+                self._add(row)
+            self._changed()
+
+    def remove(self, pks):
+        with self.lock:
+            index = self._loaded()
+            for pk in pks:
+                index.remove(pk)
+            self._changed()
+
+    def clear(self):
+        with self.lock:
+            if self.index is not None:
+                self.index.close()
+            self.index = InvertedIndex(settings.SEARCH_INDEX_PATH)
+            self.save()
+
+    def rebuild(self):
+        """Index every SearchIndex row afresh and save; return the count."""
+        from .models import SearchIndex
+
+        with self.lock:
+            self.clear()
+            for row in SearchIndex.objects.iterator(chunk_size=2000):
+                self._add(row)
+            self.save()
+            return len(self.index)
+
+    def save(self):
+        with self.lock:
+            if self.index is not None:
+                # Rows written while saving are picked up again on load
+                self.index.save(saved_at=timezone.now().isoformat())
+
+    def save_pending(self):
+        with self.lock:
+            if self.index is not None and self.index.pending_count:
+                self.save()
+
+    def match(self, queryset, term):
+        """
+        ``rank`` is the row's BM25 score; only the best
+        SEARCH_INDEX_MAX_RESULTS of the rows in ``queryset`` are returned,
+        so narrow it before matching.
+        """
+        with self.lock:
+            hits = self._loaded().search(term)
+        # Keep the best hits the queryset's own filters let through, a
+        # chunk at a time, until there are enough
+        results = []
+        for start in range(0, len(hits), PK_CHUNK_SIZE):
+            chunk = hits[start:start + PK_CHUNK_SIZE]
+            kept = set(queryset.filter(
+                pk__in=[pk for pk, _ in chunk]
+            ).values_list('pk', flat=True))
+            results += [(pk, score) for pk, score in chunk if pk in kept]
+            if len(results) >= settings.SEARCH_INDEX_MAX_RESULTS:
+                break
+        results = results[:settings.SEARCH_INDEX_MAX_RESULTS]
+        if not results:
+            return queryset.none()
+        return queryset.filter(pk__in=[pk for pk, _ in results]).annotate(
+            rank=Case(
+                *[When(pk=pk, then=Value(score)) for pk, score in results],
+                output_field=FloatField(),
+            )
+        )
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """The SEARCH_BACKEND instance of this process."""
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def _reset_backend(*, setting, **kwargs):
+    if setting in ('SEARCH_BACKEND', 'SEARCH_INDEX_PATH'):
+        get_backend.cache_clear()
+
+
+def _save_on_exit():
+    if get_backend.cache_info().currsize:
+        backend = get_backend()
+        if isinstance(backend, InvertedIndexBackend):
+            backend.save_pending()
+
+
+setting_changed.connect(_reset_backend)
+atexit.register(_save_on_exit)
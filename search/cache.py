@@ -0,0 +1,113 @@
+"""
+Cached search results.
+
+A results page costs a term match, a page query, a grouped count and a
+facet query, and popular searches ask for the same page over and over.
+``cached_search`` keeps what a page needs to be shown again: the ids of
+its SearchIndex rows, its cursors, the result counts and the tag facets.
+A hit costs one query, loading the page's rows by id.
+
+Keys are made of the normalized search parameters and the index
+generation, a counter bumped whenever an index row is written or deleted
+(see ``bump_generation``). A bump makes every cached result unreachable at
+once; the abandoned entries are culled by the ``search`` cache, least
+recently used first for the local-memory backend, or expire after
+SEARCH_CACHE_SECONDS. The counter lives in the ``search`` cache next to
+the pages, so with several workers that cache must be shared
+(CACHE_REDIS_URL): otherwise a write only invalidates the pages of the
+worker that made it. Hits and misses are counted per process
+(``cache_stats``).
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import SearchIndex
+
+GENERATION_KEY = 'search:generation'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def search_cache():
+    return caches['search']
+
+
+def generation():
+    """The current index generation."""
+    cache = search_cache()
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # Start beyond anything a culled counter could have reached, so
+        # entries cached under it can't come back
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def _bump():
+    try:
+        search_cache().incr(GENERATION_KEY)
+    except ValueError:
+        # Culled; generation() starts a fresh one
+        pass
+
+
+def bump_generation():
+    """
+    Invalidate every cached result. Bumped now and again once the
+    transaction commits, so a concurrent search can't cache the
+    pre-commit results under the new generation.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def cache_key(params):
+    digest = hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return f'search:results:{generation()}:{digest}'
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    """``{'hits': n, 'misses': n}`` of this process since it started."""
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def cached_search(params, search):
+    """
+    Return ``(entry, rows)`` for the search described by ``params``.
+    ``search()`` runs it on a miss and returns the same pair, where
+    ``entry`` holds the page's row ``ids`` and anything else about it
+    that's worth keeping.
+    """
+    if not settings.SEARCH_CACHE_SECONDS:
+        return search()
+    cache = search_cache()
+    key = cache_key(params)
+    entry = cache.get(key)
+    if entry is not None:
+        found = SearchIndex.objects.select_related('author').in_bulk(entry['ids'])
+        # Rows can only be missing if a write's transaction was rolled
+        # back after the bump; search again rather than show a short page
+        if len(found) == len(entry['ids']):
+            _count('hits')
+            return entry, [found[pk] for pk in entry['ids']]
+    _count('misses')
+    entry, rows = search()
+    cache.set(key, entry, settings.SEARCH_CACHE_SECONDS)
+    return entry, rows
@@ -0,0 +1,99 @@
+"""
+Keeping the search index in step with posts and items.
+
+The save and delete signals of ``Post`` and ``Item`` only record which
+object changed, as a ``(source, pk)`` key (sources as in
+search/reindex.py). ``index_objects`` later reads each key's object afresh
+and upserts its index row, or deletes the row if the object is gone or no
+longer published, so deletes and unpublishes leave the index too.
+
+Keys go to a per-process ``IndexQueue`` after commit, where repeated saves
+of one object collapse into one entry, so saves never pay for indexing.
+The queue is indexed in batches of SEARCH_INDEX_BATCH_SIZE off the request
+path when its oldest key is SEARCH_INDEX_DEBOUNCE_SECONDS old or a batch
+is waiting. Search lags by at most the interval; keys still queued when a
+process is killed are lost until the next ``reindex_search``. With
+``SEARCH_INDEX_SYNC`` set (tests, scripts), keys are indexed inside the
+saving transaction instead.
+
+Changes made with ``QuerySet.update()`` send no signal; their callers
+(e.g. ``blog.verification.apply_votes``) call ``mark_dirty`` themselves.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+
+from backend.buffers import WriteBehindBuffer
+from .models import SearchIndex
+from .reindex import chunked, current_generation, sources, write_documents
+
+# Fields the index rows are built from; saves limited to other fields
+# (counters, renditions) leave the index alone
+INDEXED_FIELDS = {
+    'posts': {
+        'title', 'subtitle', 'caption', 'content', 'author', 'tags',
+        'picture', 'verification_score', 'status',
+    },
+    'items': {'name', 'description', 'seller', 'category', 'image', 'price'},
+}
+
+
+def index_objects(keys):
+    """
+    Bring the index rows of ``keys``, ``(source, pk)`` pairs, up to date
+    with one upsert and one delete per source.
+    """
+    grouped = defaultdict(set)
+    for source, pk in keys:
+        grouped[source].add(pk)
+    generation = None
+    for source, pks in grouped.items():
+        queryset, build = sources()[source]
+        found = list(queryset.filter(pk__in=pks))
+        if found:
+            if generation is None:
+                generation = current_generation()
+            write_documents([build(obj) for obj in found], generation)
+        gone = {str(pk) for pk in pks} - {str(obj.pk) for obj in found}
+        if gone:
+            SearchIndex.objects.filter(
+                content_type=ContentType.objects.get_for_model(queryset.model),
+                object_id__in=gone,
+            ).delete()
+
+
+class IndexQueue(WriteBehindBuffer):
+    """
+    Per-process set of keys waiting to be indexed, flushed when the
+    oldest is SEARCH_INDEX_DEBOUNCE_SECONDS old or SEARCH_INDEX_BATCH_SIZE
+    are waiting, and when the process exits.
+    """
+    seconds_setting = 'SEARCH_INDEX_DEBOUNCE_SECONDS'
+    size_setting = 'SEARCH_INDEX_BATCH_SIZE'
+    description = 'queued search updates'
+
+    def merge(self, pending, key):
+        # A dict, so keys are indexed in the order they first changed
+        pending[key] = None
+
+    def write(self, pending):
+        for batch in chunked(pending, settings.SEARCH_INDEX_BATCH_SIZE):
+            index_objects(batch)
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.pending
+
+
+index_queue = IndexQueue()
+
+
+def mark_dirty(source, pk, update_fields=None):
+    """Record that the ``source`` object ``pk`` changed."""
+    if update_fields is not None and not INDEXED_FIELDS[source] & set(update_fields):
+        return
+    if settings.SEARCH_INDEX_SYNC:
+        index_objects([(source, pk)])
+    else:
+        index_queue.add_on_commit((source, pk))
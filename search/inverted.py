@@ -0,0 +1,276 @@
+"""
+A small in-process inverted index with BM25 ranking.
+
+It backs ``InvertedIndexBackend`` (see search/backends.py) on databases
+without full-text search. Documents are SearchIndex rows, keyed by their
+integer id.
+
+Text is lowercased, split on word characters, stripped of stop words and
+reduced with a light suffix-stripping stemmer. Title terms count three
+times and tags twice, so they weigh more in the BM25 score.
+
+The index has two parts:
+
+* a compacted base: for each term, its postings as ``(doc id, term
+  frequency)`` pairs sorted by id, doc ids delta-encoded and both numbers
+  written as varints into one byte array. On disk that array is
+  memory-mapped, so opening the index doesn't read the postings;
+* a small in-memory segment of documents added since the last
+  compaction, plus tombstones for base documents that were removed or
+  replaced.
+
+Searches read both. ``save`` merges them into a new file, written next to
+the old one and swapped in with ``os.replace``.
+"""
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from collections import Counter, defaultdict
+
+MAGIC = b'SIDX1'
+HEADER = struct.Struct('<5sQ')
+
+TOKEN_RE = re.compile(r'\w+')
+
+STOP_WORDS = frozenset(
+    'a an and are as at be but by for from has have if in into is it its '
+    'no not of on or such that the their then there these they this to '
+    'was were will with'.split()
+)
+
+# Tried in order; the first that fits is stripped
+SUFFIXES = (
+    ('ational', 'ate'), ('tional', 'tion'), ('ization', 'ize'),
+    ('fulness', 'ful'), ('iveness', 'ive'), ('ousness', 'ous'),
+    ('ments', ''), ('ment', ''), ('ness', ''), ('ingly', ''), ('edly', ''),
+    ('ing', ''), ('ies', 'y'), ('ied', 'y'), ('sses', 'ss'), ('ed', ''),
+    ('ly', ''), ('s', ''),
+)
+
+FIELD_WEIGHTS = (('title', 3), ('tags', 2), ('text', 1))
+
+K1 = 1.2
+B = 0.75
+
+
+def stem(word):
+    """Strip one common English suffix, keeping at least three letters."""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word[-2] in 'su':
+                # "glass", "status"
+                return word
+            word = word[:-len(suffix)] + replacement
+            if suffix in ('ing', 'ed') and word[-1] == word[-2] and word[-1] not in 'lsz':
+                # "hopping" -> "hop"
+                word = word[:-1]
+            return word
+    return word
+
+
+def tokenize(text):
+    return [
+        stem(token) for token in TOKEN_RE.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def encode_postings(postings):
+    """Varint-encode sorted ``(doc_id, tf)`` pairs, doc ids as deltas."""
+    out = bytearray()
+    previous = 0
+    for doc_id, tf in postings:
+        for number in (doc_id - previous, tf):
+            while number >= 0x80:
+                out.append((number & 0x7F) | 0x80)
+                number >>= 7
+            out.append(number)
+        previous = doc_id
+    return out
+
+
+def decode_postings(data):
+    """Yield the ``(doc_id, tf)`` pairs written by encode_postings."""
+    numbers = []
+    number = shift = 0
+    doc_id = 0
+    for byte in data:
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        numbers.append(number)
+        number = shift = 0
+        if len(numbers) == 2:
+            doc_id += numbers[0]
+            yield doc_id, numbers[1]
+            numbers.clear()
+
+
+class InvertedIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.meta = {}
+        # term -> (offset, length) into self.postings
+        self.terms = {}
+        self.postings = b''
+        self.doc_lengths = {}
+        self.total_length = 0
+        # Documents added since the last save: term -> {doc: tf}, and
+        # each pending document's terms so it can be taken out again
+        self.pending = defaultdict(dict)
+        self.pending_terms = {}
+        # Base documents removed or replaced since the last save
+        self.deleted = set()
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path):
+        """Open the index saved at ``path``, or an empty one if there is none."""
+        index = cls(path)
+        if os.path.exists(path):
+            index._map(path)
+        return index
+
+    def _map(self, path):
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a search index')
+        header = json.loads(self._mmap[HEADER.size:HEADER.size + header_length])
+        self.meta = header['meta']
+        self.terms = {term: tuple(span) for term, span in header['terms'].items()}
+        self.doc_lengths = {int(doc): length for doc, length in header['docs'].items()}
+        self.total_length = sum(self.doc_lengths.values())
+        self.postings = memoryview(self._mmap)[HEADER.size + header_length:]
+
+    def close(self):
+        if self._mmap is not None:
+            self.postings.release()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+        self.postings = b''
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    @property
+    def pending_count(self):
+        return len(self.pending_terms) + len(self.deleted)
+
+    def add(self, doc_id, title='', tags=(), text=''):
+        """Index a document, replacing any earlier version of it."""
+        self.remove(doc_id)
+        counts = Counter()
+        for field, weight in FIELD_WEIGHTS:
+            value = ' '.join(tags) if field == 'tags' else (title if field == 'title' else text)
+            for term in tokenize(value):
+                counts[term] += weight
+        for term, tf in counts.items():
+            self.pending[term][doc_id] = tf
+        self.pending_terms[doc_id] = list(counts)
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        terms = self.pending_terms.pop(doc_id, None)
+        if terms is None:
+            self.deleted.add(doc_id)
+            return
+        for term in terms:
+            del self.pending[term][doc_id]
+            if not self.pending[term]:
+                del self.pending[term]
+
+    def _postings(self, term):
+        """Live postings of ``term`` from the base and pending segments."""
+        postings = []
+        span = self.terms.get(term)
+        if span:
+            offset, length = span
+            postings = [
+                (doc_id, tf)
+                for doc_id, tf in decode_postings(self.postings[offset:offset + length])
+                if doc_id not in self.deleted
+            ]
+        postings.extend(self.pending.get(term, {}).items())
+        return postings
+
+    def search(self, query, limit=None):
+        """
+        Return ``(doc_id, score)`` for documents containing any term of
+        ``query``, best BM25 score first.
+        """
+        count = len(self.doc_lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = K1 * (1 - B + B * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit] if limit else ranked
+
+    def save(self, path=None, **meta):
+        """
+        Merge pending changes into a new compacted file at ``path`` (the
+        index's own path by default) and map it. ``meta`` is stored with it.
+        """
+        path = path or self.path
+        merged = defaultdict(list)
+        for term in self.terms:
+            merged[term] = self._postings(term)
+        for term, docs in self.pending.items():
+            if term not in self.terms:
+                merged[term] = list(docs.items())
+
+        terms = {}
+        body = bytearray()
+        for term, postings in merged.items():
+            if not postings:
+                continue
+            encoded = encode_postings(sorted(postings))
+            terms[term] = (len(body), len(encoded))
+            body += encoded
+        header = json.dumps({
+            'meta': meta,
+            'terms': terms,
+            'docs': self.doc_lengths,
+        }, separators=(',', ':')).encode()
+
+        tmp_path = f'{path}.tmp'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(body)
+        self.close()
+        os.replace(tmp_path, path)
+
+        self.path = path
+        self.pending.clear()
+        self.pending_terms.clear()
+        self.deleted.clear()
+        self._map(path)
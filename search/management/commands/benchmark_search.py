@@ -0,0 +1,102 @@
+import random
+import statistics
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+
+from search.models import SearchIndex
+from search.backends import full_text_enabled, search_vector
+from search.services import SearchService
+
+WORDS = (
+    'election budget climate vaccine housing transit energy court police '
+    'school hospital market inflation drought wildfire senate council '
+    'protest strike harvest startup bitcoin satellite museum festival '
+    'stadium tournament refinery pipeline factory research'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare term search over a synthetic SearchIndex using icontains '
+        'scans and PostgreSQL full-text search. Synthetic rows are deleted '
+        'afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000,
+                            help='Synthetic index rows')
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help='Rows per insert')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per query; the median is reported')
+
+    def handle(self, *args, **options):
+        if not full_text_enabled():
+            raise CommandError('Full-text search needs PostgreSQL.')
+        # Synthetic rows point at SearchIndex itself, so they can't be
+        # mistaken for real ones and are easy to remove
+        content_type = ContentType.objects.get_for_model(SearchIndex)
+        try:
+            self.populate(content_type, options)
+            self.stdout.write(
+                f"{'query':<20}{'icontains ms':>14}{'full-text ms':>14}"
+                f"{'matches':>10}{'fts matches':>13}"
+            )
+            # A word, two words, an exclusion and a typo
+            for term in ('climate', 'wildfire drought', 'court -police', 'climat'):
+                self.compare(content_type, term, options['repeat'])
+        finally:
+            SearchIndex.objects.filter(content_type=content_type).delete()
+
+    def populate(self, content_type, options):
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for offset in range(0, options['rows'], options['batch_size']):
+            SearchIndex.objects.bulk_create([
+                SearchIndex(
+                    content_type=content_type,
+                    object_id=str(i),
+                    title=' '.join(rng.choices(WORDS, k=5)).capitalize(),
+                    text_content=' '.join(rng.choices(WORDS, k=120)),
+                    tags=rng.sample(WORDS, 2),
+                )
+                for i in range(offset, min(offset + options['batch_size'], options['rows']))
+            ])
+        inserted = time.perf_counter()
+        SearchIndex.objects.filter(content_type=content_type).update(
+            search_vector=search_vector()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {SearchIndex._meta.db_table}')
+        self.stdout.write(self.style.SUCCESS(
+            f"Inserted {options['rows']} rows in {inserted - start:.1f}s, "
+            f"built vectors in {time.perf_counter() - inserted:.1f}s"
+        ))
+
+    def timed(self, queryset, repeat):
+        # What the search view does: the first page and the total
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset[:10])
+            count = queryset.count()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), count
+
+    def compare(self, content_type, term, repeat):
+        rows = SearchIndex.objects.filter(content_type=content_type)
+        scan_ms, scan_count = self.timed(
+            rows.filter(Q(title__icontains=term) | Q(text_content__icontains=term))
+            .order_by('-date_indexed', '-id'),
+            repeat,
+        )
+        fts_ms, fts_count = self.timed(
+            SearchService.match_term(rows, term).order_by('-rank', '-id'), repeat
+        )
+        self.stdout.write(
+            f"{term:<20}{scan_ms:>14.1f}{fts_ms:>14.1f}{scan_count:>10}{fts_count:>13}"
+        )
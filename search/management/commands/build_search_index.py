@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from search.backends import InvertedIndexBackend, get_backend
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the in-process inverted index (InvertedIndexBackend) from '
+        'the SearchIndex table and save it to SEARCH_INDEX_PATH.'
+    )
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        if not isinstance(backend, InvertedIndexBackend):
+            raise CommandError('SEARCH_BACKEND is not the inverted index backend.')
+        start = time.perf_counter()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} documents in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from search.services import SearchService
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the search index from posts, items and users. Search '
+        'stays live while it runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            help='Worker processes for large corpora '
+                                 '(default SEARCH_REINDEX_WORKERS)')
+        parser.add_argument('--chunk-size', type=int,
+                            help='Rows per upsert (default SEARCH_REINDEX_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = SearchService.reindex_all(
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            progress=self.progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} rows in {time.perf_counter() - start:.1f}s"
+        ))
+
+    def progress(self, label, done, total):
+        self.stdout.write(f"{label}: {done}/{total}")
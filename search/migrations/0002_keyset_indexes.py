@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 01:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('search', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='searchindex',
+            index=models.Index(fields=['date_indexed', 'id'], name='search_sear_date_in_ee6436_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchindex',
+            index=models.Index(fields=['date_modified', 'id'], name='search_sear_date_mo_cfb149_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchindex',
+            index=models.Index(fields=['title', 'id'], name='search_sear_title_91c9b5_idx'),
+        ),
+    ]
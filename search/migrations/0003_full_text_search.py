@@ -0,0 +1,53 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import TextField
+from django.db.models.functions import Cast
+
+INDEXES = [
+    GinIndex(fields=['search_vector'], name='search_vector_gin_idx'),
+    GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='search_title_trgm_idx'),
+]
+
+
+def add_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    SearchIndex = apps.get_model('search', 'SearchIndex')
+    for index in INDEXES:
+        schema_editor.add_index(SearchIndex, index)
+    # Fill in the vectors of rows indexed before they were maintained
+    SearchIndex.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector(Cast('tags', TextField()), weight='B', config='english')
+        + SearchVector('text_content', weight='C', config='english')
+    ))
+
+
+def remove_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    SearchIndex = apps.get_model('search', 'SearchIndex')
+    for index in INDEXES:
+        schema_editor.remove_index(SearchIndex, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        # The indexes are only created on PostgreSQL
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_indexes, remove_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name='searchindex', index=index)
+                for index in INDEXES
+            ],
+        ),
+    ]
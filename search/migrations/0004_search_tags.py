@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_tags(apps, schema_editor):
+    SearchIndex = apps.get_model('search', 'SearchIndex')
+    SearchTag = apps.get_model('search', 'SearchTag')
+    SearchIndexTag = apps.get_model('search', 'SearchIndexTag')
+    rows = list(SearchIndex.objects.values_list('pk', 'tags'))
+    names = {name for _, tags in rows for name in tags or ()}
+    SearchTag.objects.bulk_create(
+        [SearchTag(name=name) for name in names], ignore_conflicts=True
+    )
+    tag_ids = dict(SearchTag.objects.values_list('name', 'pk'))
+    SearchIndexTag.objects.bulk_create(
+        [
+            SearchIndexTag(search_index_id=pk, tag_id=tag_ids[name])
+            for pk, tags in rows for name in set(tags or ())
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchIndexTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('search_index', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='search.searchindex')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='index_links', to='search.searchtag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='searchindex',
+            name='search_tags',
+            field=models.ManyToManyField(blank=True, related_name='indexed', through='search.SearchIndexTag', to='search.searchtag'),
+        ),
+        migrations.AddConstraint(
+            model_name='searchindextag',
+            constraint=models.UniqueConstraint(fields=('tag', 'search_index'), name='unique_search_index_tag'),
+        ),
+        migrations.RunPython(link_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.1 on 2026-10-18 02:32
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def drop_duplicates(apps, schema_editor):
+    # Racing get_or_create calls could index an object twice; keep the
+    # newest row of each
+    SearchIndex = apps.get_model('search', 'SearchIndex')
+    duplicated = SearchIndex.objects.values('content_type', 'object_id').annotate(
+        rows=Count('id'), newest=Max('id')
+    ).filter(rows__gt=1)
+    for group in duplicated:
+        SearchIndex.objects.filter(
+            content_type=group['content_type'], object_id=group['object_id']
+        ).exclude(id=group['newest']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('search', '0004_search_tags'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='searchindex',
+            name='search_sear_content_97a989_idx',
+        ),
+        migrations.AddField(
+            model_name='searchindex',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(drop_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='searchindex',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='unique_search_index_object'),
+        ),
+    ]
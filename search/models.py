@@ -2,9 +2,23 @@ from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.utils.text import slugify
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.lookups import TrigramSimilar
 from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 
+class SearchTag(models.Model):
+    """
+    A tag or category name, shared by every index row carrying it, so tag
+    lookups and facet counts go through an index instead of the JSON
+    ``SearchIndex.tags`` of every row.
+    """
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
 class SearchIndex(models.Model):
     """
     A unified search index for all searchable content in the application.
@@ -22,6 +36,11 @@ class SearchIndex(models.Model):
     # Hash table compatible fields for exact matching
     author = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     tags = models.JSONField(default=list, help_text="List of tags for hash table lookup")
+    # The same tags, normalized for indexed lookups; kept in step with
+    # ``tags`` by SearchService
+    search_tags = models.ManyToManyField(
+        SearchTag, through='SearchIndexTag', related_name='indexed', blank=True
+    )
     category = models.CharField(max_length=100, null=True, blank=True)
     
     # Binary search friendly fields
@@ -29,20 +48,41 @@ class SearchIndex(models.Model):
     date_modified = models.DateTimeField(auto_now=True)
     numeric_field = models.FloatField(null=True, blank=True, help_text="For binary search on numeric values")
     
-    # For full-text search optimization
+    # Weighted title/tags/body document for full-text search, kept up to
+    # date by SearchService on PostgreSQL (see search.services.search_vector)
     search_vector = SearchVectorField(null=True, blank=True)
     
+    # Bumped on every row written by a full reindex, so rows the reindex
+    # didn't reach can be told apart and removed (see search/reindex.py)
+    generation = models.PositiveIntegerField(default=0)
+    
     # Additional metadata
     url = models.CharField(max_length=500, blank=True, null=True)
     image_url = models.CharField(max_length=500, blank=True, null=True)
     
     class Meta:
+        constraints = [
+            # One row per object; also the conflict target of the bulk
+            # upserts in search/reindex.py
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'], name='unique_search_index_object'
+            ),
+        ]
         indexes = [
-            models.Index(fields=['content_type', 'object_id']),
             models.Index(fields=['title']),
             models.Index(fields=['author']),
             models.Index(fields=['date_indexed']),
+            models.Index(fields=['date_indexed', 'id']),
+            models.Index(fields=['date_modified', 'id']),
+            models.Index(fields=['title', 'id']),
             models.Index(fields=['category']),
+            # PostgreSQL only; created by migration 0003 there and
+            # skipped elsewhere
+            GinIndex(fields=['search_vector'], name='search_vector_gin_idx'),
+            GinIndex(
+                fields=['title'], opclasses=['gin_trgm_ops'],
+                name='search_title_trgm_idx',
+            ),
         ]
     
     def __str__(self):
@@ -73,3 +113,23 @@ class SearchIndex(models.Model):
                 right = mid - 1
                 
         return queryset.none()  # Return empty if not found
+
+
+class SearchIndexTag(models.Model):
+    tag = models.ForeignKey(SearchTag, on_delete=models.CASCADE, related_name='index_links')
+    search_index = models.ForeignKey(
+        SearchIndex, on_delete=models.CASCADE, related_name='tag_links'
+    )
+
+    class Meta:
+        constraints = [
+            # Also the index for "rows with tag X" lookups
+            models.UniqueConstraint(
+                fields=['tag', 'search_index'], name='unique_search_index_tag'
+            ),
+        ]
+
+
+# title__trigram_similar (pg_trgm's %), without requiring
+# django.contrib.postgres in INSTALLED_APPS
+SearchIndex._meta.get_field('title').register_lookup(TrigramSimilar)
@@ -0,0 +1,174 @@
+"""
+Full reindex of SearchIndex from the indexed models, without emptying it.
+
+Source rows are streamed in chunks of SEARCH_REINDEX_CHUNK_SIZE, built into
+index rows in memory and written with one upsert per chunk on the unique
+``(content_type, object_id)``, together with their tag links and the
+backend's view of them. Every row written carries the reindex's new
+``generation``; once all sources are done, rows of older generations
+(objects deleted or unpublished since) are removed in one transaction.
+Searches running meanwhile see each row either as it was or as it is now,
+never an empty index.
+
+Corpora of more than SEARCH_REINDEX_PARALLEL_THRESHOLD rows are split into
+chunks of primary keys and indexed by SEARCH_REINDEX_WORKERS processes,
+unless the backend keeps its state in process or the database is SQLite,
+which takes one writer at a time anyway.
+"""
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog.models import Post
+from marketplace.models import Item
+from .backends import get_backend
+from .cache import bump_generation
+from .models import SearchIndex
+from .services import SearchService
+
+# Fields an upsert overwrites on an existing row; date_indexed keeps the
+# time the object was first indexed
+UPSERT_FIELDS = (
+    'title', 'text_content', 'author', 'tags', 'category', 'url',
+    'image_url', 'numeric_field', 'date_modified', 'generation',
+)
+
+_running = threading.Lock()
+
+
+def sources():
+    """``{label: (queryset, build)}`` for everything that gets indexed."""
+    return {
+        'posts': (
+            Post.objects.filter(status='published').select_related('tags'),
+            SearchService.post_document,
+        ),
+        'items': (Item.objects.select_related('category'), SearchService.item_document),
+        'users': (User.objects.all(), SearchService.user_document),
+    }
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def current_generation():
+    """The generation of the latest reindex, 0 before the first."""
+    return SearchIndex.objects.aggregate(Max('generation'))['generation__max'] or 0
+
+
+def write_documents(documents, generation):
+    """
+    Upsert built index rows of one content type, relink their tags, hand
+    them to the backend and invalidate cached results. Return the number
+    written.
+    """
+    if not documents:
+        return 0
+    for document in documents:
+        document.generation = generation
+    with transaction.atomic():
+        SearchIndex.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['content_type', 'object_id'],
+            update_fields=UPSERT_FIELDS,
+        )
+        # Not every database returns the ids of rows an upsert updated
+        rows = list(SearchIndex.objects.filter(
+            content_type_id=documents[0].content_type_id,
+            object_id__in=[document.object_id for document in documents],
+        ))
+        SearchService.set_tags_many(rows)
+        get_backend().update_many(rows)
+    bump_generation()
+    return len(rows)
+
+
+def index_chunk(label, pks, generation):
+    """Index the ``label`` source rows with the given keys (in a pool worker)."""
+    queryset, build = sources()[label]
+    return write_documents([build(obj) for obj in queryset.filter(pk__in=pks)], generation)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def use_pool(total, workers):
+    return (
+        workers > 1
+        and total > settings.SEARCH_REINDEX_PARALLEL_THRESHOLD
+        and not get_backend().in_process
+        and connection.vendor != 'sqlite'
+    )
+
+
+def _reindex_in_pool(generation, totals, workers, chunk_size, progress):
+    done = dict.fromkeys(totals, 0)
+    # Spawned workers set Django up afresh instead of inheriting this
+    # process's database connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = {}
+        for label, (queryset, _) in sources().items():
+            pks = queryset.values_list('pk', flat=True).iterator(chunk_size=chunk_size)
+            for chunk in chunked(pks, chunk_size):
+                futures[pool.submit(index_chunk, label, chunk, generation)] = label
+        for future in as_completed(futures):
+            label = futures[future]
+            done[label] += future.result()
+            progress(label, done[label], totals[label])
+    return sum(done.values())
+
+
+def reindex(workers=None, chunk_size=None, progress=None):
+    """
+    Rebuild the whole index and return the number of rows written.
+    ``progress(label, done, total)`` is called after every chunk.
+    """
+    workers = workers or settings.SEARCH_REINDEX_WORKERS
+    chunk_size = chunk_size or settings.SEARCH_REINDEX_CHUNK_SIZE
+    progress = progress or (lambda label, done, total: None)
+    started = timezone.now()
+    generation = current_generation() + 1
+    totals = {label: queryset.count() for label, (queryset, _) in sources().items()}
+
+    if use_pool(sum(totals.values()), workers):
+        written = _reindex_in_pool(generation, totals, workers, chunk_size, progress)
+    else:
+        written = 0
+        for label, (queryset, build) in sources().items():
+            done = 0
+            for chunk in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+                done += write_documents([build(obj) for obj in chunk], generation)
+                progress(label, done, totals[label])
+            written += done
+
+    # Rows saved by signal handlers while this ran are newer than
+    # ``started`` and stay
+    with transaction.atomic():
+        SearchIndex.objects.filter(
+            generation__lt=generation, date_modified__lt=started
+        ).delete()
+    return written
+
+
+def reindex_in_background():
+    """Task run by the reindex view; skipped if this process is already reindexing."""
+    if not _running.acquire(blocking=False):
+        return
+    try:
+        reindex()
+    finally:
+        _running.release()
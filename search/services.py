@@ -1,10 +1,19 @@
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
+from django.db.models import Count, Q
 from collections import defaultdict
 from blog.models import Post, Tag
 from marketplace.models import Item, CategoryModel
 from django.contrib.auth.models import User
-from .models import SearchIndex
+from .backends import get_backend
+from .cache import bump_generation
+from .models import SearchIndex, SearchIndexTag, SearchTag
+
+# Index row fields built from the indexed object
+DOCUMENT_FIELDS = (
+    'title', 'text_content', 'author_id', 'tags', 'category', 'url',
+    'image_url', 'numeric_field',
+)
+
 
 class SearchService:
     """
@@ -13,20 +22,17 @@ class SearchService:
     """
     
     @staticmethod
-    def index_post(post):
-        """Index a blog post for searching"""
-        content_type = ContentType.objects.get_for_model(Post)
-        
-        # Get or create the search index
-        search_index, created = SearchIndex.objects.get_or_create(
-            content_type=content_type,
+    def post_document(post):
+        """Build the (unsaved) index row of a blog post"""
+        search_index = SearchIndex(
+            content_type=ContentType.objects.get_for_model(Post),
             object_id=str(post.id)
         )
         
         # Update the search index with post data
         search_index.title = post.title
         search_index.text_content = f"{post.subtitle} {post.caption} {post.content}"
-        search_index.author = post.author
+        search_index.author_id = post.author_id
         
         # Extract tags
         tags = []
@@ -44,25 +50,20 @@ class SearchService:
             
         # Add numeric field for verification score
         search_index.numeric_field = post.verification_score
-        
-        search_index.save()
         return search_index
     
     @staticmethod
-    def index_item(item):
-        """Index a marketplace item for searching"""
-        content_type = ContentType.objects.get_for_model(Item)
-        
-        # Get or create the search index
-        search_index, created = SearchIndex.objects.get_or_create(
-            content_type=content_type,
+    def item_document(item):
+        """Build the (unsaved) index row of a marketplace item"""
+        search_index = SearchIndex(
+            content_type=ContentType.objects.get_for_model(Item),
             object_id=str(item.id)
         )
         
         # Update the search index with item data
         search_index.title = item.name
         search_index.text_content = item.description
-        search_index.author = item.seller
+        search_index.author_id = item.seller_id
         
         # Extract category as tag
         tags = []
@@ -81,25 +82,20 @@ class SearchService:
             
         # Add numeric field for price (useful for range searches)
         search_index.numeric_field = float(item.price)
-        
-        search_index.save()
         return search_index
     
     @staticmethod
-    def index_user(user):
-        """Index a user for searching"""
-        content_type = ContentType.objects.get_for_model(User)
-        
-        # Get or create the search index
-        search_index, created = SearchIndex.objects.get_or_create(
-            content_type=content_type,
+    def user_document(user):
+        """Build the (unsaved) index row of a user"""
+        search_index = SearchIndex(
+            content_type=ContentType.objects.get_for_model(User),
             object_id=str(user.id)
         )
         
         # Update the search index with user data
         search_index.title = user.username
         search_index.text_content = f"{user.first_name} {user.last_name} {user.email}"
-        search_index.author = user  # User is their own author
+        search_index.author_id = user.id  # User is their own author
         
         # No tags for users, but can be extended later
         search_index.tags = []
@@ -112,71 +108,149 @@ class SearchService:
         
         # No meaningful numeric field for users, set to 0
         search_index.numeric_field = 0
-        
+        return search_index
+    
+    @staticmethod
+    def save_document(document):
+        """Write a built index row over the object's current one"""
+        search_index, created = SearchIndex.objects.get_or_create(
+            content_type_id=document.content_type_id,
+            object_id=document.object_id
+        )
+        for field in DOCUMENT_FIELDS:
+            setattr(search_index, field, getattr(document, field))
         search_index.save()
+        SearchService.set_tags(search_index, search_index.tags)
+        SearchService.update_search_vector(search_index)
+        bump_generation()
         return search_index
     
     @staticmethod
-    def reindex_all():
-        """Reindex all searchable content"""
-        # Clear existing index
-        SearchIndex.objects.all().delete()
-        
-        # Index all posts
-        for post in Post.objects.filter(status='published'):
-            SearchService.index_post(post)
-            
-        # Index all items
-        for item in Item.objects.all():
-            SearchService.index_item(item)
-            
-        # Index all users
-        for user in User.objects.all():
-            SearchService.index_user(user)
+    def index_post(post):
+        """Index a blog post for searching"""
+        return SearchService.save_document(SearchService.post_document(post))
+    
+    @staticmethod
+    def index_item(item):
+        """Index a marketplace item for searching"""
+        return SearchService.save_document(SearchService.item_document(item))
+    
+    @staticmethod
+    def index_user(user):
+        """Index a user for searching"""
+        return SearchService.save_document(SearchService.user_document(user))
+    
+    @staticmethod
+    def set_tags(search_index, tags):
+        """
+        Point a saved index row's ``search_tags`` at ``tags``, touching
+        only the links that changed.
+        """
+        tags = set(tags)
+        current = dict(
+            search_index.tag_links.values_list('tag__name', 'id')
+        )
+        stale = [link_id for name, link_id in current.items() if name not in tags]
+        if stale:
+            SearchIndexTag.objects.filter(id__in=stale).delete()
+        missing = tags - set(current)
+        if missing:
+            SearchTag.objects.bulk_create(
+                [SearchTag(name=name) for name in missing], ignore_conflicts=True
+            )
+            SearchIndexTag.objects.bulk_create([
+                SearchIndexTag(search_index=search_index, tag_id=tag_id)
+                for tag_id in SearchTag.objects.filter(
+                    name__in=missing
+                ).values_list('id', flat=True)
+            ], ignore_conflicts=True)
+
+    @staticmethod
+    def set_tags_many(rows):
+        """
+        ``set_tags`` for a batch of saved index rows at once, relinking
+        each to the tags in its ``tags`` field.
+        """
+        names = {name for row in rows for name in row.tags}
+        SearchTag.objects.bulk_create(
+            [SearchTag(name=name) for name in names], ignore_conflicts=True
+        )
+        tag_ids = dict(SearchTag.objects.filter(name__in=names).values_list('name', 'id'))
+        SearchIndexTag.objects.filter(search_index__in=rows).delete()
+        SearchIndexTag.objects.bulk_create([
+            SearchIndexTag(search_index_id=row.pk, tag_id=tag_ids[name])
+            for row in rows for name in set(row.tags)
+        ])
+
+    @staticmethod
+    def tagged(tags):
+        """Subquery of the ids of index rows carrying any of ``tags``."""
+        return SearchIndexTag.objects.filter(
+            tag__name__in=tags
+        ).values('search_index_id')
+
+    @staticmethod
+    def tag_facets(queryset, limit=None):
+        """
+        ``[(tag, count), ...]`` over the rows of ``queryset``, most common
+        first, from one grouped query.
+        """
+        facets = SearchIndexTag.objects.filter(
+            search_index__in=queryset.order_by().values('pk')
+        ).values_list('tag__name').annotate(
+            count=Count('search_index_id')
+        ).order_by('-count', 'tag__name')
+        return list(facets[:limit] if limit else facets)
+
+    @staticmethod
+    def update_search_vector(search_index):
+        """Pass a saved index row on to the search backend."""
+        get_backend().update(search_index)
+
+    @staticmethod
+    def match_term(queryset, term):
+        """
+        Narrow ``queryset`` to rows matching ``term``, using the
+        SEARCH_BACKEND (see search/backends.py). Backends that rank
+        matches annotate them with ``rank``.
+        """
+        return get_backend().match(queryset, term)
+
+    @staticmethod
+    def reindex_all(workers=None, chunk_size=None, progress=None):
+        """
+        Reindex all searchable content while search stays live, and
+        return the number of rows written (see search/reindex.py).
+        """
+        from .reindex import reindex
+        return reindex(workers=workers, chunk_size=chunk_size, progress=progress)
     
     @staticmethod
     def hash_table_search(term=None, tags=None, category=None):
         """
         Perform search using hash table approach for exact matches.
-        Good for tag/category searching.
+        Good for tag/category searching. Returns rows matching any of
+        the given criteria.
         """
-        # Create empty result set
-        results = set()
+        conditions = Q()
         
-        # Create a hash table (dictionary) for O(1) lookups
+        # Tag lookups go through the SearchTag index
         if tags:
-            # Convert tags to a set for O(1) containment checks
-            tag_set = set(tags)
-            
-            # Get all search indices
-            indices = SearchIndex.objects.all()
-            
-            # Iterate through indices and check tags using hash lookups
-            for index in indices:
-                # Convert index tags to set for intersection operation
-                index_tags = set(index.tags)
-                
-                # If any tag matches (intersection not empty)
-                if index_tags.intersection(tag_set):
-                    results.add(index.id)
+            conditions |= Q(pk__in=SearchService.tagged(tags))
         
         # Add category search
         if category:
-            category_indices = SearchIndex.objects.filter(category=category)
-            for index in category_indices:
-                results.add(index.id)
+            conditions |= Q(category=category)
         
         # Add term search
         if term:
-            term_indices = SearchIndex.objects.filter(
-                Q(title__icontains=term) | 
-                Q(text_content__icontains=term)
-            )
-            for index in term_indices:
-                results.add(index.id)
+            conditions |= Q(pk__in=SearchService.match_term(
+                SearchIndex.objects.all(), term
+            ).values('pk'))
         
-        # Return queryset of matching indices
-        return SearchIndex.objects.filter(id__in=results)
+        if not conditions:
+            return SearchIndex.objects.none()
+        return SearchIndex.objects.filter(conditions)
     
     @staticmethod
     def binary_search(field, min_value=None, max_value=None):
@@ -213,24 +287,13 @@ class SearchService:
             content_type_obj = ContentType.objects.get_for_model(content_type)
             queryset = queryset.filter(content_type=content_type_obj)
         
-        # Apply text search term
-        if term:
-            queryset = queryset.filter(
-                Q(title__icontains=term) | 
-                Q(text_content__icontains=term)
-            )
-        
         # Apply author filter
         if author:
             queryset = queryset.filter(author=author)
             
-        # Apply tag filter using hash table concept
+        # Apply tag filter through the SearchTag index
         if tags:
-            tag_q = Q()
-            for tag in tags:
-                # This emulates a hash lookup by creating OR conditions
-                tag_q |= Q(tags__contains=[tag])
-            queryset = queryset.filter(tag_q)
+            queryset = queryset.filter(pk__in=SearchService.tagged(tags))
             
         # Apply category filter
         if category:
@@ -242,5 +305,14 @@ class SearchService:
             
         if max_value is not None:
             queryset = queryset.filter(numeric_field__lte=max_value)
+        
+        # Apply text search term last, so backends that cap their matches
+        # cap what's left after the filters
+        if term:
+            queryset = SearchService.match_term(queryset, term)
+        
+        # Best matches first when there's a rank to go by
+        if 'rank' in queryset.query.annotations:
+            queryset = queryset.order_by('-rank', '-id')
             
         return queryset
@@ -1,27 +1,50 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.contrib.contenttypes.models import ContentType
 from blog.models import Post
 from marketplace.models import Item
-from .services import SearchService
+from .backends import get_backend
+from .cache import bump_generation
+from .indexing import mark_dirty
+from .models import SearchIndex
 
 @receiver(post_save, sender=Post)
-def index_post_on_save(sender, instance, created, **kwargs):
+def index_post_on_save(sender, instance, created, update_fields=None, **kwargs):
     """
-    Signal handler to automatically index blog posts when they are created or updated.
-    Only published posts are indexed.
+    Signal handler queueing blog posts for indexing when they are created
+    or updated. Only published posts are indexed; unpublished ones are
+    dropped from the index (see search/indexing.py).
     """
-    # Only index published posts
-    if instance.status == 'published':
-        SearchService.index_post(instance)
+    # A new draft has nothing in the index to update
+    if created and instance.status != 'published':
+        return
+    mark_dirty('posts', instance.pk, update_fields)
 
 @receiver(post_save, sender=Item)
-def index_item_on_save(sender, instance, created, **kwargs):
+def index_item_on_save(sender, instance, created, update_fields=None, **kwargs):
     """
-    Signal handler to automatically index marketplace items when they are created or updated.
+    Signal handler queueing marketplace items for indexing when they are created or updated.
     """
-    SearchService.index_item(instance)
+    mark_dirty('items', instance.pk, update_fields)
 
-# Additional signal handlers could be added for:
-# - Removing items from search index on deletion
-# - Handling changes to tags or categories
+@receiver(post_delete, sender=Post)
+def unindex_post_on_delete(sender, instance, **kwargs):
+    """
+    Signal handler dropping deleted blog posts from the index.
+    """
+    mark_dirty('posts', instance.pk)
+
+@receiver(post_delete, sender=Item)
+def unindex_item_on_delete(sender, instance, **kwargs):
+    """
+    Signal handler dropping deleted marketplace items from the index.
+    """
+    mark_dirty('items', instance.pk)
+
+@receiver(post_delete, sender=SearchIndex)
+def remove_from_search_backend(sender, instance, **kwargs):
+    """
+    Signal handler dropping deleted index rows from the search backend
+    and the cached results.
+    """
+    get_backend().remove([instance.pk])
+    bump_generation()
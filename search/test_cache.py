@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Post
+from marketplace.models import Item
+from .cache import cache_stats
+
+
+@override_settings(SEARCH_INDEX_SYNC=True)
+class SearchCacheTest(TestCase):
+    def setUp(self):
+        caches['search'].clear()
+        self.author = User.objects.create_user(username='author')
+        for title in ('Drought hits farms', 'Drought relief'):
+            Post.objects.create(
+                title=title, content='Fields are dry.',
+                author=self.author, status='published'
+            )
+        Item.objects.create(
+            name='Drought-proof planter', description='Self watering.',
+            price=20, quantity=1, seller=self.author
+        )
+
+    def search(self, q, **params):
+        return self.client.get(reverse('search:search_view'), {'q': q, **params})
+
+    def titles(self, response):
+        return sorted(result.title for result in response.context['page_obj'])
+
+    def test_identical_searches_hit_the_cache(self):
+        before = cache_stats()
+        first = self.search('drought')
+        self.assertEqual(first.context['search_count'], 3)
+        self.assertEqual(
+            first.context['section_counts'], {'blog': 2, 'marketplace': 1, 'users': 0}
+        )
+
+        # Case and spacing don't make a different search; the page rows
+        # are loaded with one query
+        with self.assertNumQueries(1):
+            second = self.search('  Drought ')
+        self.assertEqual(self.titles(second), self.titles(first))
+        self.assertEqual(second.context['search_count'], 3)
+        self.assertEqual(second.context['query'], 'Drought')
+        after = cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+        self.search('drought', content='blog')
+        self.assertEqual(cache_stats()['misses'] - before['misses'], 2)
+
+    def test_index_writes_invalidate_cached_results(self):
+        self.search('drought')
+        Post.objects.create(
+            title='Drought ends', content='Rain at last.',
+            author=self.author, status='published'
+        )
+        self.assertIn('Drought ends', self.titles(self.search('drought')))
+
+        Post.objects.filter(title='Drought ends').delete()
+        self.assertNotIn('Drought ends', self.titles(self.search('drought')))
+
+    @override_settings(SEARCH_CACHE_SECONDS=0)
+    def test_caching_can_be_turned_off(self):
+        before = cache_stats()
+        self.search('drought')
+        self.search('drought')
+        self.assertEqual(cache_stats(), before)
@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog import verification
+from blog.models import Post
+from marketplace.models import Item
+from .indexing import index_queue
+from .models import SearchIndex
+
+
+@override_settings(SEARCH_INDEX_SYNC=True)
+class SignalIndexingTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            title='Drought hits farms', content='Fields are dry.',
+            author=self.author, status='published'
+        )
+        self.item = Item.objects.create(
+            name='Laptop', description='Fast laptop', price=900, quantity=1,
+            seller=self.author
+        )
+
+    def titles(self):
+        return sorted(SearchIndex.objects.values_list('title', flat=True))
+
+    def test_unpublish_and_delete_leave_the_index(self):
+        self.assertEqual(self.titles(), ['Drought hits farms', 'Laptop'])
+        self.post.status = 'draft'
+        self.post.save()
+        self.assertEqual(self.titles(), ['Laptop'])
+        self.item.delete()
+        self.assertEqual(self.titles(), [])
+
+    def test_saves_of_other_fields_skip_the_index(self):
+        self.post.likes_count = 5
+        with CaptureQueriesContext(connection) as queries:
+            self.post.save(update_fields=['likes_count'])
+        self.assertEqual(len(queries), 1)
+
+    def test_verification_votes_reach_the_index(self):
+        verification.apply_votes(self.post.pk, positive=2, negative=1)
+        self.post.refresh_from_db()
+        self.assertAlmostEqual(self.post.verification_score, 2.1 / 3.2)
+        self.assertEqual(
+            SearchIndex.objects.get(title='Drought hits farms').numeric_field,
+            self.post.verification_score
+        )
+
+    @override_settings(SEARCH_INDEX_SYNC=False, SEARCH_INDEX_DEBOUNCE_SECONDS=60)
+    def test_debounced_changes_are_indexed_once_in_a_batch(self):
+        self.addCleanup(index_queue.flush)
+        for title in ('Draft title', 'Second draft', 'Final title'):
+            self.post.title = title
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post.save()
+        item_pk = self.item.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+
+        self.assertEqual(self.titles(), ['Drought hits farms', 'Laptop'])
+        self.assertEqual(
+            list(index_queue.pending), [('posts', self.post.pk), ('items', item_pk)]
+        )
+        self.assertIsNotNone(index_queue.timer)
+
+        index_queue.flush()
+        self.assertEqual(self.titles(), ['Final title'])
+        self.assertIsNone(index_queue.timer)
+
+    @override_settings(
+        SEARCH_INDEX_SYNC=False, SEARCH_INDEX_DEBOUNCE_SECONDS=60, SEARCH_INDEX_BATCH_SIZE=2,
+        BACKGROUND_TASKS_EAGER=True
+    )
+    def test_full_batch_is_flushed(self):
+        self.addCleanup(index_queue.flush)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Renamed'
+            self.post.save()
+        self.assertEqual(len(index_queue.pending), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.name = 'Notebook'
+            self.item.save()
+        self.assertEqual(len(index_queue.pending), 0)
+        self.assertEqual(self.titles(), ['Notebook', 'Renamed'])
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Post
+from .backends import get_backend
+from .inverted import InvertedIndex, decode_postings, encode_postings, tokenize
+from .models import SearchIndex
+from .services import SearchService
+
+
+class InvertedIndexTest(TestCase):
+    def test_tokenize_stems_and_drops_stop_words(self):
+        self.assertEqual(
+            tokenize('The droughts are hitting farms'), ['drought', 'hit', 'farm']
+        )
+
+    def test_postings_round_trip(self):
+        postings = [(3, 1), (200, 7), (70000, 300)]
+        encoded = encode_postings(postings)
+        self.assertLess(len(encoded), 12)
+        self.assertEqual(list(decode_postings(encoded)), postings)
+
+    def test_saved_index_matches_in_memory_one(self):
+        path = os.path.join(tempfile.mkdtemp(), 'index.bin')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        index = InvertedIndex(path)
+        index.add(1, title='Drought hits farms', text='Fields are dry.')
+        index.add(2, title='Weather report', text='The drought continues.')
+        index.add(3, title='Laptop review', text='A fast laptop.')
+        before = index.search('drought')
+        index.save()
+        index.remove(3)
+        index.add(2, title='Weather report', text='Sunny all week.')
+
+        self.assertEqual([doc for doc, _ in index.search('drought')], [1])
+        self.assertEqual(index.search('laptop'), [])
+        index.close()
+        reopened = InvertedIndex.open(path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.search('drought'), before)
+        self.assertEqual(len(reopened), 3)
+
+
+@override_settings(SEARCH_INDEX_SYNC=True)
+class InvertedIndexBackendTest(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_override = override_settings(
+            SEARCH_BACKEND='search.backends.InvertedIndexBackend',
+            SEARCH_INDEX_PATH=os.path.join(directory, 'index.bin'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.author = User.objects.create_user(username='author')
+        self.title_match = Post.objects.create(
+            title='Drought hits farms', content='Fields are dry.',
+            author=self.author, status='published'
+        )
+        self.body_match = Post.objects.create(
+            title='Weather report', content='The drought continues.',
+            author=self.author, status='published'
+        )
+
+    def titles(self, term):
+        return [result.title for result in SearchService.hybrid_search(term=term)]
+
+    def test_matches_are_ranked(self):
+        self.assertEqual(self.titles('droughts'), ['Drought hits farms', 'Weather report'])
+        self.assertEqual(self.titles('weather'), ['Weather report'])
+        self.assertEqual(self.titles('flood'), [])
+
+    @override_settings(SEARCH_INDEX_MAX_RESULTS=1)
+    def test_results_are_capped_after_filtering(self):
+        reporter = User.objects.create_user(username='reporter')
+        Post.objects.create(
+            title='Weather', content='Drought or not, it rains.',
+            author=reporter, status='published'
+        )
+        self.assertEqual(self.titles('drought'), ['Drought hits farms'])
+        # One key per query: the filtered-out best hits are skipped and
+        # matching stops at the cap
+        with mock.patch('search.backends.PK_CHUNK_SIZE', 1), self.assertNumQueries(3):
+            results = list(SearchService.hybrid_search(term='drought', author=reporter))
+        self.assertEqual([result.title for result in results], ['Weather'])
+
+    def test_saves_update_the_index(self):
+        self.body_match.content = 'Sunny all week.'
+        self.body_match.save()
+        self.assertEqual(self.titles('drought'), ['Drought hits farms'])
+        SearchIndex.objects.filter(title='Drought hits farms').delete()
+        self.assertEqual(self.titles('drought'), [])
+
+    def test_new_process_catches_up_from_saved_file(self):
+        get_backend().rebuild()
+        # Written by "another process" after the save
+        SearchIndex.objects.filter(title='Weather report').delete()
+        get_backend.cache_clear()
+        Post.objects.create(
+            title='Drought relief', content='Aid arrives.',
+            author=self.author, status='published'
+        )
+        self.assertEqual(self.titles('drought'), ['Drought relief', 'Drought hits farms'])
+
+    def test_view_pages_by_rank(self):
+        response = self.client.get(reverse('search:search_view'), {'q': 'drought'})
+        self.assertEqual(response.context['sort'], '-rank')
+        self.assertEqual(response.context['search_count'], 2)
+        self.assertEqual(
+            [result.title for result in response.context['page_obj']],
+            ['Drought hits farms', 'Weather report']
+        )
+
+    def test_build_command(self):
+        out = StringIO()
+        call_command('build_search_index', stdout=out)
+        self.assertIn('Indexed 2 documents', out.getvalue())
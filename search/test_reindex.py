@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from marketplace.models import CategoryModel, Item
+from .models import SearchIndex
+from .services import SearchService
+
+
+@override_settings(SEARCH_INDEX_SYNC=True)
+class ReindexTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.category = CategoryModel.objects.create(name='Electronics', slug='electronics')
+        self.item = Item.objects.create(
+            name='Laptop', description='Fast laptop', price=900, quantity=1,
+            seller=self.author, category=self.category
+        )
+        self.posts = [self.post(i) for i in range(3)]
+
+    def post(self, i):
+        return Post.objects.create(
+            title=f'Post {i}', content='Test content', author=self.author,
+            status='published', tags=Tag.objects.create(name='News', slug=f'news-{i}')
+        )
+
+    def reindex(self, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            count = SearchService.reindex_all(**kwargs)
+        return count, len(queries)
+
+    def test_rows_are_updated_in_place(self):
+        before = dict(SearchIndex.objects.values_list('object_id', 'id'))
+        Post.objects.filter(pk=self.posts[0].pk).update(title='Renamed')
+
+        count, _ = self.reindex()
+        self.assertEqual(count, 5)  # 3 posts, 1 item, 1 user
+        row = SearchIndex.objects.get(object_id=str(self.posts[0].pk))
+        self.assertEqual(row.title, 'Renamed')
+        self.assertEqual(row.id, before[str(self.posts[0].pk)])
+        self.assertEqual(list(row.search_tags.values_list('name', flat=True)), ['News'])
+        self.assertEqual(
+            SearchService.tag_facets(SearchIndex.objects.all()),
+            [('News', 3), ('Electronics', 1)]
+        )
+
+    def test_rows_of_gone_objects_are_removed(self):
+        # Queryset writes skip the signals that keep the index in step
+        Post.objects.filter(pk=self.posts[0].pk).update(status='draft')
+        Item.objects.filter(pk=self.item.pk).delete()
+        self.reindex()
+        self.assertEqual(
+            sorted(SearchIndex.objects.values_list('title', flat=True)),
+            ['Post 1', 'Post 2', 'author']
+        )
+
+    def test_queries_do_not_grow_with_rows(self):
+        _, few = self.reindex()
+        for i in range(3, 10):
+            self.post(i)
+        count, many = self.reindex()
+        self.assertEqual(count, 12)
+        self.assertEqual(few, many)
+
+        # One upsert per chunk
+        _, chunked = self.reindex(chunk_size=4)
+        self.assertGreater(chunked, many)
+
+    def test_command_reports_progress(self):
+        out = StringIO()
+        call_command('reindex_search', chunk_size=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('posts: 2/3', output)
+        self.assertIn('posts: 3/3', output)
+        self.assertIn('Indexed 5 rows', output)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_view_starts_reindex(self):
+        url = reverse('search:reindex_search')
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        SearchIndex.objects.all().delete()
+        User.objects.filter(pk=self.author.pk).update(is_staff=True)
+        response = self.client.get(url)
+        self.assertContains(response, 'Reindexing Started')
+        self.assertEqual(SearchIndex.objects.count(), 5)
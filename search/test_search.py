@@ -1,4 +1,7 @@
-from django.test import TestCase, Client
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from blog.models import Post, Tag
@@ -7,6 +10,7 @@ from .models import SearchIndex
 from .services import SearchService
 import json
 
+@override_settings(SEARCH_INDEX_SYNC=True)
 class SearchIndexTest(TestCase):
     """
     Test case for the SearchIndex model and related search functionality.
@@ -155,6 +159,49 @@ class SearchIndexTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, 'Designer T-shirt')
 
+@skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+@override_settings(SEARCH_INDEX_SYNC=True)
+class FullTextSearchTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.title_match = Post.objects.create(
+            title='Drought hits farms', content='Fields are dry.',
+            author=self.author, status='published'
+        )
+        self.body_match = Post.objects.create(
+            title='Weather report', content='The drought continues.',
+            author=self.author, status='published'
+        )
+        Post.objects.create(
+            title='Drought relief fund', content='Donations for drought relief.',
+            author=self.author, status='draft'
+        )
+
+    def titles(self, term):
+        return [result.title for result in SearchService.hybrid_search(term=term)]
+
+    def test_index_writes_maintain_vector(self):
+        index = SearchIndex.objects.get(object_id=str(self.title_match.pk))
+        self.assertIn("'drought':1A", index.search_vector)
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.titles('drought'), ['Drought hits farms', 'Weather report'])
+
+    def test_websearch_syntax(self):
+        self.assertEqual(self.titles('drought -farms'), ['Weather report'])
+        self.assertEqual(self.titles('"weather report"'), ['Weather report'])
+
+    def test_typo_matches_title(self):
+        self.assertEqual(self.titles('Wether reprot'), ['Weather report'])
+
+    def test_view_pages_by_rank(self):
+        response = self.client.get(reverse('search:search_view'), {'q': 'drought'})
+        self.assertEqual(response.context['sort'], '-rank')
+        self.assertEqual(
+            [result.title for result in response.context['page_obj']],
+            ['Drought hits farms', 'Weather report']
+        )
+
 class SearchManualTest:
     """
     Utility class for manually testing search functionality.
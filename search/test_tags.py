@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from blog.models import Post, Tag
+from marketplace.models import CategoryModel, Item
+from .models import SearchIndex, SearchIndexTag, SearchTag
+from .services import SearchService
+
+
+@override_settings(SEARCH_INDEX_SYNC=True)
+class SearchTagTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        # Post.tags is one-to-one, so each post gets its own Tag row
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}', content='Test content', author=self.author,
+                status='published', tags=Tag.objects.create(
+                    name='News' if i % 3 else 'Science', slug=f'tag-{i}'
+                )
+            )
+            for i in range(6)
+        ]
+        electronics = CategoryModel.objects.create(name='Electronics', slug='electronics')
+        Item.objects.create(
+            name='Laptop', description='Fast laptop', price=900, quantity=1,
+            seller=self.author, category=electronics
+        )
+
+    def titles(self, queryset):
+        return sorted(queryset.values_list('title', flat=True))
+
+    def test_index_writes_keep_links_in_step(self):
+        post = self.posts[0]
+        row = SearchIndex.objects.get(object_id=str(post.pk))
+        self.assertEqual(list(row.search_tags.values_list('name', flat=True)), ['Science'])
+
+        post.tags.name = 'News'
+        post.tags.save()
+        post.save()
+        self.assertEqual(list(row.search_tags.values_list('name', flat=True)), ['News'])
+        self.assertEqual(SearchTag.objects.count(), 3)
+
+    def test_tag_search_is_one_query(self):
+        with self.assertNumQueries(1):
+            titles = self.titles(SearchService.hash_table_search(tags=['Science']))
+        self.assertEqual(titles, ['Post 0', 'Post 3'])
+
+        results = SearchService.hash_table_search(tags=['Science'], category='Electronics')
+        self.assertEqual(self.titles(results), ['Laptop', 'Post 0', 'Post 3'])
+        self.assertFalse(SearchService.hash_table_search().exists())
+
+    def test_hybrid_tag_filter(self):
+        results = SearchService.hybrid_search(tags=['News', 'Electronics'])
+        self.assertEqual(
+            self.titles(results), ['Laptop', 'Post 1', 'Post 2', 'Post 4', 'Post 5']
+        )
+
+    def test_facets_are_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            facets = SearchService.tag_facets(SearchIndex.objects.all())
+        self.assertEqual(facets, [('News', 4), ('Science', 2), ('Electronics', 1)])
+
+        response = self.client.get(reverse('search:search_view'), {'q': 'laptop'})
+        self.assertEqual(response.context['tag_facets'], [('Electronics', 1)])
+
+    def test_deleting_rows_removes_links(self):
+        SearchIndex.objects.all().delete()
+        self.assertFalse(SearchIndexTag.objects.exists())
@@ -1,48 +1,32 @@
 from django.shortcuts import render
 from django.contrib.contenttypes.models import ContentType
-from django.db.models import Q
 from django.views.decorators.http import require_GET
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
+from django.db.models import Count
 
 from blog.models import Post, Tag
 from marketplace.models import Item, CategoryModel
+from .cache import cached_search
 from .services import SearchService
 from .models import SearchIndex
+from .reindex import reindex_in_background
+from backend.pagination import CursorPage, paginate
+from backend.tasks import run_task
 
-@require_GET
-def search_view(request):
+# Sort fields that are non-null, so they can key a cursor
+KEYSET_SORT_FIELDS = ('date_indexed', 'date_modified', 'title')
+
+# Most common tags among the results offered as filters
+TAG_FACET_LIMIT = 20
+
+def run_search(query, search_type, tags, category, min_value, max_value,
+               content_type_obj, sort_by, cursor):
     """
-    Main search view that accepts various search parameters and returns results.
-    Demonstrates both hash table and binary search approaches.
+    Run a search and return ``(entry, rows)``: the page's rows, and an
+    entry with their ids, the cursors, the sort used, the result counts
+    (in total and per section) and the tag facets, ready for the result
+    cache.
     """
-    # Get search parameters
-    query = request.GET.get('q', '')
-    search_type = request.GET.get('type', 'hybrid')  # hybrid, hash, binary
-    content_filter = request.GET.get('content', 'all')  # all, blog, marketplace
-    category = request.GET.get('category', None)
-    tag = request.GET.get('tag', None)
-    min_price = request.GET.get('min_price', None)
-    max_price = request.GET.get('max_price', None)
-    sort_by = request.GET.get('sort', 'date_indexed')  # date_indexed, title, etc.
-    
-    # Initialize variables
-    search_results = []
-    content_type_obj = None
-    
-    # Set content type filter
-    if content_filter == 'blog':
-        content_type_obj = ContentType.objects.get_for_model(Post)
-    elif content_filter == 'marketplace':
-        content_type_obj = ContentType.objects.get_for_model(Item)
-    
-    # Process tags and categories
-    tags = [tag] if tag else None
-    
-    # Convert price values to float if provided
-    min_value = float(min_price) if min_price and min_price.isdigit() else None
-    max_value = float(max_price) if max_price and max_price.isdigit() else None
-    
     # Perform search based on selected method
     if search_type == 'hash':
         # Use hash table search for exact matches
@@ -60,9 +44,7 @@ def search_view(request):
         )
         # Additional filter for text if query provided
         if query:
-            search_results = search_results.filter(
-                Q(title__icontains=query) | Q(text_content__icontains=query)
-            )
+            search_results = SearchService.match_term(search_results, query)
     else:
         # Default to hybrid search
         search_results = SearchService.hybrid_search(
@@ -74,47 +56,127 @@ def search_view(request):
             content_type=content_type_obj
         )
     
-    # Apply sorting
-    search_results = search_results.order_by(sort_by)
+    # Keyset pagination needs a total order, so every sort is
+    # tie-broken on id. Full-text matches default to best first;
+    # unknown sort fields fall back to date_indexed
+    sortable = KEYSET_SORT_FIELDS
+    if 'rank' in search_results.query.annotations:
+        sortable += ('rank',)
+        sort_by = sort_by or '-rank'
+    sort_by = sort_by or 'date_indexed'
+    sort_field = sort_by.lstrip('-')
+    if sort_field not in sortable:
+        sort_by, sort_field = 'date_indexed', 'date_indexed'
+    direction = '-' if sort_by.startswith('-') else ''
+    
+    # Paginate results; the page shows each row's author
+    page_obj = paginate(
+        search_results.select_related('author'),
+        cursor=cursor,
+        ordering=(sort_by, f'{direction}id'),
+        per_page=10  # 10 results per page
+        )
+    
+    # Count results per section with one grouped query
+    sections = section_names()
+    section_counts = dict.fromkeys(sections.values(), 0)
+    search_count = 0
+    for content_type_id, count in search_results.order_by().values_list(
+        'content_type'
+    ).annotate(count=Count('id')):
+        search_count += count
+        if content_type_id in sections:
+            section_counts[sections[content_type_id]] = count
     
-    # Organize results into categories
-    categorized_results = {
-        'blog': [],
-        'marketplace': [],
-        'users': []
+    entry = {
+        'ids': [result.pk for result in page_obj],
+        'next_cursor': page_obj.next_cursor,
+        'cursor': page_obj.cursor,
+        'sort': sort_by,
+        'count': search_count,
+        'section_counts': section_counts,
+        'tag_facets': SearchService.tag_facets(search_results, limit=TAG_FACET_LIMIT),
     }
+    return entry, page_obj.object_list
+
+def section_names():
+    """``{content type id: section}`` of the sections results are shown in."""
+    return {
+        ContentType.objects.get_for_model(model).id: name
+        for model, name in ((Post, 'blog'), (Item, 'marketplace'), (User, 'users'))
+    }
+
+@require_GET
+def search_view(request):
+    """
+    Main search view that accepts various search parameters and returns results.
+    Demonstrates both hash table and binary search approaches.
+    """
+    # Get search parameters
+    query = ' '.join(request.GET.get('q', '').split())
+    search_type = request.GET.get('type', 'hybrid')  # hybrid, hash, binary
+    content_filter = request.GET.get('content', 'all')  # all, blog, marketplace
+    category = request.GET.get('category', None)
+    tag = request.GET.get('tag', None)
+    min_price = request.GET.get('min_price', None)
+    max_price = request.GET.get('max_price', None)
+    sort_by = request.GET.get('sort')  # date_indexed, title, rank, etc.
+    cursor = request.GET.get('cursor')
     
-    # Group results by content type
-    blog_type = ContentType.objects.get_for_model(Post)
-    marketplace_type = ContentType.objects.get_for_model(Item)
-    user_type = ContentType.objects.get_for_model(User)
+    # Initialize variables
+    content_type_obj = None
+    
+    # Set content type filter
+    if content_filter == 'blog':
+        content_type_obj = ContentType.objects.get_for_model(Post)
+    elif content_filter == 'marketplace':
+        content_type_obj = ContentType.objects.get_for_model(Item)
+    
+    # Process tags and categories
+    tags = [tag] if tag else None
+    
+    # Convert price values to float if provided
+    min_value = float(min_price) if min_price and min_price.isdigit() else None
+    max_value = float(max_price) if max_price and max_price.isdigit() else None
     
-    for result in search_results:
-        if result.content_type == blog_type:
-            categorized_results['blog'].append(result)
-        elif result.content_type == marketplace_type:
-            categorized_results['marketplace'].append(result)
-        elif result.content_type == user_type:
-            categorized_results['users'].append(result)
+    # Identical searches share cached results (see search/cache.py);
+    # matching ignores case, so the key does too
+    entry, rows = cached_search(
+        {
+            'q': query.lower(), 'type': search_type, 'content': content_filter,
+            'category': category, 'tag': tag, 'min_price': min_value,
+            'max_price': max_value, 'sort': sort_by, 'cursor': cursor,
+        },
+        lambda: run_search(
+            query, search_type, tags, category, min_value, max_value,
+            content_type_obj, sort_by, cursor
+        ),
+    )
+    page_obj = CursorPage(rows, entry['next_cursor'], entry['cursor'])
+    
+    # Group the page's results by section
+    sections = section_names()
+    categorized_results = {name: [] for name in sections.values()}
+    for result in page_obj:
+        if result.content_type_id in sections:
+            categorized_results[sections[result.content_type_id]].append(result)
     
     # Get all available categories for filtering
     blog_tags = Tag.objects.all()
     marketplace_categories = CategoryModel.objects.all()
     
-    # Paginate results
-    paginator = Paginator(search_results, 10)  # 10 results per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
     context = {
         'query': query,
         'search_type': search_type,
         'content_filter': content_filter,
         'page_obj': page_obj,
+        'sort': entry['sort'],
         'categorized_results': categorized_results,
+        'section_counts': entry['section_counts'],
         'blog_tags': blog_tags,
         'marketplace_categories': marketplace_categories,
-        'search_count': search_results.count(),
+        'search_count': entry['count'],
+        'tag_facets': entry['tag_facets'],
         'category': category,
         'tag': tag,
         'min_price': min_price,
@@ -124,10 +186,9 @@ def search_view(request):
     return render(request, 'search/search_results.html', context)
 
 def reindex_search(request):
-    """Admin view to manually trigger reindexing"""
+    """Admin view to manually trigger reindexing in the background"""
     if request.user.is_staff:
-        SearchService.reindex_all()
-        # Redirect back to the referring page
+        run_task(reindex_in_background)
         return render(request, 'search/reindex_complete.html', {
             'count': SearchIndex.objects.count()
         })